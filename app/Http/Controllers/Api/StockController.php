@@ -5,6 +5,7 @@
 use App\Http\Controllers\Controller;
 use App\Models\Stock;
 use App\Models\User;
+use App\Service\ImageService;
 use App\Service\StockImageService;
 use App\Service\StockService;
 use Illuminate\Auth\Events\Registered;
@@ -112,6 +113,7 @@ public function runStockAnalysisViaAPI(Request $request)
             $client = new \GuzzleHttp\Client();
             $response = $client->post('http://stock-python:8000/analyze', [
                 'json' => $validated,
+                'headers' => $this->analysisCallerHeaders($request),
                 'timeout' => 300
             ]);
 
@@ -123,6 +125,10 @@ public function runStockAnalysisViaAPI(Request $request)
             ]);
 
         } catch (\Exception $e) {
+            if ($e instanceof \GuzzleHttp\Exception\ClientException && $e->getResponse()->getStatusCode() === 429) {
+                return $this->analysisQueueFullResponse($e);
+            }
+
             Log::error('Stock analysis API error: ' . $e->getMessage());
 
             return response()->json([
@@ -148,6 +154,7 @@ public function runStockAnalysisViaCleanAPI(Request $request, Stock $stock)
                     'test_size_pct' => 0.15,
                     'forecast_days' => 20
                 ],
+                'headers' => $this->analysisCallerHeaders($request),
                 'timeout' => 300
             ]);
 
@@ -159,6 +166,10 @@ public function runStockAnalysisViaCleanAPI(Request $request, Stock $stock)
             ]);
 
         } catch (\Exception $e) {
+            if ($e instanceof \GuzzleHttp\Exception\ClientException && $e->getResponse()->getStatusCode() === 429) {
+                return $this->analysisQueueFullResponse($e);
+            }
+
             Log::error('Stock analysis API error: ' . $e->getMessage());
 
             return response()->json([
@@ -169,6 +180,28 @@ public function runStockAnalysisViaCleanAPI(Request $request, Stock $stock)
         }
     }
 
+    /**
+     * Identyfikator wywołującego dla harmonogramu Python API (sprawiedliwa kolejka per użytkownik)
+     */
+    private function analysisCallerHeaders(Request $request): array
+    {
+        return ['X-Caller-Id' => (string) ($request->user()?->id ?? $request->ip())];
+    }
+
+    /**
+     * Python API odrzuca analizy, gdy kolejka jest pełna – przekazujemy 429 z Retry-After dalej
+     */
+    private function analysisQueueFullResponse(\GuzzleHttp\Exception\ClientException $e): JsonResponse
+    {
+        $retryAfter = $e->getResponse()->getHeaderLine('Retry-After') ?: '30';
+
+        return response()->json([
+            'success' => false,
+            'message' => 'Kolejka analiz jest pełna, spróbuj ponownie później',
+            'retry_after' => (int) $retryAfter
+        ], 429, ['Retry-After' => $retryAfter]);
+    }
+
     /**
      * Metoda 3: Asynchroniczne uruchomienie przez Queue
      */
@@ -199,20 +232,52 @@ public function create(Request $request, StockService $stockService): JsonRespon
         $stock = $stockService->getOrCreateByTicker($data['ticker']);
         $stockService->savePrices($stock, $data);
 
+        // Dane mogą przychodzić w wielu paczkach – odpowiedź nie odsyła całego payloadu z powrotem
         return response()->json([
-            'data' => $data
+            'data' => [
+                'ticker' => $data['ticker'],
+                'uuid' => $data['uuid'] ?? null,
+                'chunk' => $data['chunk'] ?? null,
+            ]
         ]);
     }
 
     public function image(Request $request, StockService $stockService): JsonResponse
     {
-        $data = $request->all();
+        $request->validate([
+            'ticker' => 'required|string|max:20',
+            'type' => 'nullable|string|in:model',
+        ]);
+
+        // Plik wykresu: rozszerzenie wyznacza format z listy dozwolonych, a zawartość musi mu odpowiadać
+        if ($request->hasFile('image')) {
+            $format = $request->validate([
+                'format' => 'required|string|in:' . implode(',', array_keys(ImageService::EXTENSIONS)),
+            ])['format'];
+
+            $request->validate([
+                'image' => 'required|file|mimes:' . ImageService::EXTENSIONS[$format] . '|max:' . ImageService::MAX_UPLOAD_KB,
+            ]);
+        } else {
+            $request->validate([
+                'image' => 'required|string',
+            ]);
+        }
+
+        $data = $request->except('image');
+        $data['file'] = $request->file('image');
+        if ($data['file'] === null) {
+            $data['image'] = $request->input('image');
+        }
 
         $stock = $stockService->getOrCreateByTicker($data['ticker']);
         $stockImage = $stockService->saveImages($stock, $data);
 
         return response()->json([
-            'data' => $data,
+            'data' => [
+                'ticker' => $data['ticker'],
+                'uuid' => $data['uuid'] ?? null,
+            ],
             'stockImage' => $stockImage
         ]);
     }
@@ -227,8 +292,9 @@ public function forecast(Request $request, StockService $stockService): JsonResp
 
         return response()->json([
             'message' => 'Stock creation endpoint',
-            'data' => $data,
-            'stockForecast' => $stockForecasts
+            'ticker' => $stock->ticker,
+            'uuid' => $data['uuid'],
+            'forecasts' => count($stockForecasts)
         ]);
     }
 }
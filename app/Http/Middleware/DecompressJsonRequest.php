@@ -0,0 +1,91 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\Response;
+
+class DecompressJsonRequest
+{
+    private const MSGPACK_TYPES = ['application/msgpack', 'application/x-msgpack'];
+
+    /** Upper bound for a decompressed body; larger bodies (e.g. gzip bombs) are rejected with 413 */
+    public const MAX_DECODED_BYTES = 16 * 1024 * 1024;
+
+    /** Compressed input is inflated in slices, so the bound is overshot by at most one slice's output */
+    private const INFLATE_SLICE_BYTES = 8192;
+
+    /**
+     * Decode gzip-compressed JSON or MessagePack bodies sent by the Python analysis service.
+     *
+     * MessagePack needs the msgpack PHP extension; without it the request is rejected with 415,
+     * which makes the Python client fall back to JSON.
+     *
+     * @param  \Closure(\Illuminate\Http\Request): (\Symfony\Component\HttpFoundation\Response)  $next
+     */
+    public function handle(Request $request, Closure $next): Response
+    {
+        $gzip = strtolower((string) $request->header('Content-Encoding')) === 'gzip';
+        $contentType = strtolower(trim(explode(';', (string) $request->header('Content-Type'))[0]));
+        $msgpack = in_array($contentType, self::MSGPACK_TYPES, true);
+
+        if (!$gzip && !$msgpack) {
+            return $next($request);
+        }
+
+        if ($msgpack && !function_exists('msgpack_unpack')) {
+            return response()->json(['message' => 'MessagePack bodies are not supported'], 415);
+        }
+
+        $body = $request->getContent();
+
+        if ($gzip) {
+            $body = $this->gzdecode($body, self::MAX_DECODED_BYTES);
+
+            if ($body === null) {
+                return response()->json(['message' => 'Decompressed body is too large'], 413);
+            }
+
+            if ($body === false) {
+                return response()->json(['message' => 'Invalid gzip body'], 400);
+            }
+        }
+
+        $data = $msgpack ? msgpack_unpack($body) : json_decode($body, true);
+
+        if (!is_array($data)) {
+            return response()->json(['message' => $msgpack ? 'Invalid MessagePack body' : 'Invalid JSON body'], 400);
+        }
+
+        $request->json()->replace($data);
+        $request->replace($data);
+
+        return $next($request);
+    }
+
+    /**
+     * Like gzdecode($body, $maxLength), but tells an oversized body (null) apart from invalid gzip (false).
+     */
+    private function gzdecode(string $body, int $maxLength): string|false|null
+    {
+        $context = inflate_init(ZLIB_ENCODING_GZIP);
+        $decoded = '';
+
+        foreach (str_split($body, self::INFLATE_SLICE_BYTES) as $slice) {
+            $part = @inflate_add($context, $slice, ZLIB_SYNC_FLUSH);
+
+            if ($part === false) {
+                return false;
+            }
+
+            $decoded .= $part;
+
+            if (strlen($decoded) > $maxLength) {
+                return null;
+            }
+        }
+
+        return inflate_get_status($context) === ZLIB_STREAM_END ? $decoded : false;
+    }
+}
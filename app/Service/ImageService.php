@@ -2,18 +2,33 @@
 
 namespace App\Service;
 
+use Illuminate\Http\UploadedFile;
 use Illuminate\Support\Facades\Storage;
 use Illuminate\Support\Str;
+use InvalidArgumentException;
 
 class ImageService
 {
+    /**
+     * Dozwolone formaty wykresów (pole `format` wysyłki) i rozszerzenia zapisywanych plików.
+     * Rozszerzenie nigdy nie pochodzi z nazwy pliku od klienta.
+     */
+    public const EXTENSIONS = [
+        'png' => 'png',
+        'webp' => 'webp',
+        'svg' => 'svg',
+    ];
+
+    /** Maksymalny rozmiar przesyłanego wykresu w KB (reguła max: walidacji) */
+    public const MAX_UPLOAD_KB = 10240;
+
     public function saveImageByBase64(string $type, string $base64): array
     {
         $imageData = base64_decode($base64);
 
         if (preg_match('/^data:image\/(\w+);base64,/', $imageData, $type)) {
             $imageData = substr($imageData, strpos($imageData, ',') + 1);
-            $extension = strtolower($type[1]); // jpg, png, gif, etc.
+            $extension = self::EXTENSIONS[strtolower($type[1])] ?? 'png';
         } else {
             $extension = 'png';
         }
@@ -26,4 +41,17 @@ public function saveImageByBase64(string $type, string $base64): array
             'filename' => $filename,
         ];
     }
+
+    public function saveUploadedImage(string $type, UploadedFile $file, string $format): array
+    {
+        $extension = self::EXTENSIONS[$format] ?? throw new InvalidArgumentException("Unsupported image format: {$format}");
+
+        $filename = Str::uuid() . '.' . $extension;
+        Storage::disk('public')->putFileAs('images', $file, $filename);
+
+        return [
+            'dir' => null,
+            'filename' => $filename,
+        ];
+    }
 }
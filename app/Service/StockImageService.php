@@ -22,7 +22,9 @@ public function __construct(
      */
     public function save(?Model $model = null, ?array $data = null): Model
     {
-        $uploadedImageData = $this->imageService->saveImageByBase64($data['type'], $data['base64']);
+        $uploadedImageData = isset($data['file'])
+            ? $this->imageService->saveUploadedImage($data['type'], $data['file'], $data['format'])
+            : $this->imageService->saveImageByBase64($data['type'], $data['base64']);
 
         $preparedData = [
             'stock_id' => $data['stock_id'],
@@ -5,6 +5,7 @@
 use App\Core\Service\AbstractService;
 use App\Models\Stock;
 use App\Models\StockForecast;
+use App\Models\StockImage;
 
 class StockService extends AbstractService
 {
@@ -39,7 +40,7 @@ public function savePrices(Stock $stock, array $data): Stock
     {
         $stockPrices = [];
 
-        foreach ($data['stock_data'] as $priceData){
+        foreach ($this->getPriceRecords($data) as $priceData){
             $priceData['uuid'] = $data['uuid'];
             $priceData['stock_id'] = $stock->id;
 
@@ -57,7 +58,48 @@ public function savePrices(Stock $stock, array $data): Stock
         return $stock;
     }
 
-    public function saveImages(Stock $stock, array $data): Stock
+    /**
+     * Returns price rows from either the row format (stock_data: list of records)
+     * or the columnar format (stock_columns: column name => list of values).
+     *
+     * @param array $data
+     * @return iterable
+     */
+    public function getPriceRecords(array $data): iterable
+    {
+        if (!isset($data['stock_columns'])) {
+            return $data['stock_data'] ?? [];
+        }
+
+        return $this->columnRecords($data['stock_columns']);
+    }
+
+    /**
+     * Returns forecast rows from either the row format (forecast: list of records)
+     * or the columnar format (forecast_columns: column name => list of values).
+     *
+     * @param array $data
+     * @return iterable
+     */
+    public function getForecastRecords(array $data): iterable
+    {
+        if (!isset($data['forecast_columns'])) {
+            return $data['forecast'] ?? [];
+        }
+
+        return $this->columnRecords($data['forecast_columns']);
+    }
+
+    private function columnRecords(array $columns): iterable
+    {
+        $count = count(reset($columns) ?: []);
+
+        for ($i = 0; $i < $count; $i++) {
+            yield array_map(fn ($values) => $values[$i], $columns);
+        }
+    }
+
+    public function saveImages(Stock $stock, array $data): StockImage
     {
         $data['type'] = 'model';
         $data['stock_id'] = $stock->id;
@@ -76,7 +118,7 @@ public function saveForecasts(Stock $stock, array $data): array
     {
         $stockForecasts = [];
 
-        foreach ($data['forecast'] as $forecastData){
+        foreach ($this->getForecastRecords($data) as $forecastData){
 
             $preparedData = [
                 'stock_id' => $stock->id,
@@ -1,6 +1,7 @@
 <?php
 
 use App\Http\Controllers\Api\StockController;
+use App\Http\Middleware\DecompressJsonRequest;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Route;
 
@@ -9,14 +10,18 @@
 })->middleware('auth:sanctum');
 
 
-Route::post('stock-api', [StockController::class, 'create'])
-    ->name('stock-api');
+Route::middleware(DecompressJsonRequest::class)->group(function () {
 
-Route::post('stock-api/image', [StockController::class, 'image'])
-    ->name('stock-api-image');
+    Route::post('stock-api', [StockController::class, 'create'])
+        ->name('stock-api');
 
-Route::post('stock-api/forecast', [StockController::class, 'forecast'])
-    ->name('stock-api-forecast');
+    Route::post('stock-api/image', [StockController::class, 'image'])
+        ->name('stock-api-image');
+
+    Route::post('stock-api/forecast', [StockController::class, 'forecast'])
+        ->name('stock-api-forecast');
+
+});
 
 // Grupa tras dla analizy giełdowej
 Route::prefix('stock-analysis')->group(function () {
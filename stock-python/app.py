@@ -1,14 +1,33 @@
 """
 FastAPI server z poprawionym loggingiem
 """
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import contextlib
 import logging
+import multiprocessing
+import threading
 import asyncio
-from typing import Optional
+import traceback
+import uuid
+from typing import Dict, List, Literal, Optional
+import io
 import os
 import sys
+import time
+
+import metrics
+import progress
+from payload_encoding import MSGPACK_TYPE, CompressionMiddleware, accepts_msgpack, pack
+from market_summary import fresh_last_bar
+from result_cache import ResultCache, request_key
+from scheduler import ANALYSIS_CORES, JobScheduler, SchedulerFull, Ticket
+from task_events import DONE_EVENT, EventHub, format_sse
+from task_store import TASK_LOG_LIMIT, TASK_STORE, TaskStore, create_task_store
 
 # Konfiguracja logowania
 logging.basicConfig(
@@ -21,7 +40,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Stock Analysis API", version="1.0.0")
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serwera: magazyn zadań i rozgrzana pula analizy; zamknięcie: pula i wątek zdarzeń
+    """
+    await open_task_store()
+    await start_analysis_pool()
+    try:
+        yield
+    finally:
+        await stop_analysis_pool()
+
+app = FastAPI(title="Stock Analysis API", version="1.0.0", lifespan=lifespan)
+# Odpowiedzi kompresowane według Accept-Encoding (br albo gzip); strumień SSE idzie bez kompresji,
+# żeby zdarzenia nie czekały w buforze kompresora
+app.add_middleware(CompressionMiddleware, excluded_paths=(r"^/analyze/[^/]+/events$",))
+
+# Liczba procesów liczących analizy – twardy limit równoległych, ciężkich obliczeń (na proces serwera)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+
+# Tryb uruchomienia `python app.py`: development – jeden proces z przeładowaniem kodu po zmianie plików,
+# production – WEB_WORKERS procesów uvicorn bez reloadera, każdy z własną pulą ANALYSIS_WORKERS.
+# Kolejka, cache wyników, zdarzenia postępu i metryki są w pamięci procesu, więc przy WEB_WORKERS > 1
+# limit kolejki, scalanie identycznych żądań i /tune działają per worker, SSE/WebSocket pokazuje postęp
+# tylko zadań z tego samego workera, a /metrics – jeden worker. Domyślny i zalecany jest jeden proces.
+APP_MODES = ("development", "production")
+APP_MODE = os.getenv("APP_MODE", "development")
+WEB_WORKERS = max(1, int(os.getenv("WEB_WORKERS", "1")))
+# Pula analizy importuje przy starcie XGBoost, scikit-learn, SciPy i matplotlib (stock_model.preload) –
+# pierwsze zadanie nie czeka na importy, kosztem dłuższego startu i pamięci workerów
+PRELOAD_ANALYSIS = os.getenv("PRELOAD_ANALYSIS", "1") == "1"
+# Niedokończone zadania oznaczane są przy starcie jako nieudane; przy wielu procesach serwera robi to raz
+# proces nadrzędny (main) – start kolejnego workera nie może przerwać zadań przyjętych przez poprzednie
+RECOVER_UNFINISHED_TASKS = os.getenv("RECOVER_UNFINISHED_TASKS", "1") == "1"
+
+# Kolejka przed pulą: najwyżej ANALYSIS_WORKERS zadań naraz, priorytety i kolejność per wywołujący.
+# Rdzenie dzielone są między wszystkie workery serwera: n_jobs = rdzenie // (WEB_WORKERS × ANALYSIS_WORKERS)
+scheduler = JobScheduler(ANALYSIS_WORKERS, cores=max(1, ANALYSIS_CORES // WEB_WORKERS))
+
+# Maksymalna liczba tickerów w jednym zadaniu wsadowym
+MAX_BATCH_TICKERS = int(os.getenv("MAX_BATCH_TICKERS", "500"))
+
+# Maksymalna liczba foldów backtestu walk-forward
+MAX_BACKTEST_FOLDS = int(os.getenv("MAX_BACKTEST_FOLDS", "20"))
+MAX_TUNING_TRIALS = int(os.getenv("MAX_TUNING_TRIALS", "64"))
+# Maksymalna liczba ścieżek Monte Carlo na pasma prognozy
+MAX_FORECAST_SIMULATIONS = int(os.getenv("MAX_FORECAST_SIMULATIONS", "10000"))
+# Maksymalna liczba kombinacji test_size_pct × forecast_days w jednej siatce scenariuszy
+MAX_SWEEP_SCENARIOS = int(os.getenv("MAX_SWEEP_SCENARIOS", "50"))
+
+# Pula procesów z zaimportowanym stock_model (tworzona przy starcie serwera)
+analysis_pool: Optional[ProcessPoolExecutor] = None
+
+# Zdarzenia postępu z workerów puli (kolejka międzyprocesowa) i ich rozgłaszanie do klientów SSE / WebSocket
+event_queue = None
+event_hub = EventHub()
+
+# Kolejka zdarzeń widziana w procesie workera (ustawiana przez inicjalizator puli)
+_worker_events = None
+
+# Wyniki analiz pojedynczych tickerów dla tych samych parametrów i tego samego ostatniego baru danych
+result_cache = ResultCache()
+
+# Jak długo ostatni bar z magazynu notowań jest aktualny bez pytania dostawcy (część klucza result_cache);
+# starszy oznacza, że analiza idzie do workera, który dociągnie nowe bary i odświeży magazyn
+RESULT_CACHE_DATA_TTL = int(os.getenv("RESULT_CACHE_DATA_TTL", "900"))
+
+# presety wykresu – te same nazwy co charts.CHART_PRESETS (charts ładuje NumPy/pandas, więc serwer go nie importuje);
+# zgodność pilnuje tests/test_app.py
+ChartPreset = Literal["png_hd", "png", "webp", "svg", "none"]
 
 class AnalysisRequest(BaseModel):
     ticker: str
@@ -29,14 +117,133 @@ class AnalysisRequest(BaseModel):
     start_date: str
     test_size_pct: float = 0.15
     forecast_days: int = 20
+    forecast_only: bool = False
+    # format wykresu (charts.CHART_PRESETS); domyślnie CHART_PRESET z env workera
+    chart_preset: Optional[ChartPreset] = None
+    # recursive – model jednodniowy dzień po dniu, direct – wszystkie dni z jednego modelu wielowyjściowego
+    # (dodatkowy trening, ok. 2× dłuższy etap fit – drzewa na dzień ograniczone przez DIRECT_TREE_BUDGET)
+    forecast_mode: Literal["recursive", "direct"] = "recursive"
+    # ścieżki Monte Carlo na pasma percentyli prognozy; 0 – bez pasm
+    simulations: int = 0
+    priority: Literal["interactive", "batch"] = "interactive"
+
+class BatchAnalysisRequest(BaseModel):
+    tickers: List[str]
+    trends: Dict[str, str] = {}
+    start_date: str
+    test_size_pct: float = 0.15
+    forecast_days: int = 20
+    forecast_only: bool = False
+    # "none" pomija rysowanie i wysyłkę wykresów dla całej partii
+    chart_preset: Optional[ChartPreset] = None
+    forecast_mode: Literal["recursive", "direct"] = "recursive"
+    simulations: int = 0
+    priority: Literal["interactive", "batch"] = "batch"
+
+class BacktestRequest(BaseModel):
+    ticker: str
+    trends: Optional[str] = None
+    start_date: str
+    test_size_pct: float = 0.15
+    folds: int = 5
+    # expanding – trening na całej historii przed foldem, rolling – okno o stałej długości
+    mode: Literal["expanding", "rolling"] = "expanding"
+    priority: Literal["interactive", "batch"] = "batch"
+
+class TuneRequest(BaseModel):
+    ticker: str
+    trends: Optional[str] = None
+    start_date: str
+    test_size_pct: float = 0.15
+    # random – każda próba z pełnym limitem drzew, halving – successive halving
+    search: Literal["random", "halving"] = "random"
+    trials: int = 16
+    priority: Literal["interactive", "batch"] = "batch"
+
+class SweepRequest(BaseModel):
+    ticker: str
+    trends: Optional[str] = None
+    start_date: str
+    # siatka: każda kombinacja test_size_pct × forecast_days to jeden scenariusz
+    test_size_pcts: List[float] = [0.15]
+    forecast_days: List[int] = [20]
+    forecast_only: bool = False
+    forecast_mode: Literal["recursive", "direct"] = "recursive"
+    simulations: int = 0
+    priority: Literal["interactive", "batch"] = "batch"
 
 class AnalysisResponse(BaseModel):
     success: bool
     message: str
     task_id: Optional[str] = None
 
-# Słownik do śledzenia aktywnych zadań
-active_tasks = {}
+# Magazyn stanu i logów zadań (SQLite albo pamięć – zmienna TASK_STORE), otwierany przy starcie serwera
+task_store: Optional[TaskStore] = None
+
+def _warm_worker(events=None, preload: bool = False):
+    """
+    Inicjalizator procesu puli – jednorazowy import stock_model, a z preload także bibliotek,
+    które stock_model ładuje leniwie (xgboost/sklearn/scipy/matplotlib/yfinance/pytrends)
+    """
+    global _worker_events
+    _worker_events = events
+    import stock_model
+    if preload:
+        stock_model.preload()
+
+def _ping_worker() -> int:
+    return os.getpid()
+
+def _create_analysis_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, initializer=_warm_worker,
+                               initargs=(event_queue, PRELOAD_ANALYSIS))
+
+def _forward_events(loop: asyncio.AbstractEventLoop):
+    """
+    Wątek serwera: przenosi zdarzenia z kolejki workerów do EventHub w pętli zdarzeń
+    """
+    while True:
+        event = event_queue.get()
+        if event is None:
+            return
+        loop.call_soon_threadsafe(event_hub.publish, event["task_id"], event)
+
+def _publish(task_id: str, event: str, **data):
+    # ta sama kolejka co zdarzenia workerów – "done" nie wyprzedzi ostatnich etapów analizy
+    event_queue.put({"event": event, "task_id": task_id, "time": time.time(), **data})
+
+async def open_task_store():
+    global task_store
+    task_store = create_task_store()
+    if RECOVER_UNFINISHED_TASKS:
+        _fail_unfinished(task_store)
+
+def _fail_unfinished(store: TaskStore):
+    interrupted = store.fail_unfinished("Zadanie przerwane przez restart serwera")
+    if interrupted:
+        logger.warning(f"⚠️ {interrupted} niedokończonych zadań oznaczono jako nieudane")
+
+async def start_analysis_pool():
+    """
+    Utwórz i rozgrzej pulę workerów analizy
+    """
+    global analysis_pool, event_queue
+    # SimpleQueue zapisuje do potoku synchronicznie: zdarzenia workera są w kolejce, zanim wróci jego wynik
+    event_queue = multiprocessing.SimpleQueue()
+    analysis_pool = _create_analysis_pool()
+
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=_forward_events, args=(loop,), name="task-events", daemon=True).start()
+    pids = await asyncio.gather(*[
+        loop.run_in_executor(analysis_pool, _ping_worker) for _ in range(ANALYSIS_WORKERS)
+    ])
+    logger.info(f"🔥 Pula analizy gotowa: {ANALYSIS_WORKERS} workerów (PID: {sorted(set(pids))})")
+
+async def stop_analysis_pool():
+    if analysis_pool is not None:
+        analysis_pool.shutdown(wait=False, cancel_futures=True)
+    if event_queue is not None:
+        event_queue.put(None)
 
 @app.get("/")
 async def root():
@@ -46,37 +253,72 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "stock-analysis"}
 
+@app.get("/queue")
+async def get_queue_stats():
+    """
+    Stan harmonogramu: zadania uruchomione i czekające (per priorytet), odrzucone oraz czasy oczekiwania
+    """
+    return scheduler.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metryki w formacie Prometheusa: histogramy etapów i zadań, kolejka, zadania, pamięć wyników
+    """
+    queue = scheduler.stats()
+    cache = result_cache.stats()
+    body = metrics.render(
+        metrics.snapshot("stock_queue_running", "Zadania uruchomione w puli", queue["running"]),
+        metrics.snapshot("stock_queue_waiting", "Zadania przyjęte, czekające na uruchomienie", queue["waiting"]),
+        metrics.snapshot("stock_queue_depth", "Zadania w kolejce harmonogramu według priorytetu",
+                         {(name,): queued["jobs"] for name, queued in queue["queued"].items()}, ("priority",)),
+        metrics.snapshot("stock_queue_oldest_wait_seconds", "Czas oczekiwania najstarszego zadania w kolejce",
+                         queue["oldest_wait_seconds"]),
+        metrics.snapshot("stock_queue_admitted_total", "Zadania przyjęte przez harmonogram", queue["admitted"],
+                         kind="counter"),
+        metrics.snapshot("stock_queue_rejected_total", "Żądania odrzucone (429) przy pełnej kolejce",
+                         queue["rejected"], kind="counter"),
+        metrics.snapshot("stock_tasks_stored", "Zadania w magazynie zadań", task_store.count()),
+        metrics.snapshot("stock_result_cache_entries", "Wyniki w pamięci wyników", cache["entries"]),
+        metrics.snapshot("stock_result_cache_bytes", "Rozmiar pamięci wyników (JSON)", cache["bytes"]),
+        metrics.snapshot("stock_result_cache_lookups_total", "Odczyty pamięci wyników według wyniku",
+                         {("hit",): cache["hits"], ("coalesced",): cache["coalesced"], ("miss",): cache["misses"]},
+                         ("result",), kind="counter"),
+        metrics.snapshot("stock_result_cache_evictions_total", "Wyniki usunięte z pamięci wyników",
+                         cache["evictions"], kind="counter"),
+        metrics.snapshot("stock_result_cache_hit_ratio", "Udział odczytów obsłużonych bez nowej analizy",
+                         cache["hit_ratio"]),
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/cache")
+async def get_cache_stats():
+    """
+    Statystyki pamięci wyników: wpisy, rozmiar, trafienia, chybienia, żądania połączone i usunięcia
+    """
+    return result_cache.stats()
+
 @app.post("/analyze", response_model=AnalysisResponse)
-async def run_analysis(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def run_analysis(request: AnalysisRequest, background_tasks: BackgroundTasks, http_request: Request):
     """
     Uruchom analizę giełdową w tle
     """
     try:
         # Walidacja parametrów
-        if request.test_size_pct < 0.05 or request.test_size_pct > 0.5:
-            raise HTTPException(
-                status_code=400,
-                detail="test_size_pct musi być między 0.05 a 0.5"
-            )
-
-        if request.forecast_days < 1 or request.forecast_days > 90:
-            raise HTTPException(
-                status_code=400,
-                detail="forecast_days musi być między 1 a 90"
-            )
+        validate_analysis_parameters(request.test_size_pct, request.forecast_days, request.simulations)
+        ticket = admit_job(http_request, request.priority, request.ticker)
 
         # Generuj ID zadania
-        task_id = f"{request.ticker}_{int(asyncio.get_event_loop().time())}"
+        task_id = new_task_id(request.ticker)
 
         logger.info(f"🚀 Tworzenie nowego zadania: {task_id}")
         logger.info(f"📊 Parametry: ticker={request.ticker}, start={request.start_date}, test_pct={request.test_size_pct}, forecast={request.forecast_days}")
 
         # Dodaj zadanie do śledzenia
-        active_tasks[task_id] = {
+        task_store.create(task_id, {
             "status": "running",
-            "parameters": request.dict(),
-            "logs": []
-        }
+            "parameters": request.dict()
+        })
 
         # Uruchom analizę w tle
         background_tasks.add_task(
@@ -86,7 +328,12 @@ async def run_analysis(request: AnalysisRequest, background_tasks: BackgroundTas
             request.trends,
             request.start_date,
             request.test_size_pct,
-            request.forecast_days
+            request.forecast_days,
+            request.forecast_only,
+            request.chart_preset,
+            request.forecast_mode,
+            request.simulations,
+            ticket
         )
 
         return AnalysisResponse(
@@ -95,50 +342,208 @@ async def run_analysis(request: AnalysisRequest, background_tasks: BackgroundTas
             task_id=task_id
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Błąd podczas uruchamiania analizy: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/batch", response_model=AnalysisResponse)
+async def run_batch_analysis(request: BatchAnalysisRequest, background_tasks: BackgroundTasks,
+                             http_request: Request):
+    """
+    Uruchom w tle analizę listy tickerów ze wspólnymi parametrami
+    """
+    validate_analysis_parameters(request.test_size_pct, request.forecast_days, request.simulations)
+
+    tickers = list(dict.fromkeys(request.tickers))
+    if not tickers or len(tickers) > MAX_BATCH_TICKERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"tickers musi zawierać od 1 do {MAX_BATCH_TICKERS} tickerów"
+        )
+
+    ticket = admit_job(http_request, request.priority, f"partia {len(tickers)} tickerów")
+    task_id = new_task_id("batch")
+    logger.info(f"🚀 Tworzenie zadania wsadowego {task_id} dla {len(tickers)} tickerów")
+
+    task_store.create(task_id, {
+        "status": "running",
+        "parameters": request.dict(),
+        "progress": {"total": len(tickers), "completed": 0, "failed": 0},
+        "tickers": {ticker: {"status": "queued"} for ticker in tickers}
+    })
+
+    background_tasks.add_task(run_batch_task, task_id, request, ticket)
+
+    return AnalysisResponse(
+        success=True,
+        message=f"Analiza wsadowa {len(tickers)} tickerów została uruchomiona w tle",
+        task_id=task_id
+    )
+
+def new_task_id(prefix: str) -> str:
+    """
+    Identyfikator zadania unikalny także między procesami serwera – prefiks (ticker albo "batch") dla czytelności logów
+    """
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+def admit_job(http_request: Request, priority: str, label: str) -> Ticket:
+    """
+    Miejsce w kolejce analiz albo 429 z Retry-After; wywołujący z nagłówka X-Caller-Id (np. id użytkownika z Laravela)
+    """
+    caller = http_request.headers.get("X-Caller-Id") or (http_request.client.host if http_request.client else "-")
+    try:
+        return scheduler.admit(caller, priority)
+    except SchedulerFull as e:
+        logger.warning(f"🚦 Odrzucono {label} ({caller}): {scheduler.waiting} zadań w kolejce")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def validate_analysis_parameters(test_size_pct: float, forecast_days: int, simulations: int = 0):
+    if test_size_pct < 0.05 or test_size_pct > 0.5:
+        raise HTTPException(
+            status_code=400,
+            detail="test_size_pct musi być między 0.05 a 0.5"
+        )
+
+    if forecast_days < 1 or forecast_days > 90:
+        raise HTTPException(
+            status_code=400,
+            detail="forecast_days musi być między 1 a 90"
+        )
+
+    if simulations < 0 or simulations > MAX_FORECAST_SIMULATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"simulations musi być między 0 a {MAX_FORECAST_SIMULATIONS}"
+        )
+
+def negotiate(http_request: Request, data: dict):
+    """
+    Odpowiedź jako MessagePack, gdy klient prosi o nią nagłówkiem Accept, inaczej zwykły JSON
+    """
+    if accepts_msgpack(http_request.headers.get("accept")):
+        return Response(pack(data), media_type=MSGPACK_TYPE)
+    return data
+
+def _field_paths(spec: Optional[str]) -> list[list[str]]:
+    return [path.strip().split('.') for path in (spec or "").split(',') if path.strip()]
+
+def select_fields(data: dict, fields: Optional[str] = None, exclude: Optional[str] = None) -> dict:
+    """
+    Wybór pól odpowiedzi: fields – tylko podane ścieżki, exclude – wszystko poza nimi.
+    Ścieżki oddzielane przecinkami, zagnieżdżenia kropką (np. "status,result.metrics", "result.forecast");
+    nieistniejące ścieżki są pomijane.
+    """
+    if fields:
+        selected = {}
+        for path in _field_paths(fields):
+            source, target = data, selected
+            for key in path[:-1]:
+                if not isinstance(source, dict) or not isinstance(source.get(key), dict):
+                    break
+                source = source[key]
+                target = target.setdefault(key, {})
+            else:
+                if isinstance(source, dict) and path[-1] in source:
+                    target[path[-1]] = source[path[-1]]
+        data = selected
+    for path in _field_paths(exclude):
+        target = data
+        for key in path[:-1]:
+            target = target.get(key) if isinstance(target, dict) else None
+        if isinstance(target, dict):
+            target.pop(path[-1], None)
+    return data
+
 @app.get("/analyze/{task_id}")
-async def get_analysis_status(task_id: str):
+async def get_analysis_status(task_id: str, http_request: Request, fields: Optional[str] = None,
+                              exclude: Optional[str] = None):
     """
-    Sprawdź status zadania analizy
+    Sprawdź status zadania analizy (logi dostępne stronami pod /analyze/{task_id}/logs).
+
+    fields / exclude ograniczają odpowiedź do wybranych pól – np. ?fields=status,result.metrics przy
+    odpytywaniu albo ?exclude=result.forecast,result.uploads.
     """
-    if task_id not in active_tasks:
+    task = task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Zadanie nie znalezione")
 
-    return active_tasks[task_id]
+    return negotiate(http_request, select_fields(task, fields, exclude))
 
 @app.get("/analyze/{task_id}/logs")
-async def get_analysis_logs(task_id: str):
+async def get_analysis_logs(task_id: str, http_request: Request, offset: int = Query(0, ge=0),
+                            limit: int = Query(200, ge=1, le=TASK_LOG_LIMIT)):
     """
-    Pobierz logi zadania analizy
+    Pobierz stronę logów zadania analizy – kolejną stronę czyta się od zwróconego next_offset
     """
-    if task_id not in active_tasks:
+    task = task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Zadanie nie znalezione")
 
-    return {
+    return negotiate(http_request, {
         "task_id": task_id,
-        "logs": active_tasks[task_id].get("logs", []),
-        "status": active_tasks[task_id].get("status", "unknown")
-    }
+        "status": task.get("status", "unknown"),
+        **task_store.read_logs(task_id, offset, limit)
+    })
+
+@app.get("/analyze/{task_id}/events")
+async def stream_analysis_events(task_id: str):
+    """
+    Server-Sent Events: snapshot stanu, potem na żywo etapy (stage_started / stage_finished),
+    metryki, linie logu i postęp wsadu – strumień kończy zdarzenie "done"
+    """
+    if task_store.get(task_id) is None:
+        raise HTTPException(status_code=404, detail="Zadanie nie znalezione")
+
+    events = event_hub.stream(task_id, lambda: task_store.get(task_id))
+    return StreamingResponse(
+        (format_sse(event) async for event in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/analyze/{task_id}/ws")
+async def stream_analysis_ws(websocket: WebSocket, task_id: str):
+    """
+    Te same zdarzenia co /analyze/{task_id}/events, jako wiadomości JSON przez WebSocket
+    """
+    await websocket.accept()
+    if task_store.get(task_id) is None:
+        await websocket.close(code=4404, reason="Zadanie nie znalezione")
+        return
+
+    try:
+        async for event in event_hub.stream(task_id, lambda: task_store.get(task_id)):
+            await websocket.send_json(event if event is not None else {"event": "keepalive"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
 
 @app.post("/analyze/sync", response_model=AnalysisResponse)
-async def run_analysis_sync(request: AnalysisRequest):
+async def run_analysis_sync(request: AnalysisRequest, http_request: Request):
     """
     Uruchom analizę synchronicznie (może trwać długo)
     """
+    validate_analysis_parameters(request.test_size_pct, request.forecast_days, request.simulations)
+    ticket = admit_job(http_request, request.priority, request.ticker)
     try:
         logger.info(f"🔄 Synchroniczne uruchomienie analizy dla {request.ticker}")
 
         # Uruchom analizę bezpośrednio
-        result = await run_analysis_subprocess(
+        result = await run_analysis_in_pool(
             request.ticker,
             request.trends,
             request.start_date,
             request.test_size_pct,
-            request.forecast_days
+            request.forecast_days,
+            request.forecast_only,
+            request.chart_preset,
+            request.forecast_mode,
+            request.simulations,
+            ticket=ticket
         )
+        metrics.TASKS.inc(kind="sync", status="completed" if result["success"] else "failed")
 
         if result["success"]:
             logger.info(f"✅ Synchroniczna analiza zakończona pomyślnie dla {request.ticker}")
@@ -156,8 +561,97 @@ async def run_analysis_sync(request: AnalysisRequest):
     except Exception as e:
         logger.error(f"❌ Błąd podczas synchronicznej analizy: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        scheduler.discard(ticket)
 
-async def run_analysis_task(task_id: str, ticker: str, trends: str, start_date: str, test_size_pct: float, forecast_days: int):
+@app.post("/backtest")
+async def run_backtest(request: BacktestRequest, http_request: Request):
+    """
+    Backtest walk-forward (synchronicznie): metryki per fold i łączne, bez wysyłki do Laravel API
+    """
+    validate_analysis_parameters(request.test_size_pct, 1)
+    if request.folds < 1 or request.folds > MAX_BACKTEST_FOLDS:
+        raise HTTPException(status_code=400, detail=f"folds musi być między 1 a {MAX_BACKTEST_FOLDS}")
+
+    ticket = admit_job(http_request, request.priority, f"backtest {request.ticker}")
+    logger.info(f"🧪 Backtest {request.ticker}: {request.folds} foldów, tryb {request.mode}")
+    params = request.dict(exclude={"priority"})
+    try:
+        result = await run_in_pool("run_backtest", params, request.ticker, ticket)
+    finally:
+        scheduler.discard(ticket)
+    result.pop("output", None)
+    metrics.TASKS.inc(kind="backtest", status="completed" if result["success"] else "failed")
+
+    if not result["success"]:
+        logger.error(f"❌ Backtest {request.ticker} zakończony z błędem: {result.get('error')}")
+        raise HTTPException(status_code=500, detail=f"Błąd backtestu: {result['error']}")
+    return negotiate(http_request, result)
+
+@app.post("/tune")
+async def run_tuning(request: TuneRequest, http_request: Request):
+    """
+    Strojenie hiperparametrów tickera (synchronicznie); najlepsza konfiguracja jest zapisywana
+    i używana przez kolejne analizy tego tickera
+    """
+    validate_analysis_parameters(request.test_size_pct, 1)
+    if request.trials < 1 or request.trials > MAX_TUNING_TRIALS:
+        raise HTTPException(status_code=400, detail=f"trials musi być między 1 a {MAX_TUNING_TRIALS}")
+
+    ticket = admit_job(http_request, request.priority, f"tune {request.ticker}")
+    logger.info(f"🎛️ Strojenie {request.ticker}: {request.trials} prób, tryb {request.search}")
+    params = request.dict(exclude={"priority"})
+    try:
+        result = await run_in_pool("run_tuning", params, request.ticker, ticket)
+    finally:
+        scheduler.discard(ticket)
+    result.pop("output", None)
+    metrics.TASKS.inc(kind="tune", status="completed" if result["success"] else "failed")
+
+    if not result["success"]:
+        logger.error(f"❌ Strojenie {request.ticker} zakończone z błędem: {result.get('error')}")
+        raise HTTPException(status_code=500, detail=f"Błąd strojenia: {result['error']}")
+    # zapamiętane wyniki analiz liczone były na poprzednich parametrach modelu
+    result_cache.clear()
+    return negotiate(http_request, result)
+
+@app.post("/sweep")
+async def run_sweep(request: SweepRequest, http_request: Request):
+    """
+    Siatka scenariuszy jednego tickera (synchronicznie): dane, cechy i modele liczone raz dla całej siatki,
+    wynik to porównanie metryk i prognoz wszystkich kombinacji, bez wysyłki do Laravel API
+    """
+    test_size_pcts = list(dict.fromkeys(request.test_size_pcts))
+    forecast_days = list(dict.fromkeys(request.forecast_days))
+    scenarios = len(test_size_pcts) * len(forecast_days)
+    if scenarios < 1 or scenarios > MAX_SWEEP_SCENARIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"siatka musi mieć od 1 do {MAX_SWEEP_SCENARIOS} scenariuszy (test_size_pcts × forecast_days)"
+        )
+    for test_size_pct in test_size_pcts:
+        for days in forecast_days:
+            validate_analysis_parameters(test_size_pct, days, request.simulations)
+
+    ticket = admit_job(http_request, request.priority, f"sweep {request.ticker}")
+    logger.info(f"🧮 Siatka {request.ticker}: {len(test_size_pcts)} × {len(forecast_days)} scenariuszy")
+    params = {**request.dict(exclude={"priority"}), "test_size_pcts": test_size_pcts, "forecast_days": forecast_days}
+    try:
+        result = await run_in_pool("run_sweep", params, request.ticker, ticket)
+    finally:
+        scheduler.discard(ticket)
+    result.pop("output", None)
+    metrics.TASKS.inc(kind="sweep", status="completed" if result["success"] else "failed")
+
+    if not result["success"]:
+        logger.error(f"❌ Siatka {request.ticker} zakończona z błędem: {result.get('error')}")
+        raise HTTPException(status_code=500, detail=f"Błąd siatki scenariuszy: {result['error']}")
+    return negotiate(http_request, result)
+
+async def run_analysis_task(task_id: str, ticker: str, trends: str, start_date: str, test_size_pct: float, forecast_days: int,
+                            forecast_only: bool = False, chart_preset: Optional[str] = None,
+                            forecast_mode: str = "recursive", simulations: int = 0,
+                            ticket: Optional[Ticket] = None):
     """
     Zadanie w tle do uruchomienia analizy
     """
@@ -165,127 +659,302 @@ async def run_analysis_task(task_id: str, ticker: str, trends: str, start_date:
         logger.info(f"🎯 Rozpoczęcie analizy {task_id} dla {ticker}")
 
         # Aktualizuj status
-        active_tasks[task_id]["status"] = "running"
-        active_tasks[task_id]["start_time"] = asyncio.get_event_loop().time()
-        active_tasks[task_id]["logs"].append(f"Rozpoczęcie analizy dla {ticker}")
+        task_store.update(task_id, status="running", start_time=time.time())
+        task_store.append_logs(task_id, [f"Rozpoczęcie analizy dla {ticker}"])
 
         # Uruchom analizę
-        result = await run_analysis_subprocess(ticker, trends, start_date, test_size_pct, forecast_days)
+        result = await run_analysis_in_pool(ticker, trends, start_date, test_size_pct, forecast_days, forecast_only,
+                                            chart_preset, forecast_mode, simulations, task_id=task_id,
+                                            ticket=ticket)
 
-        # Aktualizuj status końcowy
-        active_tasks[task_id]["status"] = "completed" if result["success"] else "failed"
-        active_tasks[task_id]["end_time"] = asyncio.get_event_loop().time()
-        active_tasks[task_id]["result"] = result
+        # Logi workera trafiają tylko do bufora logów zadania, nie drugi raz do wyniku
+        output = result.pop("output", "")
 
-        # Dodaj logi z subprocess do zadania
-        if "output" in result:
-            active_tasks[task_id]["logs"].extend(result["output"].split('\n'))
+        # Aktualizuj status końcowy
+        task_store.update(
+            task_id,
+            status="completed" if result["success"] else "failed",
+            end_time=time.time(),
+            result=result
+        )
+        task_store.append_logs(task_id, output.split('\n') if output else [])
+        _publish(task_id, DONE_EVENT, status="completed" if result["success"] else "failed",
+                 error=result.get("error"))
+        metrics.TASKS.inc(kind="analysis", status="completed" if result["success"] else "failed")
 
         logger.info(f"🏁 Analiza {task_id} zakończona: {result['success']}")
 
     except Exception as e:
         logger.error(f"💥 Błąd w zadaniu {task_id}: {e}")
-        active_tasks[task_id]["status"] = "failed"
-        active_tasks[task_id]["error"] = str(e)
-        active_tasks[task_id]["logs"].append(f"BŁĄD: {str(e)}")
-
-async def run_analysis_subprocess(ticker: str, trends: str, start_date: str, test_size_pct: float, forecast_days: int):
+        task_store.update(task_id, status="failed", error=str(e))
+        task_store.append_logs(task_id, [f"BŁĄD: {str(e)}"])
+        _publish(task_id, DONE_EVENT, status="failed", error=str(e))
+        metrics.TASKS.inc(kind="analysis", status="failed")
+    finally:
+        if ticket is not None:
+            scheduler.discard(ticket)
+
+async def run_batch_task(task_id: str, request: BatchAnalysisRequest, ticket: Ticket):
     """
-    Uruchom skrypt analizy jako subprocess z lepszym loggingiem
+    Zadanie wsadowe: wspólne przygotowanie danych, potem równoległe modele per ticker.
+
+    prepare_batch zostawia notowania, Google Trends i cechy w magazynach workerów i zwraca same tickery –
+    ramki nie wracają do serwera ani nie są wysyłane z powrotem do puli; analizy tickerów idą przez
+    pamięć wyników jak pojedyncze /analyze.
     """
+    # lokalna kopia stanu – postęp aktualizuje tylko to zadanie, do magazynu zapisywane są zmiany
+    task = task_store.get(task_id)
+    task_store.update(task_id, start_time=time.time())
+
     try:
-        logger.info(f"🔧 Przygotowywanie subprocess dla {ticker}")
-
-        # Przygotuj komendę
-        cmd = [
-            "python", "/app/stock_model.py",
-            "--ticker", ticker,
-            "--trends", trends,
-            "--start_date", start_date,
-            "--test_size_pct", str(test_size_pct),
-            "--forecast_days", str(forecast_days)
-        ]
-
-        logger.info(f"📝 Komenda: {' '.join(cmd)}")
-
-        # Uruchom subprocess z przekierowaniem stdout/stderr
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,  # Przekieruj stderr do stdout
-            cwd="/app",
-            env={**os.environ, "PYTHONUNBUFFERED": "1"}  # Wymuś unbuffered output
-        )
+        prepared = await run_in_pool("prepare_batch", {
+            "tickers": list(task["tickers"]),
+            "trends": request.trends,
+            "start_date": request.start_date
+        }, task_id, ticket, task_id=task_id)
+        task_store.append_logs(task_id, prepared.pop("output").split('\n'))
+
+        if "tickers" not in prepared:
+            raise RuntimeError(prepared.get("error", "Przygotowanie danych nie powiodło się"))
+
+        for ticker, error in prepared["errors"].items():
+            _finish_batch_ticker(task_id, task, ticker, {"success": False, "error": error})
+
+        async def analyze_ticker(ticker: str):
+            # kolejne kroki już przyjętej partii nie podlegają limitowi kolejki
+            ticker_ticket = scheduler.admit(ticket.caller, ticket.priority, bounded=False)
+            result = await run_analysis_in_pool(
+                ticker, request.trends.get(ticker), request.start_date, request.test_size_pct,
+                request.forecast_days, request.forecast_only, request.chart_preset, request.forecast_mode,
+                request.simulations, task_id=task_id, ticket=ticker_ticket, func_name="run_prepared"
+            )
+            _finish_batch_ticker(task_id, task, ticker, result)
 
-        logger.info(f"🚀 Subprocess uruchomiony z PID: {process.pid}")
+        await asyncio.gather(*[analyze_ticker(ticker) for ticker in prepared["tickers"]])
 
-        # Czytaj output w czasie rzeczywistym
-        output_lines = []
-        while True:
-            try:
-                line = await asyncio.wait_for(process.stdout.readline(), timeout=1.0)
-                if not line:
-                    break
+        progress = task["progress"]
+        task_store.update(task_id, status="completed" if progress["completed"] else "failed")
+        logger.info(f"🏁 Zadanie wsadowe {task_id} zakończone: {progress}")
 
-                line_str = line.decode().strip()
-                if line_str:
-                    output_lines.append(line_str)
-                    logger.info(f"📄 [{ticker}] {line_str}")
+    except Exception as e:
+        logger.error(f"💥 Błąd w zadaniu wsadowym {task_id}: {e}")
+        task_store.update(task_id, status="failed", error=str(e))
+        task_store.append_logs(task_id, [f"BŁĄD: {str(e)}"])
+    finally:
+        scheduler.discard(ticket)
+        task_store.update(task_id, end_time=time.time())
+        task = task_store.get(task_id) or {}
+        _publish(task_id, DONE_EVENT, status=task.get("status"), progress=task.get("progress"),
+                 error=task.get("error"))
+        metrics.TASKS.inc(kind="batch", status=task.get("status", "failed"))
+
+def _finish_batch_ticker(task_id: str, task: dict, ticker: str, result: dict):
+    task["tickers"][ticker] = {
+        "status": "completed" if result["success"] else "failed",
+        **{key: result[key] for key in ("uuid", "metrics", "forecast", "error") if key in result}
+    }
+    task["progress"]["completed" if result["success"] else "failed"] += 1
+    task_store.update(task_id, tickers=task["tickers"], progress=task["progress"])
+    _publish(task_id, "ticker_finished", ticker=ticker, status=task["tickers"][ticker]["status"],
+             progress=task["progress"], error=result.get("error"))
+    task_store.append_logs(task_id, [f"[{ticker}] {line}" for line in result.get("output", "").split('\n') if line])
 
-            except asyncio.TimeoutError:
-                # Sprawdź czy proces jeszcze działa
-                if process.returncode is not None:
-                    break
-                continue
+class _StreamedOutput(io.StringIO):
+    """
+    stdout workera: zbierany w całości jak dotąd, a każda pełna linia wysyłana od razu jako zdarzenie "log"
+    """
 
-        # Czekaj na zakończenie procesu
-        await process.wait()
+    def __init__(self):
+        super().__init__()
+        self._pending = ""
 
-        full_output = '\n'.join(output_lines)
+    def write(self, text: str) -> int:
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                progress.emit("log", line=line)
+        return super().write(text)
 
-        logger.info(f"🔚 Subprocess zakończony z kodem: {process.returncode}")
+def _pipeline_worker(func_name: str, params: dict, task_id: Optional[str] = None,
+                     n_jobs: Optional[int] = None) -> dict:
+    """
+    Uruchamiane w procesie puli: wywołuje funkcję stock_model i zbiera jej stdout jako log zadania.
 
-        # Sprawdź kod wyjścia
-        if process.returncode == 0:
-            logger.info(f"✅ Analiza {ticker} zakończona pomyślnie")
-            return {
-                "success": True,
-                "output": full_output,
-                "ticker": ticker,
-                "return_code": process.returncode
-            }
-        else:
-            logger.error(f"❌ Analiza {ticker} zakończona z błędem (kod: {process.returncode})")
-            return {
-                "success": False,
-                "error": f"Process exited with code {process.returncode}",
-                "output": full_output,
-                "ticker": ticker,
-                "return_code": process.returncode
-            }
-
-    except asyncio.TimeoutError:
-        logger.error(f"⏰ Timeout analizy dla {ticker}")
-        return {
-            "success": False,
-            "error": "Analiza przekroczyła limit czasu (10 minut)",
-            "ticker": ticker
-        }
+    Dla zadań z task_id zdarzenia postępu (etapy, metryki, linie logu) trafiają na bieżąco do serwera.
+    n_jobs to udział zadania w rdzeniach, przekazywany do XGBoost.
+    """
+    import stock_model
+
+    sink = None
+    if task_id is not None and _worker_events is not None:
+        channel = {"task_id": task_id, "ticker": params.get("ticker")}
+        sink = lambda event: _worker_events.put({**channel, **event})
+    previous_sink = progress.set_sink(sink)
+    previous_n_jobs = stock_model.set_n_jobs(n_jobs)
+
+    buffer = _StreamedOutput()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            try:
+                result = getattr(stock_model, func_name)(**params)
+            except Exception as e:
+                traceback.print_exc(file=buffer)
+                result = {"success": False, "error": str(e)}
+    finally:
+        progress.set_sink(previous_sink)
+        stock_model.set_n_jobs(previous_n_jobs)
+
+    result["output"] = buffer.getvalue().strip()
+    return result
+
+async def run_in_pool(func_name: str, params: dict, label: str, ticket: Ticket,
+                      task_id: Optional[str] = None) -> dict:
+    """
+    Wykonaj funkcję stock_model w rozgrzanej puli procesów (bez startu nowego interpretera),
+    gdy harmonogram dopuści zadanie z biletem `ticket`
+    """
+    global analysis_pool
+    pool = analysis_pool
+
+    async def job(n_jobs: int) -> dict:
+        nonlocal pool
+        pool = analysis_pool
+        metrics.JOB_WAIT_SECONDS.observe(ticket.wait_seconds, function=func_name)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(pool, _pipeline_worker, func_name, params, task_id, n_jobs)
+        finally:
+            metrics.JOB_SECONDS.observe(time.perf_counter() - start, function=func_name)
+
+    try:
+        result = await scheduler.run(ticket, job)
+        result["queue_seconds"] = round(ticket.wait_seconds, 3)
+        metrics.observe_timings(result.get("timings"))
+
+        for line_str in result["output"].split('\n'):
+            if line_str.strip():
+                logger.info(f"📄 [{label}] {line_str.strip()}")
+        return result
+
+    except BrokenProcessPool as e:
+        # Worker padł (np. OOM) – odtwórz pulę, żeby kolejne zadania mogły ruszyć
+        logger.error(f"💥 Pula workerów uszkodzona podczas zadania {label}: {e}")
+        if analysis_pool is pool:
+            analysis_pool = _create_analysis_pool()
+        return {"success": False, "error": "Proces analizy zakończył się nieoczekiwanie"}
     except Exception as e:
-        logger.error(f"💥 Wyjątek podczas analizy {ticker}: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "ticker": ticker
-        }
+        logger.error(f"💥 Wyjątek podczas zadania {label}: {e}")
+        return {"success": False, "error": str(e)}
 
-if __name__ == "__main__":
+def _last_bar(ticker: str, start_date: str) -> Optional[str]:
+    """
+    Data ostatniego baru tickera z podsumowania magazynu notowań – bez zapytań do dostawcy i bez pandas;
+    notowania pobiera i zapisuje wyłącznie worker.
+
+    None, gdy magazyn nie był odświeżany od RESULT_CACHE_DATA_TTL sekund albo nie obejmuje start_date –
+    wynik nie jest wtedy ani szukany, ani zapisywany w pamięci.
+    """
+    return fresh_last_bar(ticker, start_date, RESULT_CACHE_DATA_TTL)
+
+async def run_analysis_in_pool(ticker: str, trends: str, start_date: str, test_size_pct: float, forecast_days: int,
+                               forecast_only: bool = False, chart_preset: Optional[str] = None,
+                               forecast_mode: str = "recursive", simulations: int = 0,
+                               task_id: Optional[str] = None,
+                               ticket: Optional[Ticket] = None, func_name: str = "run_pipeline"):
+    """
+    Uruchom analizę jednego tickera w puli procesów; bez biletu z admit_job zadanie nie podlega limitowi kolejki.
+
+    func_name to funkcja stock_model o parametrach run_pipeline – run_prepared dla tickerów partii, których
+    dane przygotował prepare_batch. Obie dają ten sam wynik, więc dzielą pamięć wyników.
+    """
+    ticket = ticket or scheduler.admit("internal", bounded=False)
+    params = {
+        "ticker": ticker,
+        "trends": trends,
+        "start_date": start_date,
+        "test_size_pct": test_size_pct,
+        "forecast_days": forecast_days,
+        "forecast_only": forecast_only,
+        "chart_preset": chart_preset,
+        "forecast_mode": forecast_mode,
+        "simulations": simulations
+    }
+
+    last_bar = _last_bar(ticker, start_date)
+    if last_bar is None:
+        logger.info(f"🔧 Przekazanie analizy {ticker} do puli workerów")
+        result = await run_in_pool(func_name, params, ticker, ticket, task_id=task_id)
+        # worker właśnie odświeżył magazyn notowań – kolejne takie żądanie trafi już w pamięć wyników
+        last_bar = _last_bar(ticker, start_date)
+        if result.get("success") and last_bar is not None:
+            result_cache.put(request_key(params, last_bar), result)
+    else:
+        async def compute():
+            logger.info(f"🔧 Przekazanie analizy {ticker} do puli workerów (dane do {last_bar})")
+            return await run_in_pool(func_name, params, ticker, ticket, task_id=task_id)
+
+        result, source = await result_cache.get_or_compute(request_key(params, last_bar), compute)
+        result["cache"] = source
+        if source != "miss":
+            scheduler.discard(ticket)
+            logger.info(f"📦 Analiza {ticker} z pamięci wyników ({source}, dane do {last_bar})")
+            result["output"] = (f"📦 Wynik z pamięci wyników ({source}): dane do {last_bar}, "
+                                f"sesja {result.get('uuid')}")
+            if task_id is not None:
+                _publish(task_id, "cache", ticker=ticker, source=source, last_bar=last_bar)
+    result.setdefault("ticker", ticker)
+
+    if result["success"]:
+        logger.info(f"✅ Analiza {ticker} zakończona pomyślnie")
+    else:
+        logger.error(f"❌ Analiza {ticker} zakończona z błędem: {result.get('error')}")
+    return result
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Stock Analysis API server')
+    parser.add_argument('--mode', type=str, default=APP_MODE, choices=APP_MODES,
+                        help='development: one process reloaded on code changes; '
+                             'production: --workers uvicorn processes without the reloader')
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='Bind address')
+    parser.add_argument('--port', type=int, default=8000, help='Bind port')
+    parser.add_argument('--workers', type=int, default=WEB_WORKERS,
+                        help='Uvicorn worker processes in production mode, each with its own analysis pool, queue, '
+                             'result cache, progress events and metrics (keep 1 unless that is acceptable)')
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction, default=PRELOAD_ANALYSIS,
+                        help='Import XGBoost, scikit-learn, SciPy and matplotlib in the analysis pool at startup '
+                             'instead of in the first job')
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
     import uvicorn
-    logger.info("🌟 Uruchamianie FastAPI server")
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+
+    # uvicorn importuje "app:app" od nowa (a workery w nowych procesach) – ustawienia idą przez zmienne środowiska
+    os.environ["PRELOAD_ANALYSIS"] = "1" if args.preload else "0"
+    if args.mode == "development":
+        logger.info("🌟 Uruchamianie FastAPI server (development, przeładowanie kodu)")
+        uvicorn.run("app:app", host=args.host, port=args.port, reload=True, log_level="info")
+        return 0
+
+    workers = max(1, args.workers)
+    # workery importują app od nowa – liczba workerów potrzebna jest im do podziału rdzeni (n_jobs)
+    os.environ["WEB_WORKERS"] = str(workers)
+    if workers > 1:
+        if TASK_STORE == "memory":
+            logger.error("❌ TASK_STORE=memory nie działa z wieloma workerami – stan zadań byłby w każdym inny")
+            return 2
+        logger.warning(f"⚠️ {workers} workerów: kolejka, cache wyników, zdarzenia postępu i /metrics są osobne "
+                       "w każdym z nich")
+        # zadania z SQLite są wspólne dla workerów: odzyskiwanie raz, przed startem któregokolwiek z nich
+        if RECOVER_UNFINISHED_TASKS:
+            _fail_unfinished(create_task_store())
+        os.environ["RECOVER_UNFINISHED_TASKS"] = "0"
+    logger.info(f"🌟 Uruchamianie FastAPI server (production, {workers} workerów × {ANALYSIS_WORKERS} procesów "
+                f"analizy, preload {'tak' if args.preload else 'nie'})")
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=workers, reload=False, log_level="info")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Backtest walk-forward – N kolejnych okresów testowych, foldy trenowane równolegle na jednej macierzy cech
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKTEST_FOLDS = int(os.getenv("BACKTEST_FOLDS", "5"))
+# liczba foldów trenowanych jednocześnie; rdzenie dzielone są po równo między foldy (n_jobs XGBoost)
+BACKTEST_JOBS = int(os.getenv("BACKTEST_JOBS", "0")) or os.cpu_count() or 1
+
+BACKTEST_MODES = ('expanding', 'rolling')
+
+
+def walk_forward_splits(n_rows: int, folds: int, test_size_pct: float,
+                        mode: str = 'expanding') -> list[tuple[slice, slice]]:
+    """
+    Podział ostatnich test_size_pct wierszy na `folds` kolejnych bloków testowych.
+
+    expanding – fold trenuje na wszystkim przed swoim blokiem (folds=1 to dokładnie split_train_test),
+    rolling – na oknie o stałej długości, równej zbiorowi treningowemu pierwszego foldu.
+    """
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"Nieznany tryb backtestu: {mode} (dostępne: {', '.join(BACKTEST_MODES)})")
+    if folds < 1:
+        raise ValueError("Liczba foldów musi być dodatnia")
+
+    first_test = int(n_rows * (1 - test_size_pct))
+    bounds = np.linspace(first_test, n_rows, folds + 1).astype(int)
+    if first_test < 1 or np.any(np.diff(bounds) < 1):
+        raise ValueError(f"Za mało danych ({n_rows} wierszy) na {folds} foldów przy test_size_pct={test_size_pct}")
+
+    splits = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        train_start = 0 if mode == 'expanding' else start - first_test
+        splits.append((slice(int(train_start), int(start)), slice(int(start), int(stop))))
+    return splits
+
+
+def _fold_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    return {
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        # punkt odniesienia: prognoza zerowej stopy zwrotu
+        "baseline_mae": float(np.mean(np.abs(y_true))),
+        "direction_hit": float(np.mean(np.sign(y_true) == np.sign(y_pred)))
+    }
+
+
+def walk_forward(data: pd.DataFrame, params: dict, folds: int = BACKTEST_FOLDS, test_size_pct: float = 0.15,
+                 mode: str = 'expanding', jobs: int = BACKTEST_JOBS, cores: int | None = None) -> dict:
+    """
+    Backtest na gotowej macierzy z make_features.
+
+    Cechy z make_features są już jednym buforem float32 (XGBoost i tak pracuje na float32), a foldy
+    dostają jego widoki bez kopiowania. Predykcja obejmuje cały blok testowy foldu jednym wywołaniem.
+    Foldy trenowane są w wątkach – XGBoost zwalnia GIL, a wątki współdzielą macierz;
+    `cores` (domyślnie wszystkie) dzielone są po równo między równoległe foldy.
+    """
+    from xgboost import XGBRegressor
+
+    # 'target' jest ostatnią kolumną make_features
+    X = data.iloc[:, :-1].to_numpy(dtype=np.float32)
+    y = data.iloc[:, -1].to_numpy(dtype=np.float32)
+    splits = walk_forward_splits(len(data), folds, test_size_pct, mode)
+
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(jobs, len(splits), cores))
+    threads_per_fold = max(1, cores // workers)
+
+    def fit_fold(train: slice, test: slice) -> dict:
+        start = time.perf_counter()
+        model = XGBRegressor(**{**params, "n_jobs": threads_per_fold})
+        model.fit(X[train], y[train])
+        fitted = time.perf_counter()
+        y_pred = model.predict(X[test])
+        return {
+            "train_from": f"{data.index[train.start]:%Y-%m-%d}",
+            "train_to": f"{data.index[train.stop - 1]:%Y-%m-%d}",
+            "test_from": f"{data.index[test.start]:%Y-%m-%d}",
+            "test_to": f"{data.index[test.stop - 1]:%Y-%m-%d}",
+            "train_size": train.stop - train.start,
+            "test_size": test.stop - test.start,
+            **_fold_metrics(y[test], y_pred),
+            "fit_seconds": round(fitted - start, 4),
+            "predict_seconds": round(time.perf_counter() - fitted, 4),
+            "y_pred": y_pred
+        }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda split: fit_fold(*split), splits))
+
+    # metryki łączne liczone na wszystkich predykcjach poza próbą, nie jako średnia foldów
+    y_pred = np.concatenate([result.pop("y_pred") for result in results])
+    y_true = y[splits[0][1].start:]
+    return {
+        "mode": mode,
+        "folds": results,
+        "summary": {
+            **_fold_metrics(y_true, y_pred),
+            "folds": len(results),
+            "test_size": len(y_true),
+            "mae_std": float(np.std([result["mae"] for result in results])),
+            "jobs": workers,
+            "threads_per_fold": threads_per_fold,
+            "seconds": round(time.perf_counter() - start, 4)
+        }
+    }
@@ -0,0 +1,573 @@
+"""
+Benchmark pipeline'u analizy offline – syntetyczne notowania, atrapy Yahoo / Google Trends / Laravel,
+czas, pamięć i przepustowość etapów zapisywane do JSON-a i porównywane z wynikiem poprzedniego commita
+
+    python benchmark.py --bars 1000,10000,100000 --output before.json
+    python benchmark.py --bars 1000,10000,100000 --baseline before.json
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+from datetime import datetime, timezone
+import gc
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from laravel_stub import LaravelStub
+from progress import collect, stage
+
+BENCHMARK_BARS = (1000, 10000, 100000)
+BENCHMARK_TICKER = 'BENCH-USD'
+# profil pamięci ścieżki danych: 10 lat dziennych barów
+MEMORY_PROFILE_BARS = 3653
+
+# etapy, których regres przerywa porównanie z bazą (pętla prognozy, symulacja Monte Carlo, cechy, trening)
+GATED_STAGES = ('features', 'fit', 'forecast', 'forecast_direct', 'simulate')
+# dopuszczalny wzrost czasu etapu względem bazy
+MAX_REGRESSION = 0.25
+# różnice poniżej tego progu [s] to szum pomiaru, nie regres
+MIN_GATED_SECONDS = 0.005
+
+# jednostka przepustowości etapu
+UNITS = {
+    'download': 'bars', 'trends': 'days', 'features': 'bars', 'fit': 'rows', 'predict': 'rows',
+    'forecast': 'steps', 'plot': 'charts', 'upload': 'bars', 'post': 'bytes',
+    'upload:prices': 'bars', 'upload:chart': 'charts', 'upload:forecast': 'steps',
+    'fit:direct': 'rows', 'fit_direct': 'rows', 'forecast:recursive': 'steps', 'forecast:direct': 'steps',
+    'forecast_direct': 'steps', 'simulate': 'path-steps'
+}
+# ścieżki Monte Carlo w etapie simulate (pasma prognozy)
+BENCHMARK_SIMULATIONS = 1000
+
+# pomiary startu w świeżym interpreterze – import modułów, --help CLI i gotowość serwera API
+# (import app i zdarzenia startowe, w tym rozgrzanie puli analizy z preload i bez)
+STARTUP_PROBES = {
+    "interpreter": ("wall", ["-c", "pass"]),
+    "import_stock_model": ("statement", "import stock_model"),
+    "preload": ("statement", "stock_model.preload()"),
+    "cli_help": ("wall", ["stock_model.py", "--help"]),
+    "import_app": ("statement", "import app"),
+    "app_startup": ("statement", "asyncio.run(app.app.router.startup())"),
+    "app_startup_lazy": ("statement", "asyncio.run(app.app.router.startup())"),
+}
+# kod przygotowujący pomiar instrukcji (poza mierzonym czasem)
+STARTUP_SETUP = {
+    "preload": "import stock_model",
+    "app_startup": "import asyncio, app",
+    "app_startup_lazy": "import asyncio, app",
+}
+# etapy startu, których regres przerywa porównanie z bazą
+GATED_STARTUP = ('import_stock_model', 'cli_help', 'import_app')
+
+
+def synthetic_prices(bars: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Notowania OHLCV w formacie yf.download (płaskie kolumny), dzienne, kończące się dzisiaj.
+
+    Dzienny kalendarz (jak krypto) zgadza się z kalendarzem Google Trends, więc po merge_trends
+    liczba barów jest dokładnie taka, o jaką proszono.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=bars, freq='D', name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars))
+    return pd.DataFrame({
+        'Adj Close': close,
+        'Close': close,
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Open': np.r_[close[0], close[:-1]],
+        'Volume': rng.normal(3e6, 5e5, bars).round()
+    }, index=index)
+
+
+def synthetic_trends(term: str, start: str, end: str) -> pd.DataFrame:
+    """
+    Zamiennik fetch_pytrends: deterministyczna dzienna seria 0..100 dla frazy i zakresu
+    """
+    index = pd.date_range(start, end, freq='D')
+    rng = np.random.default_rng(zlib.crc32(f"{term}:{start}".encode()))
+    return pd.DataFrame({f'gt_{term}': rng.integers(10, 100, len(index)).astype(float)}, index=index)
+
+
+def _summary(samples: list[dict], items: int, unit: str) -> dict:
+    seconds = [sample["seconds"] for sample in samples]
+    median = statistics.median(seconds)
+    return {
+        "seconds": round(median, 4),
+        "seconds_min": round(min(seconds), 4),
+        "seconds_max": round(max(seconds), 4),
+        "peak_rss_mb": max(sample["peak_rss_mb"] for sample in samples),
+        "rss_mb": max(sample["rss_mb"] for sample in samples),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / median, 1) if median > 0 else None
+    }
+
+
+class OfflineBench:
+    """
+    Uruchamia stock_model na syntetycznych danych bez sieci.
+
+    Każde powtórzenie dostaje świeże katalogi magazynu notowań, cache Trends, magazynu cech, rejestru modeli
+    i stanu wysyłki, więc mierzona jest zawsze ta sama ścieżka: pełne pobranie, pełne przeliczenie cech,
+    pełny trening i wysyłka wszystkich barów.
+    """
+
+    def __init__(self, root: str, forecast_days: int, test_size_pct: float, chart_preset: str,
+                 repeat: int, seed: int, verbose: bool = False, forecast_mode: str = 'recursive',
+                 simulations: int = BENCHMARK_SIMULATIONS):
+        self.root = root
+        self.forecast_days = forecast_days
+        self.forecast_mode = forecast_mode
+        self.simulations = simulations
+        self.test_size_pct = test_size_pct
+        self.chart_preset = chart_preset
+        self.repeat = repeat
+        self.seed = seed
+        self.verbose = verbose
+        self.stub = LaravelStub().start()
+        # adresy Laravel API i katalogi cache stock_model czyta przy imporcie – muszą być ustawione wcześniej
+        os.environ["API_BASE_URL"] = self.stub.url
+        for name in ("MARKET_DATA_CACHE_DIR", "TRENDS_CACHE_DIR", "FEATURE_STORE_DIR", "MODEL_REGISTRY_DIR",
+                     "UPLOAD_STATE_DIR"):
+            os.environ[name] = os.path.join(root, "default", name.lower())
+        import stock_model
+
+        self.sm = stock_model
+        self._runs = 0
+
+    def close(self):
+        self.stub.stop()
+
+    def _fresh_state(self, frames: dict[str, pd.DataFrame]):
+        from feature_store import FeatureStore
+        from laravel_client import LaravelClient
+        from market_data import FixtureProvider, MarketDataStore
+        from model_registry import ModelRegistry
+        from trends_cache import TrendsCache
+
+        self._runs += 1
+        run_dir = os.path.join(self.root, f"run{self._runs}")
+        self.sm._market_store = MarketDataStore(os.path.join(run_dir, "prices"), FixtureProvider(frames))
+        self.sm._trends_cache = TrendsCache(os.path.join(run_dir, "trends"), fetcher=synthetic_trends)
+        self.sm._feature_store = FeatureStore(os.path.join(run_dir, "features"))
+        self.sm._model_registry = ModelRegistry(os.path.join(run_dir, "models"))
+        self.sm._laravel_client = LaravelClient(state_dir=os.path.join(run_dir, "uploads"))
+        # odebrane payloady atrapy rosłyby z każdym powtórzeniem i zaburzały pomiar pamięci
+        self.stub.received.clear()
+
+    def _quiet(self):
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def run_size(self, bars: int) -> dict:
+        frames = {BENCHMARK_TICKER: synthetic_prices(bars, self.seed)}
+        start_date = f"{frames[BENCHMARK_TICKER].index[0]:%Y-%m-%d}"
+        pipeline = self._pipeline(frames, start_date)
+        stages, shape = self._stages(frames, start_date)
+        return {"bars": bars, **shape, "pipeline": pipeline, "stages": stages}
+
+    def _pipeline(self, frames: dict[str, pd.DataFrame], start_date: str) -> dict:
+        """
+        Pełne run_pipeline; etapy z result["timings"], ten sam etap w jednym przebiegu (np. POST-y) sumowany
+        """
+        walls, per_stage, items = [], {}, {}
+        for _ in range(self.repeat):
+            self._fresh_state(frames)
+            start = time.perf_counter()
+            with self._quiet():
+                result = self.sm.run_pipeline(ticker=BENCHMARK_TICKER, start_date=start_date,
+                                              test_size_pct=self.test_size_pct, forecast_days=self.forecast_days,
+                                              chart_preset=self.chart_preset, forecast_mode=self.forecast_mode)
+            seconds = time.perf_counter() - start
+            if not result["success"]:
+                raise RuntimeError(f"run_pipeline nie powiodło się: {result.get('error')}")
+            timings = result["timings"]
+            walls.append({"seconds": seconds, "peak_rss_mb": max(record["peak_rss_mb"] for record in timings),
+                          "rss_mb": timings[-1]["rss_mb"]})
+
+            merged = {}
+            for record in timings:
+                name = record["stage"] if "target" not in record else f"{record['stage']}:{record['target']}"
+                sample = merged.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0, "rss_mb": 0.0, "items": 0})
+                sample["seconds"] += record["seconds"]
+                sample["peak_rss_mb"] = max(sample["peak_rss_mb"], record["peak_rss_mb"])
+                sample["rss_mb"] = max(sample["rss_mb"], record["rss_mb"])
+                sample["items"] += record.get("bytes", 0)
+            for name, sample in merged.items():
+                per_stage.setdefault(name, []).append(sample)
+                items[name] = sample["items"] or self._items(name, result, frames)
+
+        return {
+            **_summary(walls, len(next(iter(frames.values()))), "bars"),
+            "stages": {
+                name: _summary(samples, items[name], UNITS.get(name, 'items'))
+                for name, samples in per_stage.items()
+            }
+        }
+
+    def _items(self, name: str, result: dict, frames: dict[str, pd.DataFrame]) -> int:
+        bars = len(next(iter(frames.values())))
+        return {
+            "fit": result["metrics"]["train_size"],
+            "fit:direct": result["metrics"]["train_size"],
+            "predict": result["metrics"]["test_size"],
+            "forecast:recursive": self.forecast_days,
+            "forecast:direct": self.forecast_days,
+            "plot": 1,
+            "upload:chart": 1,
+            "upload:forecast": self.forecast_days
+        }.get(name, bars)
+
+    def _stages(self, frames: dict[str, pd.DataFrame], start_date: str) -> tuple[dict, dict]:
+        """
+        Etapy osobno na tych samych danych – bez wpływu pozostałych etapów na pamięć i cache procesora
+        """
+        sm = self.sm
+        self._fresh_state(frames)
+        with self._quiet():
+            raw = sm.download_prices(BENCHMARK_TICKER, start_date)
+            btc = sm.merge_trends(sm.prepare_prices(raw), sm.fetch_google_trends(BENCHMARK_TICKER, None, start_date),
+                                  BENCHMARK_TICKER)
+        data = sm.make_features(btc)
+        X_train, y_train, X_test, y_test = sm.split_train_test(data, self.test_size_pct)
+        model = sm.train_model(X_train, y_train)
+        y_pred = model.predict(X_test)
+
+        forecast = sm.forecast_prices(model, btc, self.forecast_days)
+
+        cases = {
+            "features": (lambda: sm.make_features(btc), len(btc)),
+            "fit": (lambda: sm.train_model(X_train, y_train), len(X_train)),
+            "predict": (lambda: model.predict(X_test), len(X_test)),
+            "forecast": (lambda: sm.forecast_prices(model, btc, self.forecast_days), self.forecast_days),
+            "plot": (lambda: sm.render_chart(btc, X_test, y_pred, forecast, BENCHMARK_TICKER, self.forecast_days,
+                                             self.chart_preset), 1),
+            "upload": (lambda: self._upload(sm, raw, frames), len(raw))
+        }
+        if self.simulations:
+            residuals = y_test.to_numpy(dtype=float) - y_pred
+            cases["simulate"] = (lambda: sm.forecast_bands(model, btc, self.forecast_days, residuals, self.simulations),
+                                 self.simulations * self.forecast_days)
+        if self.forecast_mode == 'direct':
+            # pełny trening modelu wielowyjściowego (świeży rejestr) i prognoza jednym predict
+            def fit_direct():
+                self._fresh_state(frames)
+                return sm.fit_direct_model(BENCHMARK_TICKER, btc, X_train, self.forecast_days)[0]
+
+            direct_model = fit_direct()
+            cases["fit_direct"] = (fit_direct, len(X_train))
+            cases["forecast_direct"] = (lambda: sm.forecast_direct(direct_model, btc, self.forecast_days),
+                                        self.forecast_days)
+        stages = {}
+        for name, (call, items) in cases.items():
+            samples = []
+            for _ in range(self.repeat):
+                with collect() as records, self._quiet():
+                    with stage(name):
+                        call()
+                samples.append(records[-1])
+            stages[name] = _summary(samples, items, UNITS[name])
+
+        shape = {"rows": len(data), "train_rows": len(X_train), "test_rows": len(X_test),
+                 "features": X_train.shape[1]}
+        return stages, shape
+
+    def _upload(self, sm, raw: pd.DataFrame, frames: dict[str, pd.DataFrame]):
+        # pusty stan wysyłki – za każdym razem wysyłane są wszystkie bary
+        self._fresh_state(frames)
+        report = sm.send_stock_data_to_api(raw, BENCHMARK_TICKER, "benchmark", {})
+        if not report["ok"]:
+            raise RuntimeError(f"Wysyłka notowań do atrapy nie powiodła się: {report['error']}")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> dict:
+    import matplotlib
+    import sklearn
+    import xgboost
+
+    return {
+        "commit": _git_commit(),
+        "time": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "xgboost": xgboost.__version__,
+            "scikit-learn": sklearn.__version__,
+            "matplotlib": matplotlib.__version__
+        }
+    }
+
+
+def legacy_data_path(raw: pd.DataFrame, gt: pd.DataFrame, test_size_pct: float) -> tuple:
+    """
+    Dawna, kopiująca ścieżka danych – punkt odniesienia profilu pamięci: kopie przy wyborze kolumn notowań,
+    concat z Google Trends, df.copy() z cechami float64 dokładanymi kolumna po kolumnie, dropna
+    i drop(columns=...) zbiorów treningowego i testowego. Zwraca to samo co compact_data_path.
+    """
+    from indicators import feature_matrix
+
+    prices = raw.copy()
+    btc = prices[['Close', 'Volume']].copy()
+    btc.columns = ['close', 'volume']
+    btc.index = btc.index.tz_localize(None)
+    btc = pd.concat([btc, gt], axis=1).ffill()
+
+    out = btc.copy()
+    trends_col = [col for col in out.columns if col.startswith('gt_')][0]
+    features = feature_matrix(out['close'].to_numpy(dtype=float), out['volume'].to_numpy(dtype=float),
+                              out[trends_col].to_numpy(dtype=float))
+    for name, values in features.items():
+        out[name] = values
+    data = out.dropna()
+
+    split_idx = int(len(data) * (1 - test_size_pct))
+    train, test = data.iloc[:split_idx], data.iloc[split_idx:]
+    X_train, y_train = train.drop(columns=['target']), train['target']
+    X_test, y_test = test.drop(columns=['target']), test['target']
+    return btc, *(np.asarray(values, dtype=np.float32) for values in (X_train, y_train, X_test, y_test))
+
+
+def compact_data_path(raw: pd.DataFrame, gt: pd.DataFrame, test_size_pct: float) -> tuple:
+    """
+    Obecna ścieżka danych: cechy w jednym buforze FEATURE_DTYPE, X i y jako jego widoki.
+    Zwraca (btc – historia dla prognozy, X_train, y_train, X_test, y_test jako float32 dla XGBoost).
+    """
+    import stock_model
+
+    btc = stock_model.merge_trends(stock_model.prepare_prices(raw), gt, BENCHMARK_TICKER)
+    data = stock_model.make_features(btc)
+    splits = stock_model.split_train_test(data, test_size_pct)
+    return btc, *(np.asarray(values, dtype=np.float32) for values in splits)
+
+
+DATA_PATHS = {"legacy": legacy_data_path, "compact": compact_data_path}
+
+
+def _profile_data_path(path: str, bars: int, seed: int, test_size_pct: float) -> dict:
+    """
+    Ścieżka danych od notowań do wejścia XGBoost – uruchamiana w osobnym procesie, żeby szczyt RSS
+    nie zależał od tego, co wcześniej robił benchmark. Trening pominięto: jest wspólny dla obu ścieżek,
+    a bufory XGBoost zagłuszałyby różnicę.
+    """
+    run = DATA_PATHS[path]
+    # rozgrzewka na krótkiej historii – leniwe importy (SciPy) i pierwsze alokacje pandas poza pomiarem
+    run(synthetic_prices(300, seed), synthetic_trends('bench', *_range(synthetic_prices(300, seed))), test_size_pct)
+    raw = synthetic_prices(bars, seed)
+    gt = synthetic_trends('bench', *_range(raw))
+    gc.collect()
+
+    tracemalloc.start()
+    with collect() as records:
+        with stage("baseline"):
+            pass
+        with stage("data_path"):
+            result = run(raw, gt, test_size_pct)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "path": path,
+        "train_rows": len(result[1]),
+        "traced_peak_mb": round(traced_peak / 2 ** 20, 3),
+        "peak_rss_delta_mb": round(records[1]["peak_rss_mb"] - records[0]["rss_mb"], 3),
+        "peak_rss_mb": records[1]["peak_rss_mb"]
+    }
+
+
+def _range(raw: pd.DataFrame) -> tuple[str, str]:
+    return f"{raw.index[0]:%Y-%m-%d}", f"{raw.index[-1]:%Y-%m-%d}"
+
+
+def memory_profile(bars: int = MEMORY_PROFILE_BARS, seed: int = 0, test_size_pct: float = 0.15) -> dict:
+    """
+    Porównanie pamięci dawnej (legacy_data_path) i obecnej (compact_data_path) ścieżki danych,
+    każda w świeżym procesie; reduction to ile mniej zajmuje ścieżka obecna
+    """
+    profiles = {}
+    context = multiprocessing.get_context('fork')
+    for path in DATA_PATHS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            profiles[path] = executor.submit(_profile_data_path, path, bars, seed, test_size_pct).result()
+    return {
+        "bars": bars,
+        **profiles,
+        "reduction": {
+            key: round(profiles['legacy'][key] - profiles['compact'][key], 3)
+            for key in ("traced_peak_mb", "peak_rss_delta_mb")
+        }
+    }
+
+
+def _startup_sample(name: str, env: dict) -> float:
+    kind, probe = STARTUP_PROBES[name]
+    here = os.path.dirname(os.path.abspath(__file__))
+    if kind == "wall":
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *probe], cwd=here, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    code = (f"import time\n{STARTUP_SETUP.get(name, '')}\nstart = time.perf_counter()\n{probe}\n"
+            f"print(time.perf_counter() - start)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=here, env=env, check=True, capture_output=True,
+                            text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def startup_profile(root: str, repeat: int) -> dict:
+    """
+    Czas startu (mediana z `repeat` świeżych interpreterów): import stock_model i app, preload bibliotek
+    ładowanych leniwie, `stock_model.py --help` oraz zdarzenia startowe serwera z rozgrzaniem puli analizy
+    """
+    env = {**os.environ, "TASK_STORE": "memory", "PYTHONWARNINGS": "ignore",
+           "MARKET_DATA_CACHE_DIR": os.path.join(root, "startup", "prices")}
+    profile = {}
+    for name in STARTUP_PROBES:
+        preload = "0" if name == "app_startup_lazy" else "1"
+        samples = [_startup_sample(name, {**env, "PRELOAD_ANALYSIS": preload}) for _ in range(repeat)]
+        profile[name] = {
+            "seconds": round(statistics.median(samples), 4),
+            "seconds_min": round(min(samples), 4),
+            "seconds_max": round(max(samples), 4)
+        }
+    return profile
+
+
+def compare(results: dict, baseline: dict, max_regression: float = MAX_REGRESSION) -> list[str]:
+    """
+    Porównuje izolowane etapy GATED_STAGES (dla wspólnych rozmiarów danych) i start GATED_STARTUP z bazą;
+    zwraca listę regresów
+    """
+    regressions = []
+
+    def check(label: str, name: str, before: float, now: float):
+        ratio = now / before if before > 0 else float('inf')
+        regressed = ratio > 1 + max_regression and now - before > MIN_GATED_SECONDS
+        print(f"{'❌' if regressed else '✅'} {label:>13}  {name:<18} {before:9.4f} s → {now:9.4f} s"
+              f"  ({ratio - 1:+.1%})")
+        if regressed:
+            regressions.append(f"{name} @ {label}: {before:.4f} s → {now:.4f} s ({ratio - 1:+.1%})")
+
+    for bars, run in results["runs"].items():
+        base = baseline.get("runs", {}).get(bars)
+        if base is None:
+            continue
+        for name in GATED_STAGES:
+            if name in run["stages"] and name in base["stages"]:
+                check(f"{bars} barów", name, base["stages"][name]["seconds"], run["stages"][name]["seconds"])
+
+    startup, base = results.get("startup", {}), baseline.get("startup", {})
+    for name in GATED_STARTUP:
+        if name in startup and name in base:
+            check("start", name, base[name]["seconds"], startup[name]["seconds"])
+    return regressions
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the stock analysis pipeline')
+    parser.add_argument('--bars', type=str, default=','.join(map(str, BENCHMARK_BARS)),
+                        help='Comma-separated history lengths to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (the median is reported)')
+    parser.add_argument('--forecast_days', type=int, default=20, help='Number of forecast days')
+    parser.add_argument('--test_size_pct', type=float, default=0.15, help='Test size percentage')
+    parser.add_argument('--chart_preset', type=str, default='png', help='Chart preset rendered in the plot stage')
+    parser.add_argument('--forecast_mode', type=str, default='recursive', choices=('recursive', 'direct'),
+                        help='Forecast mode of the pipeline run; direct also benchmarks fit_direct and forecast_direct')
+    parser.add_argument('--simulations', type=int, default=BENCHMARK_SIMULATIONS,
+                        help='Monte Carlo paths in the simulate stage (0 skips it)')
+    parser.add_argument('--n_jobs', type=int, default=None, help='XGBoost threads (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic prices')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Result JSON (default: benchmark-<commit>.json)')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Result JSON of an earlier commit; exit code 1 when a gated stage regressed')
+    parser.add_argument('--max_regression', type=float, default=MAX_REGRESSION,
+                        help=f'Allowed slowdown of {", ".join(GATED_STAGES)} against the baseline '
+                             f'(default {MAX_REGRESSION * 100:.0f}%%)')
+    parser.add_argument('--memory', action='store_true',
+                        help=f'Also profile memory of the data path ({MEMORY_PROFILE_BARS} daily bars, 10 years): '
+                             'the former copy-heavy float64 path against the compact float32 one')
+    parser.add_argument('--startup', action='store_true',
+                        help='Also measure startup in fresh interpreters: module imports, preload, CLI --help '
+                             'and API server startup with and without preloading')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline output')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    sizes = [int(value) for value in args.bars.split(',') if value.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="stock-benchmark-") as root:
+        bench = OfflineBench(root, args.forecast_days, args.test_size_pct, args.chart_preset, args.repeat,
+                             args.seed, args.verbose, args.forecast_mode, args.simulations)
+        bench.sm.set_n_jobs(args.n_jobs)
+        results = {
+            **_environment(),
+            "params": {"repeat": args.repeat, "forecast_days": args.forecast_days,
+                       "test_size_pct": args.test_size_pct, "chart_preset": args.chart_preset,
+                       "forecast_mode": args.forecast_mode, "simulations": args.simulations,
+                       "n_jobs": args.n_jobs, "seed": args.seed},
+            "runs": {}
+        }
+        try:
+            if args.memory:
+                print(f"🧠 Profil pamięci ({MEMORY_PROFILE_BARS} barów)...", flush=True)
+                results["memory"] = memory_profile(MEMORY_PROFILE_BARS, args.seed, args.test_size_pct)
+                print("   legacy → compact: " + "  ".join(
+                    f"{key} -{value} MB" for key, value in results["memory"]["reduction"].items()))
+            if args.startup:
+                print("🚀 Start modułów i serwera...", flush=True)
+                results["startup"] = startup_profile(root, args.repeat)
+                print("   " + "  ".join(f"{name} {summary['seconds']:.3f} s"
+                                        for name, summary in results["startup"].items()))
+            for bars in sizes:
+                print(f"⏱️ {bars} barów...", flush=True)
+                run = bench.run_size(bars)
+                results["runs"][str(bars)] = run
+                print(f"   pipeline {run['pipeline']['seconds']:.3f} s  " + "  ".join(
+                    f"{name} {summary['seconds']:.4f} s" for name, summary in run["stages"].items()))
+        finally:
+            bench.close()
+
+    output = args.output or f"benchmark-{(results['commit'] or 'local')[:7]}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Wyniki zapisane do {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print("❌ Regres wydajności:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
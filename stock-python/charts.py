@@ -0,0 +1,146 @@
+"""
+Renderowanie wykresów analizy – backend Agg, jeden szablon figury na proces i presety formatu
+"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# format: png / webp / svg renderują obraz, none pomija wykres całkowicie (np. w dużych analizach wsadowych).
+# Laravel przyjmuje tylko te formaty (ImageService::EXTENSIONS)
+CHART_PRESETS = {
+    "png_hd": {"format": "png", "dpi": 300},
+    "png": {"format": "png", "dpi": 110},
+    "webp": {"format": "webp", "dpi": 110},
+    "svg": {"format": "svg", "dpi": 72},
+    "none": {"format": None, "dpi": None},
+}
+CHART_PRESET = os.getenv("CHART_PRESET", "png")
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+# ile ostatnich barów kursu rzeczywistego trafia na wykres
+ACTUAL_BARS = 500
+
+
+def resolve_preset(preset: str | None) -> str:
+    preset = preset or CHART_PRESET
+    if preset not in CHART_PRESETS:
+        raise ValueError(f"Nieznany preset wykresu: {preset} (dostępne: {', '.join(CHART_PRESETS)})")
+    return preset
+
+
+class ChartTemplate:
+    """
+    Figura budowana raz na proces: osie, linie, legenda i marginesy są gotowe,
+    a kolejne wykresy tylko podmieniają dane linii i tytuł.
+
+    Stały układ (subplots_adjust) zastępuje tight_layout i bbox_inches='tight',
+    które przy każdym zapisie liczyły rozmiary wszystkich tekstów od nowa.
+    """
+
+    def __init__(self):
+        # matplotlib ładowany przy pierwszym wykresie w procesie; Agg – bez wyświetlacza i bez wyboru
+        # backendu przy imporcie pyplot gdziekolwiek później
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=(12, 6))
+        self.ax = self.fig.add_subplot()
+
+        # jednorazowy punkt z datą ustawia konwerter i formatowanie osi dat
+        start = [np.datetime64('2000-01-01')]
+        self.actual, = self.ax.plot(start, [np.nan], label="Kurs rzeczywisty", linewidth=2)
+        self.test, = self.ax.plot(start, [np.nan], label="Prognoza (okres testowy)", color='orange', linewidth=2)
+        self.forecast, = self.ax.plot(start, [np.nan], label="Forecast", color='red', linewidth=2, linestyle='--')
+        # pasmo niepewności prognozy (Monte Carlo) – wypełnienie tworzone od nowa, bo nie ma set_data
+        self.band = None
+
+        self.title = self.ax.set_title("", fontsize=14)
+        self.ax.set_xlabel("Data")
+        self.ax.set_ylabel("Cena [USD]")
+        self.ax.grid(True, alpha=0.3)
+        self.fig.subplots_adjust(left=0.07, right=0.98, top=0.93, bottom=0.08)
+
+    def render(self, series: dict, title: str, forecast_label: str, fmt: str, dpi: int) -> bytes:
+        for line, name in ((self.actual, "actual"), (self.test, "test_prediction"), (self.forecast, "forecast")):
+            line.set_data(series[name].index.to_numpy(), series[name].to_numpy())
+        self.forecast.set_label(forecast_label)
+        if self.band is not None:
+            self.band.remove()
+            self.band = None
+        if "forecast_low" in series:
+            low, high = series["forecast_low"], series["forecast_high"]
+            self.band = self.ax.fill_between(low.index.to_numpy(), low.to_numpy(), high.to_numpy(), color='red',
+                                             alpha=0.15, linewidth=0, label=f"Forecast {low.name}–{high.name}")
+        self.title.set_text(title)
+        self.ax.legend(loc='best')
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format=fmt, dpi=dpi)
+        return buf.getvalue()
+
+
+_template = None
+
+
+def get_template() -> ChartTemplate:
+    global _template
+    if _template is None:
+        _template = ChartTemplate()
+    return _template
+
+
+def chart_series(btc: pd.DataFrame, X_test: pd.DataFrame, y_pred: np.ndarray,
+                 forecast: pd.DataFrame) -> dict[str, pd.Series]:
+    """
+    Serie rysowane na wykresie: kurs rzeczywisty, ceny z predykcji na okresie testowym i forecast,
+    a przy prognozie z pasmami percentyli (p5, ..., p95) także skrajne pasmo jako forecast_low / forecast_high
+    """
+    # Odtworzenie cen na okresie testowym
+    test_prices = btc.loc[X_test.index, 'close']
+    series = {
+        "actual": btc['close'].iloc[-ACTUAL_BARS:],
+        "test_prediction": test_prices.shift(1) * np.exp(y_pred),
+        "forecast": forecast['forecast_close'],
+    }
+    bands = [col for col in forecast.columns if col != 'forecast_close']
+    if bands:
+        series["forecast_low"], series["forecast_high"] = forecast[bands[0]], forecast[bands[-1]]
+    return series
+
+
+def render_chart(btc: pd.DataFrame, X_test: pd.DataFrame, y_pred: np.ndarray, forecast: pd.DataFrame,
+                 ticker: str, forecast_days: int, preset: str | None = None) -> dict | None:
+    """
+    Wykres analizy w formacie presetu: {"format", "content_type", "filename", "data": bytes}
+    albo None dla presetu none.
+    """
+    preset = resolve_preset(preset)
+    fmt, dpi = CHART_PRESETS[preset]["format"], CHART_PRESETS[preset]["dpi"]
+    if fmt is None:
+        return None
+
+    data = get_template().render(
+        chart_series(btc, X_test, y_pred, forecast),
+        title=f"{ticker} – model XGBoost (log-returns → price)",
+        forecast_label=f"Forecast +{forecast_days} d",
+        fmt=fmt,
+        dpi=dpi
+    )
+
+    return {
+        "format": fmt,
+        "content_type": CONTENT_TYPES[fmt],
+        "filename": f"{ticker}.{fmt}",
+        "data": data,
+    }
@@ -0,0 +1,192 @@
+"""
+Magazyn macierzy cech – pełny blok cech tickera w plikach .npy mapowanych w pamięć, dokładany przyrostowo
+o nowe bary i przeliczany od zera tylko po zmianie definicji cech
+"""
+from datetime import datetime, timezone
+import glob
+import json
+import os
+import re
+import uuid
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from feature_stream import FeatureStream
+from indicators import (BB_DEV, BB_WINDOW, FEATURE_COLUMNS, GT_WINDOW, MACD_FAST, MACD_SIGN, MACD_SLOW,
+                        RET_LAGS, RSI_WINDOW, VOL_WINDOW)
+
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "/app/cache/features")
+# tyle nowych barów dokładane jest strumieniowo (FeatureStream, bar po barze); przy większej różnicy
+# szybsze jest przeliczenie całego bloku wektorowo
+FEATURE_STORE_MAX_APPEND = int(os.getenv("FEATURE_STORE_MAX_APPEND", "512"))
+# wersja wzorów cech – podbijana ręcznie przy zmianie indicators.feature_matrix; parametry wskaźników
+# trafiają do schematu automatycznie
+FEATURE_SCHEMA_VERSION = 1
+
+
+def feature_schema() -> str:
+    """
+    Identyfikator definicji cech: wersja wzorów i odcisk parametrów wskaźników
+    """
+    params = {
+        "columns": FEATURE_COLUMNS, "rsi": RSI_WINDOW, "macd": [MACD_FAST, MACD_SLOW, MACD_SIGN],
+        "bb": [BB_WINDOW, BB_DEV], "volume": VOL_WINDOW, "trends": GT_WINDOW, "lags": list(RET_LAGS)
+    }
+    return f"{FEATURE_SCHEMA_VERSION}-{zlib.crc32(json.dumps(params, sort_keys=True).encode()):08x}"
+
+
+FEATURE_SCHEMA = feature_schema()
+
+
+def _inputs(df: pd.DataFrame) -> np.ndarray:
+    return df.to_numpy(dtype=np.float64)
+
+
+def _bar(df: pd.DataFrame, trends_col: str | None, pos: int) -> tuple[float, float, float]:
+    return (float(df['close'].iloc[pos]), float(df['volume'].iloc[pos]),
+            float(df[trends_col].iloc[pos]) if trends_col else np.nan)
+
+
+def _same_rows(stored: np.ndarray, current: np.ndarray) -> int:
+    """
+    Liczba początkowych wierszy identycznych w obu tablicach (NaN równy NaN)
+    """
+    rows = min(len(stored), len(current))
+    equal = ((stored[:rows] == current[:rows]) | (np.isnan(stored[:rows]) & np.isnan(current[:rows]))).all(axis=1)
+    return rows if equal.all() else int(np.argmin(equal))
+
+
+class FeatureStore:
+    """
+    Jeden katalog na ticker, zakres notowań i frazę Google Trends (cechy zależą od całej historii od pierwszego
+    baru). Pliki generacji G: features-G.npy (blok jak stock_model.feature_block, float32), inputs-G.npy
+    (kolumny wejściowe float64 – do wykrycia zmienionych barów) i index-G.npy (ns); meta.json wskazuje bieżącą
+    generację, schemat cech i stan FeatureStream po dwóch ostatnich barach.
+
+    Nowa generacja zapisywana jest obok starej, a meta.json podmieniany atomowo – procesy, które mają
+    zmapowane stare pliki, czytają je dalej bez zakłóceń.
+    """
+
+    def __init__(self, store_dir: str = FEATURE_STORE_DIR, max_append: int = FEATURE_STORE_MAX_APPEND,
+                 schema: str = FEATURE_SCHEMA):
+        self.store_dir = store_dir
+        self.max_append = max_append
+        self.schema = schema
+        os.makedirs(store_dir, exist_ok=True)
+
+    def path(self, ticker: str, df: pd.DataFrame) -> str:
+        trends_col = next((col for col in df.columns if col.startswith('gt_')), 'gt_none')
+        key = f"{ticker}_{df.index[0]:%Y%m%d}_{trends_col[3:]}" if len(df) else ticker
+        return os.path.join(self.store_dir, re.sub(r'[^A-Za-z0-9._-]', '_', key))
+
+    def load(self, ticker: str, df: pd.DataFrame, build) -> tuple[np.ndarray, list[str], str]:
+        """
+        Blok cech wszystkich barów df: (blok tylko do odczytu, kolumny, źródło).
+
+        build(df) -> (blok, kolumny) liczy cały blok od zera. Źródło to "hit" (bez zmian), "append"
+        (dołożone nowe bary, ewentualnie po poprawionym ostatnim barze) albo "build" (przeliczenie całości:
+        brak wpisu, inny schemat, zmiana danych w głębi historii albo za dużo nowych barów).
+        """
+        path = self.path(ticker, df)
+        inputs = _inputs(df)
+        index = df.index.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        meta = self._meta(path)
+        stored = self._open(path, meta) if meta and meta["schema"] == self.schema else None
+        if stored is not None and meta["columns"][:df.shape[1]] == list(df.columns) and len(meta["streams"]) == 2:
+            block, stored_inputs, stored_index = stored
+            stored_rows = len(block)
+            same = min(_same_rows(stored_inputs, inputs), _same_rows(stored_index[:, None], index[:, None]))
+            if same == len(df) == stored_rows:
+                return block, meta["columns"], "hit"
+            # nowe bary dokładane od stanu po ostatnim zapisanym barze, a gdy ten bar się zmienił
+            # (niepełna świeca z dnia pobrania) – od stanu sprzed niego
+            if same in (stored_rows, stored_rows - 1) and same < len(df) and len(df) - same <= self.max_append:
+                state = meta["streams"][1] if same == stored_rows else meta["streams"][0]
+                block, streams = self._append(block, df, same, FeatureStream.from_state(state))
+                self._save(path, block, meta["columns"], inputs, index, streams)
+                return block, meta["columns"], "append"
+
+        block, columns = build(df)
+        self._save(path, block, columns, inputs, index, self._streams(df))
+        return block, columns, "build"
+
+    @staticmethod
+    def _append(block: np.ndarray, df: pd.DataFrame, start: int, stream: FeatureStream) -> tuple[np.ndarray, list]:
+        """
+        Wiersze start.. liczone strumieniowo od stanu po barze start-1; target poprzedniego wiersza to ret_1 nowego
+        """
+        rows = np.empty((len(df), block.shape[1]), dtype=block.dtype)
+        rows[:start] = block[:start]
+        # 'ret_1' – pierwsza cecha za kolumnami wejściowymi
+        ret_1 = df.shape[1]
+        before_last = None
+        for pos in range(start, len(df)):
+            if pos == len(df) - 1:
+                before_last = stream.state()
+            features = stream.update(*_bar(df, stream.trends_col, pos))
+            rows[pos, :-1] = features
+            rows[pos, -1] = np.nan
+            if pos > 0:
+                rows[pos - 1, -1] = features[ret_1]
+        return rows, [before_last, stream.state()]
+
+    @staticmethod
+    def _streams(df: pd.DataFrame) -> list[dict]:
+        # stan po przedostatnim i ostatnim barze – punkt startu dla kolejnych dokładań
+        if len(df) < 2:
+            return []
+        stream = FeatureStream.from_frame(df.iloc[:-1])
+        before_last = stream.state()
+        stream.update(*_bar(df, stream.trends_col, -1))
+        return [before_last, stream.state()]
+
+    @staticmethod
+    def _meta(path: str) -> dict | None:
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _open(path: str, meta: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        generation = meta["generation"]
+        try:
+            return tuple(np.load(os.path.join(path, f"{name}-{generation}.npy"), mmap_mode='r')
+                         for name in ("features", "inputs", "index"))
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, path: str, block: np.ndarray, columns: list[str], inputs: np.ndarray, index: np.ndarray,
+              streams: list[dict]):
+        os.makedirs(path, exist_ok=True)
+        # unikalna generacja – równoległe zapisy tego samego tickera nie mieszają swoich plików
+        generation = uuid.uuid4().hex[:12]
+        for name, values in (("features", block), ("inputs", inputs), ("index", index)):
+            tmp_path = os.path.join(path, f"{name}-{generation}.npy.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, os.path.join(path, f"{name}-{generation}.npy"))
+
+        meta = {
+            "schema": self.schema,
+            "generation": generation,
+            "columns": columns,
+            "rows": len(block),
+            "streams": streams,
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec='seconds')
+        }
+        tmp_path = os.path.join(path, f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+        # stare generacje – zmapowane już pliki zostają dostępne dla czytających do czasu zamknięcia
+        for old in glob.glob(os.path.join(path, "*-*.npy")):
+            if not os.path.basename(old).endswith(f"-{generation}.npy"):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
@@ -0,0 +1,346 @@
+"""
+Strumieniowe liczenie cech – odpowiednik make_features aktualizowany o jeden bar w czasie O(1)
+"""
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+
+from indicators import (BB_DEV, BB_WINDOW, FEATURE_COLUMNS, GT_WINDOW, MACD_FAST, MACD_SIGN, MACD_SLOW,
+                        RET_LAGS, RSI_WINDOW, VOL_WINDOW)
+
+
+class _Ewm:
+    """
+    Akumulator EWM zgodny z pandas .ewm(adjust=False, ignore_na=False).mean()
+    """
+    __slots__ = ('alpha', 'min_periods', 'value', 'old_wt', 'nobs')
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    @classmethod
+    def from_series(cls, series: pd.Series, alpha: float, min_periods: int) -> '_Ewm':
+        """
+        Stan akumulatora po przejściu całej serii – liczony wektorowo przez pandas
+        """
+        ewm = cls(alpha, min_periods)
+        values = series.to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        ewm.nobs = int(valid.sum())
+        if ewm.nobs:
+            ewm.value = float(series.ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+            trailing_nan = len(values) - 1 - int(np.flatnonzero(valid)[-1])
+            ewm.old_wt = (1 - alpha) ** trailing_nan
+        return ewm
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            if not math.isnan(self.value):
+                self.old_wt *= 1 - self.alpha
+        else:
+            self.nobs += 1
+            if math.isnan(self.value):
+                self.value = x
+            else:
+                self.old_wt *= 1 - self.alpha
+                if self.value != x:
+                    self.value = (self.old_wt * self.value + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        return self.current
+
+    @property
+    def current(self) -> float:
+        return self.value if self.nobs >= self.min_periods else math.nan
+
+    def state(self) -> list:
+        return [self.value, self.old_wt, self.nobs]
+
+    def restore(self, state: list):
+        self.value, self.old_wt, self.nobs = float(state[0]), float(state[1]), int(state[2])
+
+
+def _rolling_mean_std(window: deque, size: int, ddof: int) -> tuple[float, float]:
+    if len(window) < size or any(math.isnan(v) for v in window):
+        return math.nan, math.nan
+    if max(window) == min(window):
+        # stałe okno – jak pandas: dokładnie ta wartość i zerowe odchylenie
+        return window[0], 0.0
+    mean = math.fsum(window) / size
+    var = math.fsum((v - mean) ** 2 for v in window) / (size - ddof)
+    return mean, math.sqrt(var)
+
+
+def _div(a: float, b: float) -> float:
+    # semantyka dzielenia jak w pandas: x/0 → ±inf, 0/0 → NaN
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class FeatureStream:
+    """
+    Stan cech dla jednego tickera: okna kroczące i akumulatory EMA.
+
+    Po rozgrzaniu historią (from_frame) każde update() dokłada jeden bar i zwraca
+    wektor cech tego baru w kolejności kolumn make_features (bez 'target').
+    Nadaje się zarówno do pętli prognozy, jak i do aktualizacji tick po ticku.
+    """
+
+    def __init__(self, trends_col: str | None = None):
+        self.trends_col = trends_col
+        base = ['close', 'volume'] + ([trends_col] if trends_col else [])
+        self.columns = base + FEATURE_COLUMNS + (['gt_7d'] if trends_col else [])
+
+        self._log_close = deque(maxlen=max(RET_LAGS) + 1)
+        self._close = deque(maxlen=BB_WINDOW)
+        self._volume = deque(maxlen=VOL_WINDOW)
+        self._trend = deque(maxlen=GT_WINDOW)
+        self._last_close = math.nan
+        self._rsi_up = _Ewm(1 / RSI_WINDOW, RSI_WINDOW)
+        self._rsi_down = _Ewm(1 / RSI_WINDOW, RSI_WINDOW)
+        self._ema_fast = _Ewm(2 / (MACD_FAST + 1), MACD_FAST)
+        self._ema_slow = _Ewm(2 / (MACD_SLOW + 1), MACD_SLOW)
+        self._signal = _Ewm(2 / (MACD_SIGN + 1), MACD_SIGN)
+        self.last = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'FeatureStream':
+        """
+        Rozgrzewa stan całą historią (kolumny close, volume i opcjonalnie jedna gt_*).
+
+        Koszt O(n) ponoszony raz – akumulatory EMA są liczone wektorowo.
+        """
+        trends_cols = [col for col in df.columns if col.startswith('gt_')]
+        unknown = set(df.columns) - {'close', 'volume'} - set(trends_cols)
+        if unknown or len(trends_cols) > 1:
+            raise ValueError(f"Nieobsługiwane kolumny dla FeatureStream: {sorted(unknown) or trends_cols}")
+
+        stream = cls(trends_cols[0] if trends_cols else None)
+        if df.empty:
+            return stream
+
+        close = df['close'].astype(float)
+        diff = close.diff(1)
+        up = diff.where(diff > 0, 0.0)
+        down = -diff.where(diff < 0, 0.0)
+        stream._rsi_up = _Ewm.from_series(up, 1 / RSI_WINDOW, RSI_WINDOW)
+        stream._rsi_down = _Ewm.from_series(down, 1 / RSI_WINDOW, RSI_WINDOW)
+
+        stream._ema_fast = _Ewm.from_series(close, 2 / (MACD_FAST + 1), MACD_FAST)
+        stream._ema_slow = _Ewm.from_series(close, 2 / (MACD_SLOW + 1), MACD_SLOW)
+        macd = (close.ewm(span=MACD_FAST, min_periods=MACD_FAST, adjust=False).mean()
+                - close.ewm(span=MACD_SLOW, min_periods=MACD_SLOW, adjust=False).mean())
+        stream._signal = _Ewm.from_series(macd, 2 / (MACD_SIGN + 1), MACD_SIGN)
+
+        stream._log_close.extend(np.log(close.iloc[-stream._log_close.maxlen:]).tolist())
+        stream._close.extend(close.iloc[-BB_WINDOW:].tolist())
+        stream._volume.extend(df['volume'].astype(float).iloc[-VOL_WINDOW:].tolist())
+        if stream.trends_col:
+            stream._trend.extend(df[stream.trends_col].astype(float).iloc[-GT_WINDOW:].tolist())
+        stream._last_close = float(close.iloc[-1])
+
+        stream.last = stream._compute(
+            float(close.iloc[-1]),
+            float(df['volume'].iloc[-1]),
+            float(df[stream.trends_col].iloc[-1]) if stream.trends_col else math.nan,
+            stream._rsi_up.current, stream._rsi_down.current,
+            stream._ema_fast.current, stream._ema_slow.current, stream._signal.current
+        )
+        return stream
+
+    def update(self, close: float, volume: float, trend: float = math.nan) -> np.ndarray:
+        """
+        Dokłada jeden bar i zwraca jego wektor cech
+        """
+        close, volume, trend = float(close), float(volume), float(trend)
+
+        diff = close - self._last_close
+        up = self._rsi_up.update(diff if diff > 0 else 0.0)
+        down = self._rsi_down.update(-diff if diff < 0 else 0.0)
+        fast = self._ema_fast.update(close)
+        slow = self._ema_slow.update(close)
+        signal = self._signal.update(fast - slow)
+
+        self._log_close.append(math.log(close) if close > 0 else math.nan)
+        self._close.append(close)
+        self._volume.append(volume)
+        if self.trends_col:
+            self._trend.append(trend)
+        self._last_close = close
+
+        self.last = self._compute(close, volume, trend, up, down, fast, slow, signal)
+        return self.last
+
+    def features(self) -> dict:
+        """
+        Ostatni wektor cech jako słownik kolumna → wartość
+        """
+        return dict(zip(self.columns, self.last.tolist())) if self.last is not None else {}
+
+    _EWMS = ('_rsi_up', '_rsi_down', '_ema_fast', '_ema_slow', '_signal')
+    _WINDOWS = ('_log_close', '_close', '_volume', '_trend')
+
+    def state(self) -> dict:
+        """
+        Stan strumienia jako słownik zgodny z JSON (NaN jako NaN) – do odtworzenia przez from_state bez historii
+        """
+        return {
+            "trends_col": self.trends_col,
+            "last_close": self._last_close,
+            "windows": {name: list(getattr(self, name)) for name in self._WINDOWS},
+            "ewms": {name: getattr(self, name).state() for name in self._EWMS},
+            "last": self.last.tolist() if self.last is not None else None
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'FeatureStream':
+        stream = cls(state["trends_col"])
+        stream._last_close = float(state["last_close"])
+        for name in cls._WINDOWS:
+            getattr(stream, name).extend(float(value) for value in state["windows"][name])
+        for name in cls._EWMS:
+            getattr(stream, name).restore(state["ewms"][name])
+        stream.last = np.array(state["last"], dtype=float) if state["last"] is not None else None
+        return stream
+
+    def _compute(self, close, volume, trend, up, down, fast, slow, signal) -> np.ndarray:
+        log_close = self._log_close
+        rets = [log_close[-1] - log_close[-1 - lag] if len(log_close) > lag else math.nan
+                for lag in RET_LAGS]
+
+        if math.isnan(down):
+            rsi = math.nan
+        elif down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + up / down)
+
+        macd = fast - slow
+        mavg, mstd = _rolling_mean_std(self._close, BB_WINDOW, ddof=0)
+        bb_high = mavg + BB_DEV * mstd
+        bb_low = mavg - BB_DEV * mstd
+        bb_width = _div(bb_high - bb_low, close)
+
+        vmean, vstd = _rolling_mean_std(self._volume, VOL_WINDOW, ddof=1)
+        vol_z = _div(volume - vmean, vstd)
+
+        row = [close, volume] + ([trend] if self.trends_col else [])
+        row += rets + [rsi, macd, signal, bb_high, bb_low, bb_width, vol_z]
+        if self.trends_col:
+            row.append(_rolling_mean_std(self._trend, GT_WINDOW, ddof=1)[0])
+        return np.array(row, dtype=float)
+
+
+class _EwmBatch:
+    """
+    _Ewm dla wielu ścieżek naraz – stan i aktualizacja na wektorach (ścieżka = element)
+    """
+    __slots__ = ('alpha', 'min_periods', 'value', 'old_wt', 'nobs')
+
+    def __init__(self, ewm: _Ewm, paths: int):
+        self.alpha = ewm.alpha
+        self.min_periods = ewm.min_periods
+        self.value = np.full(paths, ewm.value)
+        self.old_wt = np.full(paths, ewm.old_wt)
+        self.nobs = np.full(paths, ewm.nobs)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        missing = np.isnan(x)
+        empty = np.isnan(self.value)
+        decayed = self.old_wt * (1 - self.alpha)
+        with np.errstate(invalid='ignore'):
+            blended = (decayed * self.value + self.alpha * x) / (decayed + self.alpha)
+        self.value = np.where(missing, self.value,
+                              np.where(empty, x, np.where(self.value == x, self.value, blended)))
+        self.old_wt = np.where(empty, self.old_wt, np.where(missing, decayed, 1.0))
+        self.nobs = self.nobs + ~missing
+        return self.current
+
+    @property
+    def current(self) -> np.ndarray:
+        return np.where(self.nobs >= self.min_periods, self.value, np.nan)
+
+
+def _window(values: deque, size: int, paths: int) -> np.ndarray:
+    # okno deque jako macierz (ścieżki × size); brakujące początkowe wartości jako NaN
+    row = np.full(size, np.nan)
+    if values:
+        row[size - len(values):] = list(values)
+    return np.tile(row, (paths, 1))
+
+
+def _push(window: np.ndarray, values: np.ndarray) -> np.ndarray:
+    return np.concatenate([window[:, 1:], values[:, None]], axis=1)
+
+
+class FeatureStreamBatch:
+    """
+    FeatureStream rozwidlony na `paths` ścieżek (np. symulacji Monte Carlo): update() dokłada jeden bar
+    każdej ścieżce i zwraca macierz cech (ścieżki × kolumny) – jedna operacja wektorowa zamiast pętli po ścieżkach.
+
+    Ścieżki różnią się tylko kursem; wolumen i Google Trends są wspólne, więc ich okna liczone są raz.
+    """
+
+    def __init__(self, stream: FeatureStream, paths: int):
+        self.trends_col = stream.trends_col
+        self.columns = stream.columns
+        self.paths = paths
+        self._log_close = _window(stream._log_close, stream._log_close.maxlen, paths)
+        self._close = _window(stream._close, BB_WINDOW, paths)
+        self._volume = deque(stream._volume, maxlen=VOL_WINDOW)
+        self._trend = deque(stream._trend, maxlen=GT_WINDOW)
+        self._last_close = np.full(paths, stream._last_close)
+        self._rsi_up = _EwmBatch(stream._rsi_up, paths)
+        self._rsi_down = _EwmBatch(stream._rsi_down, paths)
+        self._ema_fast = _EwmBatch(stream._ema_fast, paths)
+        self._ema_slow = _EwmBatch(stream._ema_slow, paths)
+        self._signal = _EwmBatch(stream._signal, paths)
+
+    def update(self, close: np.ndarray, volume: float, trend: float = math.nan) -> np.ndarray:
+        """
+        Dokłada bar o kursach `close` (po jednym na ścieżkę) i wspólnym wolumenie; zwraca cechy ścieżek
+        """
+        close = np.asarray(close, dtype=float)
+        volume, trend = float(volume), float(trend)
+
+        diff = close - self._last_close
+        up = self._rsi_up.update(np.where(diff > 0, diff, 0.0))
+        down = self._rsi_down.update(np.where(diff < 0, -diff, 0.0))
+        fast = self._ema_fast.update(close)
+        slow = self._ema_slow.update(close)
+        signal = self._signal.update(fast - slow)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._log_close = _push(self._log_close, np.where(close > 0, np.log(close), np.nan))
+        self._close = _push(self._close, close)
+        self._volume.append(volume)
+        if self.trends_col:
+            self._trend.append(trend)
+        self._last_close = close
+
+        rets = [self._log_close[:, -1] - self._log_close[:, -1 - lag] for lag in RET_LAGS]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+        rsi = np.where(np.isnan(down), np.nan, rsi)
+
+        # stałe okno – jak pandas: dokładnie ta wartość i zerowe odchylenie
+        constant = self._close.max(axis=1) == self._close.min(axis=1)
+        mavg = np.where(constant, self._close[:, -1], self._close.mean(axis=1))
+        mstd = np.where(constant, 0.0, self._close.std(axis=1))
+        bb_high = mavg + BB_DEV * mstd
+        bb_low = mavg - BB_DEV * mstd
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_width = (bb_high - bb_low) / close
+
+        vmean, vstd = _rolling_mean_std(self._volume, VOL_WINDOW, ddof=1)
+        shared = [np.full(self.paths, volume)] + ([np.full(self.paths, trend)] if self.trends_col else [])
+        columns = [close] + shared + rets + [rsi, fast - slow, signal, bb_high, bb_low, bb_width,
+                                             np.full(self.paths, _div(volume - vmean, vstd))]
+        if self.trends_col:
+            columns.append(np.full(self.paths, _rolling_mean_std(self._trend, GT_WINDOW, ddof=1)[0]))
+        return np.column_stack(columns)
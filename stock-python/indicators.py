@@ -0,0 +1,139 @@
+"""
+Wektorowy silnik wskaźników – cała macierz cech make_features w jednym przebiegu po tablicach NumPy
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2
+VOL_WINDOW = 30
+GT_WINDOW = 7
+RET_LAGS = (1, 7, 30)
+
+FEATURE_COLUMNS = ['ret_1', 'ret_7', 'ret_30', 'rsi_14', 'macd', 'macd_signal',
+                   'bb_high', 'bb_low', 'bb_width', 'vol_z']
+
+# limit elementów tymczasowej tablicy okien przy liczeniu rolling (wiersze są przetwarzane blokami)
+_ROLLING_BLOCK = 4_000_000
+
+
+def _as_2d(values) -> np.ndarray:
+    return np.ascontiguousarray(np.atleast_2d(np.asarray(values, dtype=np.float64)))
+
+
+def _diff(x: np.ndarray, lag: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[:, lag:] = x[:, lag:] - x[:, :-lag]
+    return out
+
+
+def ewm_mean(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """
+    Odpowiednik pandas .ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean() wzdłuż osi czasu.
+
+    Wiersze bez luk liczone są rekurencją y[t] = alpha * x[t] + (1 - alpha) * y[t-1] w lfilter,
+    grupami o tym samym początku danych; wiersze z NaN w środku serii przechodzą przez pandas,
+    który zachowuje wtedy specyficzne ważenie starych obserwacji.
+    """
+    # SciPy (ok. 1 s importu) ładowany przy pierwszym liczeniu cech, nie przy imporcie modułu
+    from scipy.signal import lfilter
+
+    x = _as_2d(x)
+    out = np.full_like(x, np.nan)
+    valid = ~np.isnan(x)
+    has_data = valid.any(axis=1)
+    first = np.where(has_data, valid.argmax(axis=1), x.shape[1])
+    gaps = has_data & (valid.sum(axis=1) != x.shape[1] - first)
+
+    for start in np.unique(first[has_data & ~gaps]):
+        rows = np.flatnonzero((first == start) & ~gaps)
+        block = x[rows]
+        out[rows, start] = block[:, start]
+        if start + 1 < x.shape[1]:
+            out[rows, start + 1:] = lfilter([alpha], [1.0, alpha - 1.0], block[:, start + 1:], axis=1,
+                                            zi=(1 - alpha) * block[:, start:start + 1])[0]
+
+    if gaps.any():
+        rows = np.flatnonzero(gaps)
+        out[rows] = pd.DataFrame(x[rows].T).ewm(alpha=alpha, adjust=False).mean().to_numpy().T
+
+    nobs = np.cumsum(valid, axis=1)
+    out[nobs < min_periods] = np.nan
+    return out
+
+
+def rolling_mean_std(x: np.ndarray, window: int, ddof: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Średnia i odchylenie standardowe w oknie kroczącym (pełne okno, NaN w oknie → NaN).
+
+    Odchylenie liczone dwuprzebiegowo na widoku okien; okno stałe daje dokładnie 0 jak w pandas,
+    dzięki czemu z-score stałego wolumenu wychodzi NaN, a nie szum zmiennoprzecinkowy.
+    """
+    x = _as_2d(x)
+    mean = np.full_like(x, np.nan)
+    std = np.full_like(x, np.nan)
+    if x.shape[1] < window:
+        return mean, std
+
+    step = max(1, _ROLLING_BLOCK // (x.shape[1] * window))
+    for lo in range(0, x.shape[0], step):
+        windows = sliding_window_view(x[lo:lo + step], window, axis=1)
+        block_mean = windows.mean(axis=2)
+        dev = windows - block_mean[..., None]
+        block_std = np.sqrt(np.einsum('ijk,ijk->ij', dev, dev) / (window - ddof))
+
+        constant = windows.max(axis=2) == windows.min(axis=2)
+        block_mean[constant] = windows[..., 0][constant]
+        block_std[constant] = 0.0
+
+        mean[lo:lo + step, window - 1:] = block_mean
+        std[lo:lo + step, window - 1:] = block_std
+    return mean, std
+
+
+def feature_matrix(close, volume, trend=None) -> dict[str, np.ndarray]:
+    """
+    Wszystkie cechy make_features (wraz z 'target') dla serii 1-D albo macierzy ticker × czas.
+
+    Zwraca słownik kolumna → tablica o kształcie wejścia; wiersze niepełne zawierają NaN
+    (odrzuca je dopiero dropna po stronie ramki). Wzory są zgodne z RSIIndicator, MACD
+    i BollingerBands z biblioteki ta.
+    """
+    one_dim = np.ndim(close) == 1
+    close, volume = _as_2d(close), _as_2d(volume)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_close = np.log(close)
+        features = {f'ret_{lag}': _diff(log_close, lag) for lag in RET_LAGS}
+
+        # RSI: brak zmiany (także NaN na początku) liczy się jako 0 w obu kierunkach
+        diff = _diff(close, 1)
+        ema_up = ewm_mean(np.where(diff > 0, diff, 0.0), 1 / RSI_WINDOW, RSI_WINDOW)
+        ema_down = ewm_mean(np.where(diff < 0, -diff, 0.0), 1 / RSI_WINDOW, RSI_WINDOW)
+        features['rsi_14'] = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+
+        macd = (ewm_mean(close, 2 / (MACD_FAST + 1), MACD_FAST)
+                - ewm_mean(close, 2 / (MACD_SLOW + 1), MACD_SLOW))
+        features['macd'] = macd
+        features['macd_signal'] = ewm_mean(macd, 2 / (MACD_SIGN + 1), MACD_SIGN)
+
+        bb_mavg, bb_mstd = rolling_mean_std(close, BB_WINDOW, ddof=0)
+        features['bb_high'] = bb_mavg + BB_DEV * bb_mstd
+        features['bb_low'] = bb_mavg - BB_DEV * bb_mstd
+        features['bb_width'] = (features['bb_high'] - features['bb_low']) / close
+
+        vol_mean, vol_std = rolling_mean_std(volume, VOL_WINDOW, ddof=1)
+        features['vol_z'] = (volume - vol_mean) / vol_std
+
+        if trend is not None:
+            features['gt_7d'] = rolling_mean_std(trend, GT_WINDOW, ddof=1)[0]
+
+    target = np.full_like(close, np.nan)
+    target[:, :-1] = features['ret_1'][:, 1:]
+    features['target'] = target
+
+    if one_dim:
+        return {name: values[0] for name, values in features.items()}
+    return features
@@ -0,0 +1,270 @@
+"""
+Klient Laravel API – wspólna sesja HTTP z pulą połączeń, ponowieniami, wysyłką notowań w paczkach,
+kodowaniem JSON albo MessagePack i kolejką wysyłek w tle
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import gzip
+import json
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from payload_encoding import MSGPACK_TYPE, msgpack_available, pack
+from progress import stage
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://laravel.test").rstrip('/')
+
+# wiersze w jednej paczce notowań
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "1000"))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "4"))
+# odstęp przed kolejną próbą: backoff * 2^(próba-1) s
+UPLOAD_BACKOFF = float(os.getenv("UPLOAD_BACKOFF", "0.5"))
+UPLOAD_TIMEOUT = float(os.getenv("UPLOAD_TIMEOUT", "30"))
+UPLOAD_POOL_SIZE = int(os.getenv("UPLOAD_POOL_SIZE", "8"))
+# wątki wysyłek w tle na proces; przy 1 wysyłki analizy idą w kolejności zlecenia, ale nie blokują obliczeń
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "1"))
+# zakres barów już wysłanych per ticker – podstawa wysyłki przyrostowej
+UPLOAD_STATE_DIR = os.getenv("UPLOAD_STATE_DIR", "/app/cache/uploads")
+# kodowanie treści POST-ów: json albo msgpack (mniejsze i szybsze w kodowaniu liczb; Laravel potrzebuje
+# rozszerzenia msgpack – bez niego odpowiada 415 i klient wraca do JSON)
+UPLOAD_ENCODINGS = ('json', 'msgpack')
+UPLOAD_ENCODING = os.getenv("UPLOAD_ENCODING", "json")
+
+
+def create_session(retries: int = UPLOAD_RETRIES, backoff: float = UPLOAD_BACKOFF,
+                   pool_size: int = UPLOAD_POOL_SIZE) -> requests.Session:
+    """
+    Sesja z keep-alive i ponowieniami (błędy połączenia, 429, 5xx) z wykładniczym odstępem
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # wszystkie wysyłki do Laravel są upsertami – ponowienie POST jest bezpieczne
+        allowed_methods=None,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def price_columns(raw: pd.DataFrame, start: int, stop: int) -> dict[str, list]:
+    """
+    Wycinek notowań w formacie kolumnowym: nazwa kolumny → lista wartości (NaN jako null).
+
+    Nazwy kolumn jak dotąd: 'Close_<TICKER>' itd. dla MultiIndex z yf.download, plus 'Date'.
+    """
+    chunk = raw.iloc[start:stop]
+    columns = {"Date": chunk.index.strftime('%Y-%m-%d %H:%M:%S').tolist()}
+    for col in chunk.columns:
+        name = '_'.join(map(str, col)).strip() if isinstance(col, tuple) else str(col)
+        values = chunk[col].to_numpy(dtype=float)
+        columns[name] = np.where(np.isnan(values), None, values).tolist()
+    return columns
+
+
+def forecast_columns(forecast: pd.DataFrame) -> dict[str, list]:
+    """
+    Prognoza w formacie kolumnowym: 'index' (data, jak w dawnych rekordach z reset_index) i kolumny
+    prognozy (forecast_close, pasma p5..p95) – nazwy kolumn raz zamiast w każdym rekordzie, NaN jako null
+    """
+    columns = {"index": forecast.index.strftime('%Y-%m-%d %H:%M:%S').tolist()}
+    for col in forecast.columns:
+        values = forecast[col].to_numpy(dtype=float)
+        columns[str(col)] = np.where(np.isnan(values), None, values).tolist()
+    return columns
+
+
+def response_report(response: requests.Response | None) -> dict:
+    """
+    Odpowiedź pojedynczego POST-a w formacie raportu wysyłki: {"ok", "status", "error"}
+    """
+    if response is None:
+        return {"ok": False, "status": None, "error": "brak odpowiedzi"}
+    return {"ok": response.ok, "status": response.status_code, "error": None if response.ok else response.text[:500]}
+
+
+class UploadQueue:
+    """
+    Wysyłki jednej analizy w tle: submit wraca od razu, a flush czeka na wszystkie i zwraca ich raporty.
+
+    Użycie jako context manager gwarantuje, że żadna wysyłka nie zostanie w tle po wyjściu z bloku
+    (np. po wyjątku w obliczeniach) – jej etapy trafiają wtedy jeszcze do pomiarów bieżącej analizy.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self._executor = executor
+        self._pending: list[tuple[str, Future]] = []
+
+    def submit(self, name: str, func, *args, **kwargs) -> Future:
+        """
+        Zleca func(*args, **kwargs) jako etap upload (target=name); func zwraca raport {"ok", ...}
+        """
+        future = self._executor.submit(self._run, name, func, args, kwargs)
+        self._pending.append((name, future))
+        return future
+
+    @staticmethod
+    def _run(name: str, func, args: tuple, kwargs: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            with stage("upload", target=name):
+                report = func(*args, **kwargs)
+        except Exception as e:
+            report = {"ok": False, "status": None, "error": str(e)}
+        return {**report, "seconds": round(time.perf_counter() - start, 4)}
+
+    def flush(self) -> dict[str, dict]:
+        """
+        Czeka na wszystkie zlecone wysyłki; zwraca {nazwa: raport} w kolejności zlecenia
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return {}
+        with stage("flush", uploads=len(pending)):
+            return {name: future.result() for name, future in pending}
+
+    def __enter__(self) -> "UploadQueue":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class LaravelClient:
+    """
+    Jedna sesja na proces workera: połączenia są utrzymywane między analizami.
+
+    Notowania wysyłane są kolumnowo, skompresowane gzipem, w paczkach po UPLOAD_CHUNK_ROWS barów,
+    i tylko te, których Laravel jeszcze nie dostał (plus ostatni wysłany bar – mógł być niepełny).
+    Treści idą jako JSON albo MessagePack (encoding); odpowiedź 415 na MessagePack przełącza klienta na JSON.
+    Wysyłki mogą iść w tle (background()) przez tę samą sesję, na UPLOAD_CONCURRENCY wątkach.
+    """
+
+    def __init__(self, session: requests.Session | None = None, state_dir: str = UPLOAD_STATE_DIR,
+                 chunk_rows: int = UPLOAD_CHUNK_ROWS, timeout: float = UPLOAD_TIMEOUT,
+                 concurrency: int = UPLOAD_CONCURRENCY, encoding: str = UPLOAD_ENCODING):
+        if encoding not in UPLOAD_ENCODINGS:
+            raise ValueError(f"Nieznane kodowanie wysyłki: {encoding} (dostępne: {', '.join(UPLOAD_ENCODINGS)})")
+        if encoding == 'msgpack' and not msgpack_available():
+            print("⚠️ Brak pakietu msgpack – wysyłki do Laravel API jako JSON")
+            encoding = 'json'
+        self.session = session or create_session()
+        self.encoding = encoding
+        self.state_dir = state_dir
+        self.chunk_rows = chunk_rows
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self._executor = None
+        os.makedirs(state_dir, exist_ok=True)
+
+    def background(self) -> UploadQueue:
+        """
+        Nowa kolejka wysyłek w tle; wątki są tworzone raz i współdzielone przez kolejne analizy procesu
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upload")
+        return UploadQueue(self._executor)
+
+    def post_payload(self, url: str, payload: dict, compress: bool = True) -> requests.Response:
+        """
+        POST słownika w kodowaniu klienta, skompresowanego gzipem; gdy Laravel nie przyjmuje MessagePack (415),
+        klient przechodzi na JSON na stałe i ponawia wysyłkę
+        """
+        response = self._post_encoded(url, payload, self.encoding, compress)
+        if response.status_code == 415 and self.encoding == 'msgpack':
+            print("⚠️ Laravel API nie przyjmuje MessagePack – dalsze wysyłki jako JSON")
+            self.encoding = 'json'
+            response = self._post_encoded(url, payload, 'json', compress)
+        return response
+
+    def _post_encoded(self, url: str, payload: dict, encoding: str, compress: bool) -> requests.Response:
+        if encoding == 'msgpack':
+            body, headers = pack(payload), {"Content-Type": MSGPACK_TYPE}
+        else:
+            body, headers = json.dumps(payload, default=str).encode(), {"Content-Type": "application/json"}
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        with stage("post", path=urlsplit(url).path, bytes=len(body), encoding=encoding):
+            return self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+
+    def post_file(self, url: str, field: str, filename: str, content: bytes, content_type: str,
+                  data: dict | None = None) -> requests.Response:
+        """
+        Wysyłka binarna jako multipart/form-data (bez base64) z dodatkowymi polami formularza
+        """
+        with stage("post", path=urlsplit(url).path, bytes=len(content)):
+            return self.session.post(url, files={field: (filename, content, content_type)}, data=data or {},
+                                     timeout=self.timeout)
+
+    def send_prices(self, raw: pd.DataFrame, ticker: str, uuid_session: str, parameters: dict,
+                    api_url: str) -> dict:
+        """
+        Wysyła brakujące bary; zwraca {"ok", "rows", "chunks", "status", "error"}
+        """
+        state = self._load_state(ticker).get(api_url)
+        rows = self._delta_rows(raw, state)
+        report = {"ok": True, "rows": int(rows.sum()), "chunks": 0, "status": None, "error": None}
+        if not rows.any():
+            return report
+
+        delta = raw[rows]
+        chunks = range(0, len(delta), self.chunk_rows)
+        for number, start in enumerate(chunks):
+            payload = {
+                "ticker": ticker,
+                "uuid": uuid_session,
+                "parameters": parameters,
+                "chunk": number,
+                "chunks": len(chunks),
+                "stock_columns": price_columns(delta, start, start + self.chunk_rows)
+            }
+            response = self.post_payload(api_url, payload)
+            report.update(chunks=number + 1, status=response.status_code)
+            if not response.ok:
+                report.update(ok=False, error=response.text[:500])
+                return report
+
+        covered_from, covered_to = raw.index[0], raw.index[-1]
+        if state:
+            covered_from = min(covered_from, pd.Timestamp(state["from"]))
+            covered_to = max(covered_to, pd.Timestamp(state["to"]))
+        self._save_state(ticker, api_url, {"from": f"{covered_from:%Y-%m-%d}", "to": f"{covered_to:%Y-%m-%d}"})
+        return report
+
+    @staticmethod
+    def _delta_rows(raw: pd.DataFrame, state: dict | None) -> np.ndarray:
+        if not state:
+            return np.ones(len(raw), dtype=bool)
+        index = raw.index
+        return np.asarray((index < pd.Timestamp(state["from"])) | (index >= pd.Timestamp(state["to"])))
+
+    def _state_path(self, ticker: str) -> str:
+        return os.path.join(self.state_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker)}.json")
+
+    def _load_state(self, ticker: str) -> dict:
+        try:
+            with open(self._state_path(ticker)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, ticker: str, api_url: str, covered: dict):
+        state = self._load_state(ticker)
+        state[api_url] = covered
+        path = self._state_path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
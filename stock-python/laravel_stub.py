@@ -0,0 +1,132 @@
+"""
+Lokalna atrapa Laravel API (stock-api, image, forecast) – do testów i benchmarków wysyłki bez Laravela
+"""
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import gzip
+import json
+import threading
+
+from payload_encoding import MSGPACK_TYPES, unpack
+
+
+def _parse_multipart(content_type: str, body: bytes) -> dict:
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    payload = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        content = part.get_payload(decode=True)
+        if part.get_filename() is None:
+            payload[name] = content.decode()
+        else:
+            payload[name] = {"filename": part.get_filename(), "content_type": part.get_content_type(),
+                             "size": len(content), "content": content}
+    return payload
+
+
+class LaravelStub:
+    """
+    Serwer HTTP przyjmujący POST-y jak Laravel; zapamiętuje odebrane payloady w `received`.
+
+    fail_first > 0 sprawia, że tyle pierwszych żądań dostaje fail_status – do sprawdzania ponowień.
+    msgpack=False odrzuca treści MessagePack kodem 415, jak Laravel bez rozszerzenia msgpack.
+
+        with LaravelStub() as stub:
+            client = LaravelClient(...)
+            client.send_prices(raw, 'BTC-USD', uuid, {}, f"{stub.url}/api/stock-api")
+            stub.received  # [{"path", "encoding", "content_type", "bytes", "payload"}, ...]
+
+    Dla multipart/form-data payload to pola formularza, a pliki mają postać
+    {"filename", "content_type", "size", "content"}.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_first: int = 0, fail_status: int = 503,
+                 msgpack: bool = True):
+        self.received = []
+        self.msgpack = msgpack
+        self.attempts = 0
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.attempts += 1
+                    failing = stub.attempts <= stub.fail_first
+                if failing:
+                    return self._reply(stub.fail_status, {"message": "stub failure"})
+
+                encoding = self.headers.get("Content-Encoding")
+                raw = gzip.decompress(body) if encoding == "gzip" else body
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("multipart/form-data"):
+                    payload = _parse_multipart(content_type, raw)
+                elif content_type in MSGPACK_TYPES:
+                    if not stub.msgpack:
+                        return self._reply(415, {"message": "Unsupported MessagePack body"})
+                    payload = unpack(raw)
+                else:
+                    payload = json.loads(raw)
+                with stub._lock:
+                    stub.received.append({"path": self.path, "encoding": encoding,
+                                          "content_type": content_type.split(';')[0], "bytes": len(body),
+                                          "payload": payload})
+                self._reply(200, {"data": {"ticker": payload.get("ticker"), "chunk": payload.get("chunk")}})
+
+            def _reply(self, status: int, data: dict):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'LaravelStub':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'LaravelStub':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stub Laravel API for offline upload tests')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--fail_first', type=int, default=0, help='Reply with 503 to the first N requests')
+    args = parser.parse_args()
+
+    stub = LaravelStub(host="0.0.0.0", port=args.port, fail_first=args.fail_first)
+    print(f"🧪 Atrapa Laravel API na {stub.url} (API_BASE_URL={stub.url})")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,198 @@
+"""
+Lokalny magazyn notowań OHLCV – jeden plik Parquet na ticker, dociągane są tylko nowe bary
+"""
+import os
+import time
+
+import pandas as pd
+
+from market_summary import MARKET_DATA_CACHE_DIR, read_summary, ticker_filename, write_summary
+
+PRICE_COLUMNS = ['Adj Close', 'Close', 'High', 'Low', 'Open', 'Volume']
+
+
+class YahooProvider:
+    """
+    Źródło notowań z Yahoo Finance (yfinance)
+    """
+
+    def fetch(self, ticker: str | list[str], start: str, end: str | None = None) -> pd.DataFrame:
+        import yfinance as yf
+
+        return yf.download(
+            ticker,
+            start=start,
+            end=end,
+            auto_adjust=False,
+            progress=False
+        )
+
+
+class FixtureProvider:
+    """
+    Źródło offline: gotowe ramki per ticker (np. wczytane z CSV) – do testów bez sieci.
+
+    Zapamiętuje wywołania w `calls`, żeby dało się sprawdzić, o jaki zakres pytał magazyn.
+    """
+
+    def __init__(self, frames: dict[str, pd.DataFrame]):
+        self.frames = frames
+        self.calls = []
+
+    def fetch(self, ticker: str | list[str], start: str, end: str | None = None) -> pd.DataFrame:
+        self.calls.append((ticker, start, end))
+        if isinstance(ticker, list):
+            # jak yf.download dla listy: kolumny (Price, Ticker) na wspólnym kalendarzu, nieznane tickery pominięte
+            known = [t for t in ticker if t in self.frames]
+            return pd.concat({t: self.fetch(t, start, end) for t in known}, axis=1).swaplevel(axis=1)
+
+        frame = self.frames[ticker]
+        frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame
+
+
+def _flatten(raw: pd.DataFrame) -> pd.DataFrame:
+    # yfinance zwraca MultiIndex (Price, Ticker) – w pliku trzymamy same nazwy pól
+    if isinstance(raw.columns, pd.MultiIndex):
+        raw = raw.copy()
+        raw.columns = raw.columns.get_level_values(0)
+    return raw[[col for col in PRICE_COLUMNS if col in raw.columns]]
+
+
+class MarketDataStore:
+    """
+    Magazyn notowań z przyrostowym pobieraniem.
+
+    get() czyta plik tickera, dociąga od dostawcy tylko bary od ostatniej zapisanej daty
+    (ostatni bar jest pobierany ponownie, bo mógł być niepełny), dopisuje je i zwraca
+    wycinek od start_date w formacie yf.download (kolumny MultiIndex Price/Ticker).
+    Obok pliku zapisuje podsumowanie (market_summary) – z niego serwer API zna ostatni bar bez pobierania.
+    """
+
+    def __init__(self, cache_dir: str = MARKET_DATA_CACHE_DIR, provider=None):
+        self.cache_dir = cache_dir
+        self.provider = provider or YahooProvider()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker_filename(ticker)}.parquet")
+
+    def load(self, ticker: str) -> pd.DataFrame | None:
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def save(self, ticker: str, frame: pd.DataFrame, checked: bool = True):
+        """
+        checked – dostawca został właśnie zapytany o nowe bary (czas sprawdzenia trafia do podsumowania);
+        po nieudanym dociągnięciu zostaje poprzedni czas
+        """
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+        previous = read_summary(ticker, self.cache_dir) or {}
+        write_summary(ticker, {
+            "last_bar": f"{frame.index[-1]:%Y-%m-%d %H:%M:%S}",
+            "covered_from": frame.attrs['covered_from'],
+            "checked_at": time.time() if checked else previous.get("checked_at")
+        }, self.cache_dir)
+
+    def get(self, ticker: str, start_date: str) -> pd.DataFrame:
+        start = pd.Timestamp(start_date)
+        cached = self.load(ticker)
+
+        if cached is None or cached.empty:
+            frame = _flatten(self.provider.fetch(ticker, start=start_date))
+            print(f"🌐 Pobrano pełną historię {ticker}: {len(frame)} barów")
+            return self._merge(ticker, None, frame, start)
+
+        covered_from = pd.Timestamp(cached.attrs.get('covered_from', cached.index[0]))
+        parts = []
+        checked = True
+
+        # brakujący początek historii (wcześniejszy start_date niż dotąd pobierany)
+        if start < covered_from:
+            parts.append(_flatten(self.provider.fetch(ticker, start=start_date, end=f"{covered_from:%Y-%m-%d}")))
+
+        try:
+            parts.append(_flatten(self.provider.fetch(ticker, start=f"{cached.index[-1]:%Y-%m-%d}")))
+        except Exception as e:
+            print(f"⚠️ Nie udało się dociągnąć nowych barów {ticker}, używam magazynu: {e}")
+            checked = False
+
+        return self._merge(ticker, cached, pd.concat(parts) if parts else cached.iloc[0:0], start, checked)
+
+    def read(self, ticker: str, start_date: str) -> pd.DataFrame | None:
+        """
+        Wycinek od start_date jak z get(), ale tylko z pliku – bez zapytań do dostawcy; None, gdy magazyn
+        nie obejmuje start_date (np. analiza wsadowa czyta bary dociągnięte chwilę wcześniej przez get_many)
+        """
+        start = pd.Timestamp(start_date)
+        cached = self.load(ticker)
+        if cached is None or cached.empty or start < pd.Timestamp(cached.attrs.get('covered_from', cached.index[0])):
+            return None
+        return _as_download(ticker, cached, start)
+
+    def get_many(self, tickers: list[str], start_date: str) -> dict[str, pd.DataFrame]:
+        """
+        Jak get(), ale dla całej listy tickerów jednym zapytaniem do dostawcy.
+
+        Zakres zapytania zaczyna się od najwcześniejszej daty potrzebnej któremukolwiek tickerowi.
+        """
+        start = pd.Timestamp(start_date)
+        cached = {ticker: self.load(ticker) for ticker in tickers}
+
+        needed = []
+        for frame in cached.values():
+            if frame is None or frame.empty:
+                needed.append(start)
+            else:
+                covered_from = pd.Timestamp(frame.attrs.get('covered_from', frame.index[0]))
+                needed.append(start if start < covered_from else frame.index[-1])
+        fetch_from = min(needed)
+
+        raw = self.provider.fetch(list(tickers), start=f"{fetch_from:%Y-%m-%d}")
+        print(f"🌐 Pobrano {len(tickers)} tickerów jednym zapytaniem od {fetch_from:%Y-%m-%d}")
+
+        frames = {}
+        for ticker in tickers:
+            if isinstance(raw.columns, pd.MultiIndex) and ticker in raw.columns.get_level_values(-1):
+                # wspólny kalendarz wielu tickerów – dni bez notowań danego tickera są puste
+                fetched = raw.xs(ticker, level=-1, axis=1).dropna(how='all')
+            else:
+                fetched = raw.iloc[0:0]
+            frames[ticker] = self._merge(ticker, cached[ticker], _flatten(fetched), start)
+        return frames
+
+    def _merge(self, ticker: str, cached: pd.DataFrame | None, fetched: pd.DataFrame,
+               start: pd.Timestamp, checked: bool = True) -> pd.DataFrame:
+        """
+        Dopisuje pobrane bary do magazynu i zwraca wycinek od start w formacie yf.download
+        """
+        if cached is None or cached.empty:
+            frame = fetched
+            covered_from = start
+        else:
+            covered_from = min(start, pd.Timestamp(cached.attrs.get('covered_from', cached.index[0])))
+            frame = pd.concat([cached, fetched])
+            frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+            print(f"💾 Magazyn {ticker}: {len(cached)} barów z dysku, {len(fetched)} dociągniętych")
+
+        if not frame.empty:
+            frame.index.name = 'Date'
+            frame.attrs['covered_from'] = f"{covered_from:%Y-%m-%d}"
+            self.save(ticker, frame, checked)
+
+        return _as_download(ticker, frame, start)
+
+
+def _as_download(ticker: str, frame: pd.DataFrame, start: pd.Timestamp) -> pd.DataFrame:
+    # wycinek od start w formacie yf.download: kolumny MultiIndex (Price, Ticker)
+    frame = frame[frame.index >= start]
+    frame.columns = pd.MultiIndex.from_product([frame.columns, [ticker]], names=['Price', 'Ticker'])
+    return frame
@@ -0,0 +1,52 @@
+"""
+Podsumowanie magazynu notowań – plik JSON obok Parquet tickera (ostatni bar, początek historii, czas sprawdzenia
+u dostawcy). Czyta je proces serwera API: bez pandas i bez zapytań do dostawcy notowań.
+"""
+from datetime import date
+import json
+import os
+import re
+import time
+
+MARKET_DATA_CACHE_DIR = os.getenv("MARKET_DATA_CACHE_DIR", "/app/cache/prices")
+
+
+def ticker_filename(ticker: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+
+
+def summary_path(ticker: str, cache_dir: str = MARKET_DATA_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"{ticker_filename(ticker)}.json")
+
+
+def write_summary(ticker: str, summary: dict, cache_dir: str = MARKET_DATA_CACHE_DIR):
+    path = summary_path(ticker, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, path)
+
+
+def read_summary(ticker: str, cache_dir: str = MARKET_DATA_CACHE_DIR) -> dict | None:
+    try:
+        with open(summary_path(ticker, cache_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def fresh_last_bar(ticker: str, start_date: str, max_age: float,
+                   cache_dir: str = MARKET_DATA_CACHE_DIR) -> str | None:
+    """
+    Ostatni bar z magazynu, jeśli dostawca był pytany o nowe bary najwyżej max_age sekund temu
+    i magazyn obejmuje historię od start_date – inaczej None (analiza i tak dociągnie dane).
+    """
+    summary = read_summary(ticker, cache_dir)
+    if summary is None or summary.get("checked_at") is None or time.time() - summary["checked_at"] > max_age:
+        return None
+    try:
+        if date.fromisoformat(start_date[:10]) < date.fromisoformat(summary["covered_from"]):
+            return None
+    except ValueError:
+        return None
+    return summary["last_bar"]
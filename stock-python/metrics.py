@@ -0,0 +1,130 @@
+"""
+Metryki serwera w formacie tekstowym Prometheusa – histogramy etapów analizy, kolejka, zadania, pamięć wyników
+"""
+import math
+import threading
+
+# granice kubełków czasu [s]: od zapisu małego POST-a po pełny trening na długiej historii
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# granice kubełków szczytu pamięci procesu [MB]
+MEMORY_BUCKETS = (128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple = SECONDS_BUCKETS, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.labels = labels
+        # etykiety → (liczniki kubełków, suma, liczba obserwacji)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(round(total, 6))}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+def snapshot(name: str, help: str, values: dict[tuple, float] | float, labels: tuple = (),
+             kind: str = "gauge") -> list[str]:
+    """
+    Wartości odczytywane przy renderowaniu z cudzych statystyk (harmonogram, pamięć wyników) – bez stanu w module
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    if not isinstance(values, dict):
+        values = {(): values}
+    for key, value in sorted(values.items()):
+        if value is not None:
+            lines.append(f"{name}{_labels(labels, key)} {_number(value)}")
+    return lines
+
+
+STAGE_SECONDS = Histogram("stock_stage_seconds", "Czas etapu analizy (download, fit, predict, post, ...)",
+                          labels=("stage", "target"))
+STAGE_PEAK_RSS = Histogram("stock_stage_peak_rss_megabytes", "Szczyt RSS procesu workera w czasie etapu",
+                           MEMORY_BUCKETS, labels=("stage",))
+STAGE_FAILURES = Counter("stock_stage_failures_total", "Etapy zakończone wyjątkiem", labels=("stage",))
+JOB_WAIT_SECONDS = Histogram("stock_job_wait_seconds", "Czas oczekiwania zadania w kolejce harmonogramu",
+                             labels=("function",))
+JOB_SECONDS = Histogram("stock_job_seconds", "Czas zadania w puli workerów (z oczekiwaniem na wynik)",
+                        labels=("function",))
+TASKS = Counter("stock_tasks_total", "Zakończone zadania API według rodzaju i statusu", labels=("kind", "status"))
+
+
+def observe_timings(timings: list[dict] | None):
+    """
+    Przenosi pomiary etapów zwrócone przez stock_model (progress.collect) do histogramów
+    """
+    for record in timings or ():
+        target = record.get("target") or record.get("path") or ""
+        STAGE_SECONDS.observe(record["seconds"], stage=record["stage"], target=target)
+        STAGE_PEAK_RSS.observe(record["peak_rss_mb"], stage=record["stage"])
+        if not record.get("ok", True):
+            STAGE_FAILURES.inc(stage=record["stage"])
+
+
+def render(*extra: list[str]) -> str:
+    lines = []
+    for metric in (STAGE_SECONDS, STAGE_PEAK_RSS, STAGE_FAILURES, JOB_WAIT_SECONDS, JOB_SECONDS, TASKS):
+        lines.extend(metric.render())
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
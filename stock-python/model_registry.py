@@ -0,0 +1,101 @@
+"""
+Rejestr wytrenowanych modeli XGBoost – booster zapisany per ticker, schemat cech i hiperparametry
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from xgboost import XGBRegressor
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "/app/cache/models")
+# model młodszy niż TTL jest w trybie forecast_only używany bez douczania
+MODEL_FRESH_TTL = int(os.getenv("MODEL_FRESH_TTL", str(24 * 3600)))
+
+
+def model_key(columns: list[str], params: dict, trained_from: pd.Timestamp, test_size_pct: float | None) -> str:
+    """
+    Skrót schematu cech, hiperparametrów i podziału danych – zmiana któregokolwiek oznacza inny model.
+
+    Początek zbioru treningowego (start_date) i test_size_pct wyznaczają osobne miejsce w rejestrze:
+    analizy z innym podziałem nie nadpisują sobie modeli ani nie douczają cudzego. Sama data końca
+    treningu nie jest częścią klucza – nowe bary przy tym samym podziale douczają ten sam model.
+    """
+    payload = json.dumps({"columns": list(columns), "params": params, "trained_from": f"{trained_from:%Y-%m-%d}",
+                          "test_size_pct": test_size_pct}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def history_hash(X: pd.DataFrame, y: pd.Series | pd.DataFrame, until: pd.Timestamp) -> str:
+    """
+    Odcisk danych treningowych do daty until włącznie; y to jeden target albo ramka targetów (model wielowyjściowy).
+
+    Kolumny Google Trends są pomijane – odświeżenie cache Trends przeskalowuje końcówkę
+    serii, a to nie powinno wymuszać trenowania od zera.
+    """
+    columns = [col for col in X.columns if not col.startswith('gt_')]
+    frame = X.loc[:until, columns]
+    if isinstance(y, pd.DataFrame):
+        frame = frame.join(y.loc[:until].add_prefix('target_'))
+    else:
+        frame = frame.assign(target=y.loc[:until])
+    hashed = pd.util.hash_pandas_object(frame, index=True).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+class ModelRegistry:
+    """
+    Booster zapisywany jest w jednym pliku .ubj, a metadane (do jakiej daty był trenowany,
+    odcisk historii, liczba douczeń) jako atrybuty boostera – zapis jest atomowy.
+    """
+
+    def __init__(self, registry_dir: str = MODEL_REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        os.makedirs(registry_dir, exist_ok=True)
+
+    def path(self, ticker: str, key: str) -> str:
+        return os.path.join(self.registry_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker)}_{key}.ubj")
+
+    def load(self, ticker: str, key: str) -> tuple['XGBRegressor', dict] | None:
+        path = self.path(ticker, key)
+        if not os.path.exists(path):
+            return None
+
+        from xgboost import XGBRegressor
+        model = XGBRegressor()
+        try:
+            model.load_model(path)
+        except Exception as e:
+            print(f"⚠️ Nie udało się wczytać modelu {ticker} z rejestru: {e}")
+            return None
+
+        attrs = model.get_booster().attributes()
+        meta = {
+            "trained_until": pd.Timestamp(attrs['trained_until']),
+            "history_hash": attrs['history_hash'],
+            "warm_starts": int(attrs['warm_starts']),
+            "updated_at": float(attrs['updated_at'])
+        }
+        return model, meta
+
+    def save(self, ticker: str, key: str, model: 'XGBRegressor', trained_until: pd.Timestamp, history: str,
+             warm_starts: int):
+        model.get_booster().set_attr(
+            trained_until=pd.Timestamp(trained_until).isoformat(),
+            history_hash=history,
+            warm_starts=str(warm_starts),
+            updated_at=str(time.time())
+        )
+        path = self.path(ticker, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp.ubj"
+        model.save_model(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def is_fresh(meta: dict, ttl: int = MODEL_FRESH_TTL) -> bool:
+        return time.time() - meta['updated_at'] < ttl
@@ -0,0 +1,74 @@
+"""
+Zwarte kodowania danych między usługami – MessagePack (pakiet msgpack, opcjonalny) dla treści żądań
+i odpowiedzi oraz kompresja odpowiedzi API (Brotli przez brotli-asgi, gdy jest zainstalowany, inaczej gzip)
+"""
+import os
+import re
+
+MSGPACK_TYPE = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK_TYPE, "application/x-msgpack")
+
+# mniejszych odpowiedzi nie opłaca się kompresować (nagłówki i tak są większe niż zysk)
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1000"))
+# 4 – kompromis szybkości i stopnia kompresji dla odpowiedzi generowanych na bieżąco
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+
+def msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pack(payload) -> bytes:
+    """
+    MessagePack; typy spoza formatu (daty, Decimal, ...) jako tekst – jak json.dumps(default=str)
+    """
+    import msgpack
+
+    return msgpack.packb(payload, default=str)
+
+
+def unpack(body: bytes):
+    import msgpack
+
+    return msgpack.unpackb(body)
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    """
+    Czy nagłówek Accept prosi o MessagePack (i pakiet jest dostępny); inaczej odpowiedź idzie jako JSON
+    """
+    media_types = {part.split(';')[0].strip().lower() for part in (accept or "").split(',')}
+    return bool(media_types.intersection(MSGPACK_TYPES)) and msgpack_available()
+
+
+class CompressionMiddleware:
+    """
+    Kompresja odpowiedzi HTTP według Accept-Encoding: br (brotli-asgi), gzip albo bez kompresji.
+
+    Ścieżki z excluded_paths (wyrażenia regularne) idą bez kompresji – np. strumienie SSE, których zdarzenia
+    czekałyby w buforze kompresora. WebSockety przechodzą bez zmian.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, excluded_paths: tuple[str, ...] = ()):
+        self.app = app
+        self.excluded_paths = [re.compile(pattern) for pattern in excluded_paths]
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError:
+            from starlette.middleware.gzip import GZipMiddleware
+
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+            self.encodings = ("gzip",)
+        else:
+            self.compressed = BrotliMiddleware(app, quality=BROTLI_QUALITY, minimum_size=minimum_size)
+            self.encodings = ("br", "gzip")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not any(pattern.match(scope["path"]) for pattern in self.excluded_paths):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -0,0 +1,134 @@
+"""
+Zdarzenia postępu analizy – start/koniec etapów pipeline'u i metryki, przekazywane do odbiorcy (np. puli w app.py),
+oraz pomiary etapów (czas, szczyt pamięci) zwracane w wyniku
+"""
+from contextlib import contextmanager
+import functools
+import resource
+import threading
+import time
+
+STAGES = ('download', 'trends', 'features', 'fit', 'predict', 'forecast', 'plot', 'upload', 'post', 'backtest', 'tune',
+          'flush')
+
+# odbiorca zdarzeń: callable(event: dict); None (np. przy uruchomieniu z CLI) wyłącza emisję
+_sink = None
+
+# pomiary etapów bieżącego wywołania (collect()); None – nie są zbierane
+_records = None
+
+# szczyty pamięci otwartych etapów – zagnieżdżony etap zeruje licznik szczytu, więc przekazuje swój wyżej;
+# stos jest osobny dla każdego wątku (etapy wysyłek i pobrań w tle nie mieszają się z etapami obliczeń)
+_local = threading.local()
+
+
+def _open_peaks() -> list:
+    if not hasattr(_local, "peaks"):
+        _local.peaks = []
+    return _local.peaks
+
+
+def set_sink(sink):
+    """
+    Ustawia odbiorcę zdarzeń i zwraca poprzedniego (do przywrócenia po zadaniu)
+    """
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def emit(event: str, **data):
+    if _sink is None:
+        return
+    try:
+        _sink({"event": event, "time": time.time(), **data})
+    except Exception:
+        # zdarzenia są pomocnicze – błąd odbiorcy nie może przerwać analizy
+        pass
+
+
+def _reset_peak_rss() -> bool:
+    # Linux: zapis "5" do clear_refs zeruje VmHWM, czyli szczyt RSS liczony od tej chwili
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb() -> tuple[float, float]:
+    """
+    (bieżący RSS, szczyt RSS) procesu w MB; bez /proc szczyt to maksimum z całego życia procesu
+    """
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if line.startswith(('VmRSS', 'VmHWM')))
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+@contextmanager
+def collect():
+    """
+    Zbiera pomiary etapów wykonanych wewnątrz bloku: [{"stage", "seconds", "rss_mb", "peak_rss_mb", ...}]
+    """
+    global _records
+    previous, _records = _records, []
+    try:
+        yield _records
+    finally:
+        _records = previous
+
+
+def with_timings(func):
+    """
+    Dekorator funkcji zwracających słownik: dopisuje do wyniku "timings" z pomiarami etapów
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with collect() as timings:
+            result = func(*args, **kwargs)
+        if isinstance(result, dict):
+            result["timings"] = timings
+        return result
+    return wrapper
+
+
+@contextmanager
+def stage(name: str, **info):
+    """
+    Otacza etap pipeline'u zdarzeniami stage_started / stage_finished (albo stage_failed)
+    i zapisuje jego czas oraz szczyt pamięci do collect(); zwraca słownik info, który etap może uzupełnić
+    o wartości znane dopiero po wykonaniu (trafiają do stage_finished i collect())
+    """
+    emit("stage_started", stage=name, **info)
+    open_peaks = _open_peaks()
+    if open_peaks:
+        open_peaks[-1] = max(open_peaks[-1], _rss_mb()[1])
+    # licznik szczytu jest wspólny dla procesu – zeruje go tylko wątek główny, etap w tle dostaje szczyt procesu
+    if threading.current_thread() is threading.main_thread():
+        _reset_peak_rss()
+    open_peaks.append(0.0)
+    start = time.perf_counter()
+    failed = None
+    try:
+        yield info
+    except BaseException as e:
+        failed = e
+        raise
+    finally:
+        seconds = round(time.perf_counter() - start, 4)
+        rss, peak = _rss_mb()
+        peak = max(peak, open_peaks.pop())
+        if open_peaks:
+            open_peaks[-1] = max(open_peaks[-1], peak)
+        measure = {"seconds": seconds, "rss_mb": round(rss, 1), "peak_rss_mb": round(peak, 1)}
+        if _records is not None:
+            _records.append({"stage": name, **info, **measure, "ok": failed is None})
+        if failed is None:
+            emit("stage_finished", stage=name, **measure, **info)
+        else:
+            emit("stage_failed", stage=name, **measure, error=str(failed), **info)
@@ -0,0 +1,122 @@
+"""
+Pamięć wyników analiz – klucz z parametrów żądania i ostatniego baru danych, łączenie identycznych żądań w locie
+"""
+import asyncio
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+from typing import Awaitable, Callable
+
+# limit liczby wyników i ich łącznego rozmiaru (JSON); najdawniej używane wypadają pierwsze
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def request_key(params: dict, last_bar: str | None) -> str:
+    """
+    Adres wyniku: te same parametry na tych samych danych (do tego samego ostatniego baru) dają ten sam wynik
+    """
+    body = json.dumps({"params": params, "last_bar": last_bar}, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Wyniki udanych analiz w pamięci procesu serwera.
+
+    get_or_compute() zwraca wynik z pamięci, a jeśli identyczne żądanie właśnie się liczy –
+    czeka na jego wynik zamiast uruchamiać drugie. Wywoływane tylko z pętli zdarzeń serwera.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(entry[0])
+
+    def put(self, key: str, result: dict):
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (copy.deepcopy(result), size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Usuwa zapamiętane wyniki (np. po zmianie parametrów modelu); liczone właśnie żądania nie są przerywane
+        """
+        self._entries.clear()
+        self.bytes = 0
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> tuple[dict, str]:
+        """
+        Zwraca (wynik, źródło), gdzie źródło to "hit", "coalesced" albo "miss".
+
+        Do pamięci trafiają tylko wyniki z success=True; nieudane są przekazywane
+        czekającym, ale kolejne żądanie liczy je od nowa.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, "hit"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            # shield – rozłączenie jednego z czekających nie anuluje wspólnego zadania
+            return copy.deepcopy(await asyncio.shield(inflight)), "coalesced"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+            if result.get("success"):
+                self.put(key, result)
+            future.set_result(copy.deepcopy(result))
+            return result, "miss"
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # wyjątek odbierany jest przez czekających; bez nich nie ma być logowany jako nieobsłużony
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None
+        }
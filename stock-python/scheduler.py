@@ -0,0 +1,189 @@
+"""
+Harmonogram zadań analizy – ograniczona kolejka, priorytety, sprawiedliwa kolejność wywołujących i odrzucanie nadmiaru
+"""
+import asyncio
+from collections import OrderedDict, deque
+import math
+import os
+import time
+from typing import Awaitable, Callable
+
+# limit zadań przyjętych, a jeszcze nieuruchomionych – powyżej żądanie dostaje 429
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "50"))
+# rdzenie do podziału między równoległe zadania (w kontenerze os.cpu_count() widzi rdzenie hosta)
+ANALYSIS_CORES = int(os.getenv("ANALYSIS_CORES", "0")) or os.cpu_count() or 1
+# Retry-After przed pierwszym zmierzonym czasem zadania
+DEFAULT_JOB_SECONDS = float(os.getenv("DEFAULT_JOB_SECONDS", "30"))
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# ile ostatnich czasów oczekiwania / wykonania trafia do statystyk
+_SAMPLES = 500
+
+
+class SchedulerFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Kolejka analiz jest pełna, spróbuj ponownie za {retry_after} s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    Miejsce w harmonogramie: przyjęte przez admit(), uruchamiane przez run() albo zwalniane przez discard()
+    """
+    __slots__ = ('caller', 'priority', 'admitted_at', 'grant', 'started', 'closed', 'wait_seconds')
+
+    def __init__(self, caller: str, priority: str):
+        self.caller = caller
+        self.priority = priority
+        self.admitted_at = time.monotonic()
+        self.grant = None
+        self.started = False
+        self.closed = False
+        self.wait_seconds = None
+
+
+class JobScheduler:
+    """
+    Dopuszcza do puli najwyżej `concurrency` zadań naraz.
+
+    Czekające zadania wybierane są najpierw według priorytetu (interactive przed batch), a w obrębie
+    priorytetu po kolei od każdego wywołującego (round-robin) – duża partia jednego klienta nie blokuje
+    pozostałych. Każde zadanie dostaje n_jobs = rdzenie / concurrency wątków XGBoost.
+
+    Wywoływane tylko z pętli zdarzeń serwera.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int = ANALYSIS_QUEUE_SIZE, cores: int = ANALYSIS_CORES):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.n_jobs = max(1, cores // concurrency)
+        self._queues: dict[str, OrderedDict[str, deque[Ticket]]] = {name: OrderedDict() for name in PRIORITIES}
+        self.waiting = 0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._waits = deque(maxlen=_SAMPLES)
+        self._durations = deque(maxlen=_SAMPLES)
+
+    def admit(self, caller: str, priority: str = "interactive", bounded: bool = True) -> Ticket:
+        """
+        Przyjmuje zadanie albo rzuca SchedulerFull; bounded=False dla kolejnych kroków zadania już przyjętego
+        (np. tickerów partii), żeby partia nie odrzucała sama siebie
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Nieznany priorytet: {priority} (dostępne: {', '.join(PRIORITIES)})")
+        if bounded and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerFull(self.retry_after())
+        self.waiting += 1
+        self.admitted += 1
+        return Ticket(caller, priority)
+
+    def discard(self, ticket: Ticket):
+        """
+        Zwalnia miejsce zadania, które nie zostało uruchomione (np. wynik z pamięci); wielokrotne wywołanie jest bezpieczne
+        """
+        if not ticket.started and not ticket.closed:
+            ticket.closed = True
+            self.waiting -= 1
+            if ticket.grant is not None:
+                self._remove(ticket)
+
+    async def run(self, ticket: Ticket, job: Callable[[int], Awaitable]):
+        """
+        Czeka na swoją kolej i wykonuje job(n_jobs)
+        """
+        ticket.grant = asyncio.get_running_loop().create_future()
+        self._queues[ticket.priority].setdefault(ticket.caller, deque()).append(ticket)
+        self._dispatch()
+
+        try:
+            await ticket.grant
+        except asyncio.CancelledError:
+            if ticket.started:
+                self._release(ticket, 0.0)
+            else:
+                self.discard(ticket)
+            raise
+
+        start = time.monotonic()
+        try:
+            return await job(self.n_jobs)
+        finally:
+            self._release(ticket, time.monotonic() - start)
+
+    def _dispatch(self):
+        while self.running < self.concurrency:
+            ticket = self._next()
+            if ticket is None:
+                return
+            ticket.started = True
+            ticket.wait_seconds = time.monotonic() - ticket.admitted_at
+            self._waits.append(ticket.wait_seconds)
+            self.waiting -= 1
+            self.running += 1
+            ticket.grant.set_result(None)
+
+    def _next(self) -> Ticket | None:
+        for callers in self._queues.values():
+            if callers:
+                caller, queue = callers.popitem(last=False)
+                ticket = queue.popleft()
+                if queue:
+                    # wywołujący wraca na koniec kolejki – następny bierze kolejny klient
+                    callers[caller] = queue
+                return ticket
+        return None
+
+    def _remove(self, ticket: Ticket):
+        callers = self._queues[ticket.priority]
+        queue = callers.get(ticket.caller)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del callers[ticket.caller]
+
+    def _release(self, ticket: Ticket, seconds: float):
+        if ticket.closed:
+            return
+        ticket.closed = True
+        self.running -= 1
+        self.completed += 1
+        self._durations.append(seconds)
+        self._dispatch()
+
+    def retry_after(self) -> int:
+        """
+        Szacowany czas do zwolnienia miejsca w kolejce: średni czas zadania / liczba równoległych zadań
+        """
+        average = sum(self._durations) / len(self._durations) if self._durations else DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(average / self.concurrency))
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        now = time.monotonic()
+        oldest = [queue[0].admitted_at for callers in self._queues.values() for queue in callers.values()]
+        return {
+            "concurrency": self.concurrency,
+            "n_jobs": self.n_jobs,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "queued": {
+                name: {"jobs": sum(len(queue) for queue in callers.values()), "callers": len(callers)}
+                for name, callers in self._queues.items()
+            },
+            "oldest_wait_seconds": round(now - min(oldest), 3) if oldest else 0.0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "wait_seconds": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else None,
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None
+            },
+            "job_seconds_avg": round(sum(self._durations) / len(self._durations), 3) if self._durations else None,
+            "retry_after": self.retry_after()
+        }
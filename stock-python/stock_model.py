@@ -1,376 +1,1233 @@
 # %% --------------------------------------------------------------------------
 # 1. IMPORTY & PARAMETRY
 # -----------------------------------------------------------------------------
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 import pandas as pd
 import numpy as np
-import yfinance as yf
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
-from ta.volatility import BollingerBands
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.model_selection import train_test_split
-from xgboost import XGBRegressor
-import matplotlib.pyplot as plt
-from datetime import timedelta, datetime
-from pytrends.request import TrendReq
 import os
 import requests
 import json
-import io
-import base64
 import uuid
 import argparse
 import sys
+import time
+
+from backtest import BACKTEST_FOLDS, BACKTEST_MODES, walk_forward
+from charts import CHART_PRESETS, get_template, render_chart, resolve_preset
+from feature_stream import FeatureStream, FeatureStreamBatch
+from feature_store import FeatureStore
+from indicators import feature_matrix
+from laravel_client import API_BASE_URL, LaravelClient, UploadQueue, forecast_columns, response_report
+from market_data import MarketDataStore
+from model_registry import ModelRegistry, history_hash, model_key
+from progress import emit, stage, with_timings
+from trends_cache import TrendsCache
+from tuning import SEARCH_MODES, TUNING_TRIALS, TuningStore, tune
+
+# XGBoost, scikit-learn, SciPy i matplotlib importowane są dopiero w etapach, które ich używają –
+# `--help`, import modułu i serwer API nie płacą za nie; procesy liczące analizy ładują je z góry przez preload()
+if TYPE_CHECKING:
+    from xgboost import XGBRegressor
+
+STOCK_API_URL = f"{API_BASE_URL}/api/stock-api"
+IMAGE_API_URL = f"{API_BASE_URL}/api/stock-api/image"
+FORECAST_API_URL = f"{API_BASE_URL}/api/stock-api/forecast"
 
 # Parsowanie argumentów z linii komend
-def parse_arguments():
+def parse_arguments(argv=None):
     parser = argparse.ArgumentParser(description='Stock Analysis with XGBoost')
     parser.add_argument('--ticker', type=str, default='BTC-USD', help='Stock ticker symbol')
     parser.add_argument('--trends', type=str, default=None, help='Google trends tag')
     parser.add_argument('--start_date', type=str, default='2017-01-01', help='Start date for analysis')
     parser.add_argument('--test_size_pct', type=float, default=0.15, help='Test size percentage')
     parser.add_argument('--forecast_days', type=int, default=20, help='Number of forecast days')
+    parser.add_argument('--forecast_only', action='store_true',
+                        help='Skip training when a fresh model exists in the registry')
+    parser.add_argument('--chart_preset', type=str, default=None, choices=list(CHART_PRESETS),
+                        help='Chart output: png_hd, png, webp, svg, series (JSON for the frontend) or none')
+    parser.add_argument('--forecast_mode', type=str, default='recursive', choices=FORECAST_MODES,
+                        help='recursive: one-day model applied day by day; direct: an extra multi-output model '
+                             'predicting all forecast days in a single call (trees per day capped by '
+                             'DIRECT_TREE_BUDGET; roughly doubles the fit time)')
+    parser.add_argument('--simulations', type=int, default=FORECAST_SIMULATIONS, metavar='PATHS',
+                        help='Monte Carlo paths for forecast percentile bands (residuals from the test set); '
+                             '0 disables the bands')
+    parser.add_argument('--backtest', type=int, nargs='?', const=BACKTEST_FOLDS, default=None, metavar='FOLDS',
+                        help=f'Run a walk-forward backtest over FOLDS test windows (default {BACKTEST_FOLDS}) '
+                             'instead of the analysis; nothing is sent to the API')
+    parser.add_argument('--backtest_mode', type=str, default='expanding', choices=BACKTEST_MODES,
+                        help='Backtest training window: expanding or rolling')
+    parser.add_argument('--tune', type=str, nargs='?', const='random', default=None, choices=SEARCH_MODES,
+                        help='Search XGBoost hyperparameters (random or successive halving, default random) with '
+                             'early stopping and save the best configuration for the ticker instead of the analysis')
+    parser.add_argument('--tune_trials', type=int, default=TUNING_TRIALS,
+                        help=f'Number of configurations to try (default {TUNING_TRIALS})')
+    parser.add_argument('--sweep_test_size_pct', type=float, nargs='+', default=None, metavar='PCT',
+                        help='Sweep: compare the analysis over these test sizes (data, features and models shared '
+                             'across the grid); nothing is sent to the API')
+    parser.add_argument('--sweep_forecast_days', type=int, nargs='+', default=None, metavar='DAYS',
+                        help='Sweep: compare the analysis over these forecast horizons')
 
-    return parser.parse_args()
-
-# Parsuj argumenty
-args = parse_arguments()
+    return parser.parse_args(argv)
 
-TICKER = args.ticker
-GOOGLE_TRENDS_KEY = args.trends
-START_DATE = args.start_date
-TEST_SIZE_PCT = args.test_size_pct
-FORECAST_DAYS = args.forecast_days
-
-# Generuj UUID dla tej sesji
-uuid_session = str(uuid.uuid4())
+def preload():
+    """
+    Ładuje z góry biblioteki, które etapy importują leniwie, i szablon wykresu – dla procesów, które na pewno
+    będą liczyć analizy (rozgrzewana pula workerów app.py), żeby pierwsze zadanie nie płaciło za importy
+    """
+    import pytrends.request  # noqa: F401
+    import scipy.signal  # noqa: F401
+    import sklearn.metrics  # noqa: F401
+    import xgboost  # noqa: F401
+    import yfinance  # noqa: F401
 
-print(f"🚀 Rozpoczynam analizę dla {TICKER}")
-print(f"📈 Google Trends: {GOOGLE_TRENDS_KEY}")
-print(f"📅 Data rozpoczęcia: {START_DATE}")
-print(f"📊 Procent testu: {TEST_SIZE_PCT}")
-print(f"🔮 Dni prognozy: {FORECAST_DAYS}")
-print(f"🆔 UUID sesji: {uuid_session}")
+    get_template()
 
 # --------------------------------------------
 # 1. Pobranie danych bez MultiIndex
 # --------------------------------------------
-try:
-    raw = yf.download(
-        TICKER,
-        start=START_DATE,
-        auto_adjust=False,
-        progress=False
-    )
-    print(f"✅ Pobrano {len(raw)} dni danych dla {TICKER}")
-except Exception as e:
-    print(f"❌ Błąd pobierania danych: {e}")
-    sys.exit(1)
+_market_store = None
 
-def send_stock_data_to_api(raw: pd.DataFrame, api_url: str = "http://laravel.test/api/stock-api") -> requests.Response | None:
+def get_market_store() -> MarketDataStore:
+    global _market_store
+    if _market_store is None:
+        _market_store = MarketDataStore()
+    return _market_store
+
+def download_prices(ticker: str, start_date: str) -> pd.DataFrame:
     """
-    Przesyła dane giełdowe do API jako JSON.
+    Notowania OHLCV z lokalnego magazynu – z Yahoo Finance dociągane są tylko brakujące bary.
     """
-    try:
-        raw_copy = raw.copy()
-        # Upewnij się, że kolumny są typu string
-        if isinstance(raw_copy.columns, pd.MultiIndex):
-            raw_copy.columns = ['_'.join(map(str, col)).strip() for col in raw_copy.columns]
-        else:
-            raw_copy.columns = [str(col) for col in raw_copy.columns]
+    return get_market_store().get(ticker, start_date)
 
-        # Konwersja do listy rekordów
-        raw_json_records = raw_copy.reset_index().to_dict(orient='records')
+_laravel_client = None
 
-        # Payload do API
-        payload = {
-            "ticker": TICKER,
-            "uuid": uuid_session,
-            "parameters": {
-                "start_date": START_DATE,
-                "test_size_pct": TEST_SIZE_PCT,
-                "forecast_days": FORECAST_DAYS
-            },
-            "stock_data": raw_json_records
-        }
+def get_laravel_client() -> LaravelClient:
+    global _laravel_client
+    if _laravel_client is None:
+        _laravel_client = LaravelClient()
+    return _laravel_client
 
-        # Wysłanie żądania POST
-        response = requests.post(
-            url=api_url,
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload, default=str),
-            timeout=30
-        )
-        return response
+def send_stock_data_to_api(raw: pd.DataFrame, ticker: str, uuid_session: str, parameters: dict,
+                           api_url: str = STOCK_API_URL) -> dict:
+    """
+    Przesyła do API notowania, których Laravel jeszcze nie ma – kolumnowo, w paczkach, z ponowieniami.
+
+    Zwraca raport {"ok", "rows", "chunks", "status", "error"}.
+    """
+    try:
+        return get_laravel_client().send_prices(raw, ticker, uuid_session, parameters, api_url)
     except Exception as e:
         print(f"❌ Błąd podczas wysyłania danych do API: {e}")
-        return None
-
-# Wyślij dane do API
-response = send_stock_data_to_api(raw)
-if response and response.ok:
-    print("✅ Dane zostały wysłane poprawnie do Laravel API.")
-elif response:
-    print(f"❌ Błąd API: {response.status_code} – {response.text}")
-else:
-    print("❌ Nie udało się wysłać danych – brak odpowiedzi.")
+        return {"ok": False, "rows": 0, "chunks": 0, "status": None, "error": str(e)}
 
-# ► jeśli przyjdzie MultiIndex: pole nazwy = 0, ticker = 1
-if isinstance(raw.columns, pd.MultiIndex):
-    raw.columns = raw.columns.get_level_values(0)
+def prepare_prices(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Zostawia z danych Yahoo tylko kolumny close/volume z indeksem bez strefy czasowej.
 
-# teraz wiemy, że mamy zwykłe 'Close', 'Volume', ...
-btc = raw[['Close', 'Volume']].copy()
-btc.columns = ['close', 'volume']
-btc.index = btc.index.tz_localize(None)
+    Kopiowane są tylko te dwie kolumny, nie cała ramka notowań.
+    """
+    # ► jeśli przyjdzie MultiIndex: pole nazwy = 0, ticker = 1
+    fields = list(raw.columns.get_level_values(0) if isinstance(raw.columns, pd.MultiIndex) else raw.columns)
+    return pd.DataFrame({
+        'close': raw.iloc[:, fields.index('Close')].to_numpy(dtype=float),
+        'volume': raw.iloc[:, fields.index('Volume')].to_numpy(dtype=float)
+    }, index=raw.index.tz_localize(None))
 
 # --------------------------------------------
 # 2. Google Trends
 # --------------------------------------------
-trends_filename = f"google_trends_{TICKER.replace('-', '_')}.csv"
-gt = None
-use_trends = False
-
-try:
-    pytrends = TrendReq(hl='en-US', tz=360, requests_args={'headers': {'User-Agent': 'Mozilla/5.0'}})
-    search_term = (GOOGLE_TRENDS_KEY if GOOGLE_TRENDS_KEY is not None
-                   else 'bitcoin' if 'BTC' in TICKER.upper()
-                   else TICKER.split('-')[0].lower())
-    pytrends.build_payload([search_term], timeframe=f'{START_DATE} {datetime.today():%Y-%m-%d}')
-
-    gt = (pytrends.interest_over_time()
-            .rename(columns={search_term: f'gt_{search_term}'})
-            .drop(columns=['isPartial'])
-            .resample('D').ffill())
-    gt.index = pd.to_datetime(gt.index).tz_localize(None)
-    gt.to_csv(trends_filename)
-    print(f"✅ Dane Google Trends zapisane do pliku: {trends_filename} dla '{search_term}'")
-    use_trends = True
-except Exception as e:
-    print(f"❌ Błąd podczas pobierania Google Trends: {e}")
-    # Próba wczytania z pliku
-    if os.path.exists(trends_filename):
-        try:
-            gt = pd.read_csv(trends_filename, index_col=0, parse_dates=True)
-            print(f"📂 Wczytano dane Google Trends z pliku: {trends_filename}")
-            use_trends = True
-        except Exception as e_file:
-            print(f"❌ Błąd przy wczytywaniu pliku z Google Trends: {e_file}")
+def trends_search_term(ticker: str, trends_key: str | None) -> str:
+    return (trends_key if trends_key is not None
+            else 'bitcoin' if 'BTC' in ticker.upper()
+            else ticker.split('-')[0].lower())
+
+_trends_cache = None
+
+def get_trends_cache() -> TrendsCache:
+    global _trends_cache
+    if _trends_cache is None:
+        _trends_cache = TrendsCache()
+    return _trends_cache
+
+def fetch_google_trends(ticker: str, trends_key: str | None, start_date: str) -> pd.DataFrame | None:
+    """
+    Google Trends dla tickera przez współdzielony cache (TTL, sklejanie zakresów, jedno zapytanie na frazę).
+    """
+    search_term = trends_search_term(ticker, trends_key)
+    try:
+        gt = get_trends_cache().get(search_term, start_date)
+    except Exception as e:
+        print(f"❌ Błąd podczas pobierania Google Trends: {e}")
+        return None
+
+    if gt is not None:
+        print(f"✅ Dane Google Trends gotowe dla '{search_term}': {len(gt)} dni")
+    return gt
 
 # --------------------------------------------
 # 3. Łączenie danych
 # --------------------------------------------
-if use_trends:
-    btc = pd.concat([btc, gt], axis=1).ffill()
-else:
-    btc[f'gt_{TICKER.split("-")[0].lower()}'] = np.nan
+def merge_trends(btc: pd.DataFrame, gt: pd.DataFrame | None, ticker: str) -> pd.DataFrame:
+    if gt is not None:
+        return pd.concat([btc, gt], axis=1).ffill()
+
+    btc = btc.copy()
+    btc[f'gt_{ticker.split("-")[0].lower()}'] = np.nan
+    return btc
 
 # %% --------------------------------------------------------------------------
 # 4. FEATURE ENGINEERING
 # -----------------------------------------------------------------------------
-def make_features(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
+# typ macierzy cech: XGBoost i tak trenuje i przewiduje na float32, więc float64 tylko podwaja pamięć
+# Wspólny prealokowany bufor historia + forecast_days (prognoza dopisująca wiersze w miejscu) świadomie pominięto:
+# prognoza nie przelicza macierzy cech, tylko dokłada cechy kolejnych dni przez FeatureStream w O(1),
+# więc bufor niczego by nie oszczędził. Pomiar dawnej i obecnej ścieżki: benchmark.py --memory.
+FEATURE_DTYPE = np.float32
+
+def make_features(df: pd.DataFrame, dtype=FEATURE_DTYPE) -> pd.DataFrame:
+    return complete_rows(df.index, *feature_block(df, dtype))
+
+def feature_block(df: pd.DataFrame, dtype=FEATURE_DTYPE) -> tuple[np.ndarray, list[str]]:
+    """
+    Pełny blok cech wszystkich barów df (także wierszy niepełnych) i nazwy jego kolumn – zawartość FeatureStore
+    """
+    # wskaźniki (log-zwroty, RSI, MACD, Bollinger, z-score wolumenu, Google Trends 7d) i target
+    # = jutrzejszy log-zwrot – liczone jednym przebiegiem po tablicach NumPy
+    trends_col = [col for col in df.columns if col.startswith('gt_')]
+    features = feature_matrix(
+        df['close'].to_numpy(dtype=float),
+        df['volume'].to_numpy(dtype=float),
+        df[trends_col[0]].to_numpy(dtype=float) if trends_col else None
+    )
+    return _feature_block(df, features, dtype)
 
-    # log-zwroty
-    out['ret_1'] = np.log(out['close']).diff()
-    out['ret_7'] = np.log(out['close']).diff(7)
-    out['ret_30'] = np.log(out['close']).diff(30)
+def _feature_block(df: pd.DataFrame, features: dict[str, np.ndarray], dtype) -> tuple[np.ndarray, list[str]]:
+    # kolumny df i cechy (z 'target' na końcu) w jednym buforze `dtype`, bez pośrednich kopii float64
+    columns = list(df.columns) + list(features)
+    block = np.empty((len(df), len(columns)), dtype=dtype)
+    for i, col in enumerate(df.columns):
+        block[:, i] = df[col].to_numpy()
+    for i, values in enumerate(features.values(), start=len(df.columns)):
+        block[:, i] = values
+    return block, columns
+
+def complete_rows(index: pd.DatetimeIndex, block: np.ndarray, columns: list[str]) -> pd.DataFrame:
+    """
+    Wiersze bloku bez NaN jako ramka – jak pd.concat(...).dropna(). Ramka ma jeden blok, więc X i y
+    z split_train_test są jego widokami; gdy pełne wiersze tworzą ciągły zakres (zwykle: bez rozgrzewki
+    wskaźników i ostatniego baru), ramka jest widokiem samego bloku, np. pliku z FeatureStore.
+    """
+    complete = ~np.isnan(block).any(axis=1)
+    rows = np.flatnonzero(complete)
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        block, index = block[rows[0]:rows[-1] + 1], index[rows[0]:rows[-1] + 1]
+    elif not complete.all():
+        block, index = block[complete], index[complete]
+    return pd.DataFrame(block, index=index, columns=columns, copy=False)
 
-    # momentum indicators
-    rsi = RSIIndicator(out['close'], window=14)
-    out['rsi_14'] = rsi.rsi()
+_feature_store = None
 
-    macd = MACD(out['close'])
-    out['macd'] = macd.macd()
-    out['macd_signal'] = macd.macd_signal()
+def get_feature_store() -> FeatureStore:
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = FeatureStore()
+    return _feature_store
 
-    # volatility
-    boll = BollingerBands(out['close'])
-    out['bb_high'] = boll.bollinger_hband()
-    out['bb_low'] = boll.bollinger_lband()
-    out['bb_width'] = (out['bb_high'] - out['bb_low']) / out['close']
+def load_features(df: pd.DataFrame, ticker: str) -> tuple[pd.DataFrame, str]:
+    """
+    make_features przez FeatureStore: blok cech z pliku mapowanego w pamięć (bez kopii), dokładany o nowe bary
+    albo przeliczany od zera, gdy zmieniła się definicja cech. Zwraca (ramka jak make_features, źródło).
+    """
+    block, columns, source = get_feature_store().load(ticker, df, feature_block)
+    return complete_rows(df.index, block, columns), source
 
-    # wolumen – z-score
-    out['vol_z'] = (out['volume'] - out['volume'].rolling(30).mean()) / out['volume'].rolling(30).std()
+def make_features_batch(frames: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """
+    make_features dla wielu tickerów: tickery o identycznym kalendarzu liczone są jako wiersze
+    jednej macierzy ticker × czas – jeden przebieg feature_matrix na całą grupę zamiast na każdy ticker.
+    """
+    return {ticker: complete_rows(frames[ticker].index, *block) for ticker, block in feature_blocks(frames).items()}
 
-    # Google Trends – 7-dniowa średnia
-    trends_col = [col for col in out.columns if col.startswith('gt_')]
-    if trends_col:
-        out['gt_7d'] = out[trends_col[0]].rolling(7).mean()
+def feature_blocks(frames: dict[str, pd.DataFrame]) -> dict[str, tuple[np.ndarray, list[str]]]:
+    """
+    feature_block dla wielu tickerów, wsadowo jak make_features_batch
+    """
+    pending = list(frames)
+    result = {}
+    while pending:
+        index = frames[pending[0]].index
+        group = [ticker for ticker in pending if frames[ticker].index.equals(index)]
+        pending = [ticker for ticker in pending if ticker not in group]
+        result.update(_feature_blocks_wide({ticker: frames[ticker] for ticker in group}))
+    return result
 
-    # target = jutrzejszy log-zwrot
-    out['target'] = out['ret_1'].shift(-1)
+def _feature_blocks_wide(frames: dict[str, pd.DataFrame]) -> dict[str, tuple[np.ndarray, list[str]]]:
+    # tickery jako wiersze jednej macierzy ticker × czas – feature_matrix liczy całą grupę naraz
+    tickers = list(frames)
+    trends_cols = {ticker: [col for col in df.columns if col.startswith('gt_')] for ticker, df in frames.items()}
+    close = np.vstack([frames[ticker]['close'].to_numpy(dtype=float) for ticker in tickers])
+    volume = np.vstack([frames[ticker]['volume'].to_numpy(dtype=float) for ticker in tickers])
+    trend = None
+    if any(trends_cols.values()):
+        trend = np.vstack([
+            frames[ticker][trends_cols[ticker][0]].to_numpy(dtype=float) if trends_cols[ticker]
+            else np.full(len(frames[ticker]), np.nan)
+            for ticker in tickers
+        ])
 
-    return out.dropna()
+    features = feature_matrix(close, volume, trend)
 
-print("🔧 Tworzenie cech technicznych...")
-data = make_features(btc)
-print(f"✅ Utworzono {len(data)} rekordów z cechami")
+    result = {}
+    for row, ticker in enumerate(tickers):
+        columns = {name: values[row] for name, values in features.items()
+                   if name != 'gt_7d' or trends_cols[ticker]}
+        result[ticker] = _feature_block(frames[ticker], columns, FEATURE_DTYPE)
+    return result
 
 # %% --------------------------------------------------------------------------
 # 5. TRAIN / TEST SPLIT
 # -----------------------------------------------------------------------------
-split_idx = int(len(data) * (1 - TEST_SIZE_PCT))
-train = data.iloc[:split_idx]
-test = data.iloc[split_idx:]
-
-X_train, y_train = train.drop(columns=['target']), train['target']
-X_test, y_test = test.drop(columns=['target']), test['target']
+def split_train_test(data: pd.DataFrame, test_size_pct: float):
+    # 'target' jest ostatnią kolumną make_features – wycinki iloc to widoki wspólnego bufora, nie kopie
+    split_idx = int(len(data) * (1 - test_size_pct))
+    X, y = data.iloc[:, :-1], data.iloc[:, -1]
 
-print(f"📊 Dane treningowe: {len(X_train)} rekordów")
-print(f"📊 Dane testowe: {len(X_test)} rekordów")
+    X_train, y_train = X.iloc[:split_idx], y.iloc[:split_idx]
+    X_test, y_test = X.iloc[split_idx:], y.iloc[split_idx:]
+    return X_train, y_train, X_test, y_test
 
 # %% --------------------------------------------------------------------------
 # 6. MODEL XGBOOST
 # -----------------------------------------------------------------------------
-print("🤖 Trenowanie modelu XGBoost...")
-model = XGBRegressor(
-    n_estimators=600,
-    learning_rate=0.03,
-    max_depth=6,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    objective='reg:squarederror',
-    random_state=42
-)
-
-model.fit(X_train, y_train)
-y_pred = model.predict(X_test)
-
-rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-mae = mean_absolute_error(y_test, y_pred)
-
-print(f"✅ Model wytrenowany!")
-print(f"📈 Test MAE: {mae:.5f}")
-print(f"📈 Test RMSE: {rmse:.5f}")
+XGB_PARAMS = {
+    "n_estimators": 600,
+    "learning_rate": 0.03,
+    "max_depth": 6,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "objective": 'reg:squarederror',
+    "random_state": 42
+}
+
+# douczanie zapisanego modelu, gdy od ostatniego treningu doszły tylko nowe bary
+WARM_START_ROUNDS = int(os.getenv("MODEL_WARM_START_ROUNDS", "50"))
+WARM_START_WINDOW = int(os.getenv("MODEL_WARM_START_WINDOW", "250"))
+# po tylu douczeniach model jest trenowany od zera, żeby nie dryfował od pełnego dopasowania
+MAX_WARM_STARTS = int(os.getenv("MODEL_MAX_WARM_STARTS", "20"))
+
+# wątki XGBoost na jeden trening; None – wszystkie rdzenie (app.py ustawia udział zadania w rdzeniach)
+_n_jobs = None
+
+def set_n_jobs(n_jobs: int | None) -> int | None:
+    """
+    Ustawia liczbę wątków XGBoost i zwraca poprzednią; poza XGB_PARAMS, bo te są częścią klucza rejestru modeli
+    """
+    global _n_jobs
+    previous, _n_jobs = _n_jobs, n_jobs
+    return previous
+
+def train_model(X_train: pd.DataFrame, y_train: pd.Series | pd.DataFrame,
+                params: dict = XGB_PARAMS) -> 'XGBRegressor':
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor(**params, n_jobs=_n_jobs)
+
+    model.fit(X_train, y_train)
+    return model
+
+_model_registry = None
+
+def get_model_registry() -> ModelRegistry:
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
+
+_tuning_store = None
+
+def get_tuning_store() -> TuningStore:
+    global _tuning_store
+    if _tuning_store is None:
+        _tuning_store = TuningStore()
+    return _tuning_store
+
+def model_params(ticker: str) -> dict:
+    """
+    XGB_PARAMS z nałożoną najlepszą konfiguracją ze strojenia tickera (--tune), jeśli istnieje.
+
+    Konfiguracja ze strojenia ma liczbę drzew ustaloną wczesnym zatrzymaniem, a zmienione parametry
+    zmieniają klucz rejestru – model jest wtedy trenowany od nowa.
+    """
+    entry = get_tuning_store().load(ticker)
+    return {**XGB_PARAMS, **entry["params"]} if entry else XGB_PARAMS
+
+def fit_model(ticker: str, X_train: pd.DataFrame, y_train: pd.Series | pd.DataFrame,
+              forecast_only: bool = False, params: dict = XGB_PARAMS,
+              test_size_pct: float | None = None) -> tuple['XGBRegressor', dict]:
+    """
+    Model z rejestru zamiast trenowania 600 drzew od zera; y_train jako ramka – model wielowyjściowy (direct).
+    Każdy podział danych (początek X_train i test_size_pct) ma w rejestrze własny model (model_key).
+
+    - te same dane co przy ostatnim treningu (albo forecast_only i świeży model) → model bez zmian,
+    - doszły tylko nowe bary → WARM_START_ROUNDS dodatkowych rund na ostatnich WARM_START_WINDOW wierszach,
+    - inaczej (brak modelu, zmieniona historia, za dużo douczeń) → pełny trening.
+
+    Zwraca model i opis treningu {"mode": "reused" | "warm_start" | "full", "rounds", "trained_until"}.
+    """
+    registry = get_model_registry()
+    # targety modelu wielowyjściowego są częścią klucza – inna liczba horyzontów to inny model
+    key = model_key(X_train.columns, params if isinstance(y_train, pd.Series)
+                    else {**params, "targets": list(y_train.columns)}, X_train.index[0], test_size_pct)
+    trained_until = X_train.index[-1]
+    entry = registry.load(ticker, key)
+
+    if entry is not None:
+        model, meta = entry
+        known_until = meta['trained_until']
+        appended = (known_until <= trained_until
+                    and meta['history_hash'] == history_hash(X_train, y_train, known_until))
+
+        if appended and (known_until == trained_until or forecast_only and registry.is_fresh(meta)):
+            print(f"📦 Model {ticker} z rejestru (trenowany do {known_until:%Y-%m-%d})")
+            return model, {"mode": "reused", "rounds": 0, "trained_until": f"{known_until:%Y-%m-%d}"}
+
+        if appended and meta['warm_starts'] < MAX_WARM_STARTS:
+            new_rows = int((X_train.index > known_until).sum())
+            window = max(new_rows, WARM_START_WINDOW)
+            from xgboost import XGBRegressor
+            model = XGBRegressor(**{**params, "n_estimators": WARM_START_ROUNDS}, n_jobs=_n_jobs)
+            model.fit(X_train.iloc[-window:], y_train.iloc[-window:], xgb_model=entry[0].get_booster())
+            registry.save(ticker, key, model, trained_until, history_hash(X_train, y_train, trained_until),
+                          meta['warm_starts'] + 1)
+            print(f"♻️ Model {ticker} douczony o {WARM_START_ROUNDS} rund ({new_rows} nowych barów)")
+            return model, {"mode": "warm_start", "rounds": WARM_START_ROUNDS,
+                           "trained_until": f"{trained_until:%Y-%m-%d}"}
+
+    model = train_model(X_train, y_train, params)
+    registry.save(ticker, key, model, trained_until, history_hash(X_train, y_train, trained_until), 0)
+    return model, {"mode": "full", "rounds": params["n_estimators"],
+                   "trained_until": f"{trained_until:%Y-%m-%d}"}
 
 # %% --------------------------------------------------------------------------
 # 7. FORECAST NA KOLEJNE DNI
 # -----------------------------------------------------------------------------
-print(f"🔮 Generowanie prognozy na {FORECAST_DAYS} dni...")
+# recursive (domyślny) – jeden model jednodniowy wywoływany dzień po dniu, direct (na życzenie) – dodatkowy
+# model wielowyjściowy (osobne drzewa dla każdego horyzontu) i wszystkie dni prognozy z jednego predict
+FORECAST_MODES = ('recursive', 'direct')
+# łączna liczba drzew modelu direct na wszystkie horyzonty: trening kosztuje tyle, co model jednodniowy,
+# zamiast forecast_days razy więcej (przy 20 dniach i pełnych 600 drzewach na horyzont ok. 20× dłużej);
+# mniej drzew na horyzont rekompensuje proporcjonalnie większy learning_rate
+DIRECT_TREE_BUDGET = int(os.getenv("DIRECT_TREE_BUDGET", str(XGB_PARAMS["n_estimators"])))
+DIRECT_MIN_TREES = 20
+DIRECT_MAX_LEARNING_RATE = 0.3
+# punkty startowe w zbiorze testowym, na których mierzona jest trafność prognozy wielodniowej (0 – bez pomiaru)
+FORECAST_EVAL_ORIGINS = int(os.getenv("FORECAST_EVAL_ORIGINS", "10"))
+# ścieżki Monte Carlo na pasma niepewności prognozy (0 – tylko ścieżka deterministyczna)
+FORECAST_SIMULATIONS = int(os.getenv("FORECAST_SIMULATIONS", "0"))
+# percentyle ścieżek zapisywane w prognozie jako kolumny p5, p25, ...
+FORECAST_PERCENTILES = (5, 25, 50, 75, 95)
+
+def forecast_prices(model: 'XGBRegressor', btc: pd.DataFrame, forecast_days: int) -> pd.DataFrame:
+    """
+    Rekurencyjna prognoza: każdy przewidziany log-zwrot staje się kolejnym barem.
+
+    Cechy kolejnych dni dokłada FeatureStream w O(1) zamiast liczyć make_features na całej historii.
+    Zachowana jest semantyka make_features(...).dropna(): model dostaje ostatni kompletny wiersz
+    cech spośród barów, które mają już znany target (czyli z pominięciem ostatniego baru).
+    """
+    future_dates = pd.bdate_range(btc.index[-1] + pd.Timedelta(days=1), periods=forecast_days)
+    return pd.DataFrame({'forecast_close': _recursive_paths(model, [btc], forecast_days)[0]}, index=future_dates)
+
+def _recursive_paths(model: 'XGBRegressor', frames: list[pd.DataFrame], forecast_days: int) -> np.ndarray:
+    """
+    Prognozy rekurencyjne dla kilku historii naraz (np. punktów startowych ewaluacji) – w każdym kroku
+    jeden predict na wierszach wszystkich historii; zwraca ceny w kształcie (historie, forecast_days)
+    """
+    streams, eligible, pending = [], [], []
+    for btc in frames:
+        stream, row, next_row = _start_stream(btc)
+        streams.append(stream)
+        eligible.append(row)
+        pending.append(next_row)
+
+    close = np.array([btc['close'].iloc[-1] for btc in frames], dtype=float)
+    volume = [float(btc['volume'].iloc[-1]) for btc in frames]
+    # Google Trends placeholder – ostatnia znana wartość
+    trend = [_last_trend(btc, stream) for btc, stream in zip(frames, streams)]
+
+    paths = np.empty((len(frames), forecast_days))
+    for day in range(forecast_days):
+        close = close * np.exp(model.predict(pd.DataFrame(eligible, columns=streams[0].columns)))
+        paths[:, day] = close
+        for i, stream in enumerate(streams):
+            eligible[i], pending[i] = _next_eligible(eligible[i], pending[i]), stream.update(close[i], volume[i],
+                                                                                           trend[i])
+    return paths
+
+def _start_stream(btc: pd.DataFrame) -> tuple[FeatureStream, np.ndarray, np.ndarray]:
+    # stan po całej historii: wiersz cech dla pierwszego predict i wiersz ostatniego baru (bez targetu)
+    stream = FeatureStream.from_frame(btc.iloc[:-2])
+    eligible = _next_eligible(stream.last, stream.update(*_bar(btc, stream, -2)))
+    return stream, eligible, stream.update(*_bar(btc, stream, -1))
+
+def _last_trend(btc: pd.DataFrame, stream: FeatureStream) -> float:
+    return float(btc[stream.trends_col].iloc[-1]) if stream.trends_col else np.nan
+
+def _bar(df: pd.DataFrame, stream: FeatureStream, pos: int) -> tuple:
+    row = df.iloc[pos]
+    return row['close'], row['volume'], row[stream.trends_col] if stream.trends_col else np.nan
+
+def _next_eligible(eligible: np.ndarray, pending: np.ndarray) -> np.ndarray:
+    # wiersz z NaN (np. vol_z przy stałym wolumenie) odpadłby w dropna – zostaje poprzedni
+    return pending if not np.isnan(pending).any() else eligible
+
+def simulate_paths(model: 'XGBRegressor', btc: pd.DataFrame, forecast_days: int, residuals: np.ndarray,
+                   paths: int, seed: int | None = 42) -> np.ndarray:
+    """
+    Monte Carlo prognozy rekurencyjnej: `paths` ścieżek liczonych naraz, w kształcie (paths, forecast_days).
+
+    W każdym kroku jeden predict na macierzy cech (ścieżki × kolumny); do przewidzianego log-zwrotu każdej
+    ścieżki dodawany jest błąd wylosowany ze zwracaniem z `residuals`, a cechy wszystkich ścieżek
+    aktualizuje wektorowo FeatureStreamBatch. Przy zerowych błędach każda ścieżka to forecast_prices.
+    """
+    rng = np.random.default_rng(seed)
+    residuals = np.asarray(residuals, dtype=float)
+    stream, eligible, pending = _start_stream(btc)
+    batch = FeatureStreamBatch(stream, paths)
+    eligible, pending = np.tile(eligible, (paths, 1)), np.tile(pending, (paths, 1))
+
+    close = np.full(paths, float(btc['close'].iloc[-1]))
+    volume, trend = float(btc['volume'].iloc[-1]), _last_trend(btc, stream)
+    prices = np.empty((paths, forecast_days))
+    for day in range(forecast_days):
+        returns = model.predict(pd.DataFrame(eligible, columns=stream.columns)) + rng.choice(residuals, paths)
+        close = close * np.exp(returns)
+        prices[:, day] = close
+        # jak _next_eligible, osobno dla każdej ścieżki
+        eligible = np.where(np.isnan(pending).any(axis=1, keepdims=True), eligible, pending)
+        pending = batch.update(close, volume, trend)
+    return prices
+
+def forecast_bands(model: 'XGBRegressor', btc: pd.DataFrame, forecast_days: int, residuals: np.ndarray,
+                   paths: int, percentiles: tuple = FORECAST_PERCENTILES, seed: int | None = 42) -> pd.DataFrame:
+    """
+    Pasma niepewności prognozy: percentyle cen z simulate_paths na każdy dzień (kolumny p5, p25, ...)
+    """
+    future_dates = pd.bdate_range(btc.index[-1] + pd.Timedelta(days=1), periods=forecast_days)
+    prices = simulate_paths(model, btc, forecast_days, residuals, paths, seed)
+    bands = np.percentile(prices, percentiles, axis=0)
+    return pd.DataFrame({f'p{p:g}': band for p, band in zip(percentiles, bands)}, index=future_dates)
+
+def horizon_targets(btc: pd.DataFrame, horizons: int) -> pd.DataFrame:
+    """
+    Skumulowany log-zwrot od baru t do baru t+h dla h = 1..horizons (kolumny h1..hN); NaN, gdy baru t+h nie ma
+    """
+    log_close = np.log(btc['close'])
+    return pd.DataFrame({f'h{h}': log_close.shift(-h) - log_close for h in range(1, horizons + 1)})
+
+def direct_params(params: dict, horizons: int, tree_budget: int = DIRECT_TREE_BUDGET) -> dict:
+    """
+    Parametry modelu direct: drzewa na horyzont z budżetu (nie więcej niż model jednodniowy, nie mniej niż
+    DIRECT_MIN_TREES), learning_rate zwiększony tak, by iloczyn learning_rate × drzewa pozostał jak w params
+    """
+    trees = max(DIRECT_MIN_TREES, min(params["n_estimators"], tree_budget // horizons))
+    learning_rate = min(DIRECT_MAX_LEARNING_RATE,
+                        max(params["learning_rate"], params["learning_rate"] * params["n_estimators"] / trees))
+    return {**params, "n_estimators": trees, "learning_rate": learning_rate}
+
+def fit_direct_model(ticker: str, btc: pd.DataFrame, X_train: pd.DataFrame, horizons: int,
+                     forecast_only: bool = False, params: dict = XGB_PARAMS,
+                     test_size_pct: float | None = None) -> tuple['XGBRegressor', dict]:
+    """
+    Model direct na tych samych cechach co model jednodniowy: wiersz t → log-zwroty do t+1..t+horizons.
+
+    XGBoost buduje osobne drzewa dla każdego horyzontu, więc liczbę drzew ogranicza direct_params
+    (DIRECT_TREE_BUDGET na wszystkie horyzonty). Targety liczone są tylko z barów zbioru treningowego,
+    więc ostatnie `horizons` wierszy (ich horyzont sięga w okres testowy) nie biorą udziału w treningu.
+    Rejestr i douczanie jak w fit_model; opis treningu zawiera też horizons, trees_per_horizon i learning_rate.
+    """
+    targets = horizon_targets(btc.loc[:X_train.index[-1]], horizons).reindex(X_train.index)
+    known = targets.notna().all(axis=1).to_numpy()
+    if not known.any():
+        raise ValueError(f"Za mało danych treningowych na prognozę direct na {horizons} dni")
+    params = direct_params(params, horizons)
+    model, training = fit_model(ticker, X_train[known], targets[known], forecast_only, params, test_size_pct)
+    return model, {**training, "horizons": horizons, "trees_per_horizon": params["n_estimators"],
+                   "learning_rate": params["learning_rate"]}
 
-last_prices = btc.copy()
-future_dates = pd.bdate_range(last_prices.index[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS)
+def forecast_direct(model: 'XGBRegressor', btc: pd.DataFrame, forecast_days: int) -> pd.DataFrame:
+    """
+    Prognoza jednym wywołaniem predict: cechy ostatniego baru → skumulowane log-zwroty na każdy dzień
+    """
+    future_dates = pd.bdate_range(btc.index[-1] + pd.Timedelta(days=1), periods=forecast_days)
+    stream = FeatureStream.from_frame(btc)
+    cumulative = model.predict(pd.DataFrame([stream.last], columns=stream.columns))[0]
+    return pd.DataFrame({'forecast_close': btc['close'].iloc[-1] * np.exp(cumulative)}, index=future_dates)
 
-for d in future_dates:
-    # dodaj puste NaN
-    last_prices.loc[d] = np.nan
-    feat = make_features(last_prices).iloc[[-1]].drop(columns=['target'])
-    next_ret = model.predict(feat)[0]
-    next_price = last_prices.iloc[-2]['close'] * np.exp(next_ret)
-    last_prices.at[d, 'close'] = next_price
-    last_prices.at[d, 'volume'] = last_prices.iloc[-2]['volume']
+def evaluate_forecast(mode: str, model: 'XGBRegressor', btc: pd.DataFrame, X_test: pd.DataFrame,
+                      forecast_days: int, origins: int = FORECAST_EVAL_ORIGINS) -> dict | None:
+    """
+    Trafność prognozy wielodniowej poza próbą: z `origins` równo rozłożonych barów zbioru testowego
+    prognoza na forecast_days dni porównywana jest ze zrealizowanymi skumulowanymi log-zwrotami.
 
-    # Google Trends placeholder
-    trends_col = [col for col in last_prices.columns if col.startswith('gt_')]
-    if trends_col:
-        last_prices.at[d, trends_col[0]] = last_prices.iloc[-2][trends_col[0]]
+    Zwraca {"origins", "mae", "mae_last"} (mae – średnio po wszystkich horyzontach, mae_last – ostatni dzień).
+    """
+    targets = horizon_targets(btc, forecast_days).reindex(X_test.index).dropna()
+    if origins <= 0 or targets.empty:
+        return None
+    targets = targets.iloc[np.unique(np.linspace(0, len(targets) - 1, min(origins, len(targets))).astype(int))]
 
-forecast = last_prices.loc[future_dates, ['close']].rename(columns={'close': 'forecast_close'})
+    if mode == 'direct':
+        predicted = model.predict(X_test.loc[targets.index])
+    else:
+        paths = _recursive_paths(model, [btc.loc[:origin] for origin in targets.index], forecast_days)
+        predicted = np.log(paths / btc.loc[targets.index, 'close'].to_numpy()[:, None])
+    errors = np.abs(predicted - targets.to_numpy())
+    return {"origins": len(targets), "mae": float(errors.mean()), "mae_last": float(errors[:, -1].mean())}
 
 # %% --------------------------------------------------------------------------
 # 8. WYKRES
 # -----------------------------------------------------------------------------
-print("📊 Generowanie wykresu...")
-fig, ax = plt.subplots(figsize=(12, 6))
-
-# Odtworzenie cen na okresie testowym
-test_prices = btc.loc[X_test.index, 'close']
-pred_price = test_prices.shift(1) * np.exp(y_pred)
-
-ax.plot(btc.index[-500:], btc['close'][-500:], label="Kurs rzeczywisty", linewidth=2)
-ax.plot(pred_price.index, pred_price, label="Prognoza (okres testowy)", color='orange', linewidth=2)
-ax.plot(forecast.index, forecast['forecast_close'], label=f"Forecast +{FORECAST_DAYS} d", color='red', linewidth=2, linestyle='--')
-
-ax.set_title(f"{TICKER} – model XGBoost (log-returns → price)", fontsize=14)
-ax.set_xlabel("Data")
-ax.set_ylabel("Cena [USD]")
-ax.legend()
-ax.grid(True, alpha=0.3)
-fig.tight_layout()
-
-# Zapisz do bufora jako PNG
-buf = io.BytesIO()
-fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-plt.close(fig)
-buf.seek(0)
-
-# Zamień na base64
-img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-
-# Wyślij wykres do API
-payload_image = {
-    "ticker": TICKER,
-    "uuid": uuid_session,
-    "image": img_base64,
-    "metrics": {
-        "mae": float(mae),
-        "rmse": float(rmse),
-        "train_size": len(X_train),
-        "test_size": len(X_test)
+def send_chart_to_api(chart: dict, ticker: str, uuid_session: str, metrics: dict,
+                      api_url: str = IMAGE_API_URL) -> requests.Response | None:
+    """
+    Wysyła wykres z render_chart jako plik multipart; format wyznacza po stronie Laravela rozszerzenie pliku
+    """
+    fields = {
+        "ticker": ticker,
+        "uuid": uuid_session,
+        "type": "model",
+        "format": chart["format"],
+        "metrics": json.dumps(metrics, default=str)
     }
-}
 
-try:
-    response = requests.post(
-        url="http://laravel.test/api/stock-api/image",
-        headers={"Content-Type": "application/json"},
-        data=json.dumps(payload_image, default=str),
-        timeout=30
-    )
-    if response.ok:
-        print("✅ Wykres wysłany do API")
-    else:
-        print(f"❌ Błąd wysyłania wykresu: {response.status_code}")
-except Exception as e:
-    print(f"❌ Błąd wysyłania wykresu: {e}")
+    try:
+        return get_laravel_client().post_file(api_url, "image", chart["filename"], chart["data"],
+                                              chart["content_type"], fields)
+    except Exception as e:
+        print(f"❌ Błąd wysyłania wykresu: {e}")
+        return None
 
 # %% --------------------------------------------------------------------------
 # 9. WYSYŁANIE PROGNOZY
 # -----------------------------------------------------------------------------
-def send_forecast_to_api(forecast_df: pd.DataFrame, api_url: str = "http://laravel.test/api/stock-api/forecast"):
+def send_forecast_to_api(forecast_df: pd.DataFrame, ticker: str, uuid_session: str, forecast_days: int,
+                         metrics: dict, api_url: str = FORECAST_API_URL):
+    """
+    Prognoza kolumnowo (forecast_columns) w kodowaniu klienta Laravel (JSON albo MessagePack, gzip)
+    """
     try:
         forecast_payload = {
-            "ticker": TICKER,
+            "ticker": ticker,
             "uuid": uuid_session,
-            "forecast_days": FORECAST_DAYS,
-            "forecast": forecast_df.reset_index().to_dict(orient='records'),
-            "model_metrics": {
-                "mae": float(mae),
-                "rmse": float(rmse),
-                "train_size": len(X_train),
-                "test_size": len(X_test)
-            }
+            "forecast_days": forecast_days,
+            "forecast_columns": forecast_columns(forecast_df),
+            "model_metrics": metrics
         }
 
-        response = requests.post(
-            url=api_url,
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(forecast_payload, default=str),
-            timeout=30
-        )
-        return response
+        return get_laravel_client().post_payload(api_url, forecast_payload)
     except Exception as e:
         print(f"❌ Błąd podczas wysyłania prognozy do API: {e}")
         return None
 
-print(f"\n🔮 Prognoza na kolejne {FORECAST_DAYS} dni:")
-results = pd.DataFrame({
-    'Date': forecast.index,
-    'Forecast_Close': forecast['forecast_close'].round(2)
-}).set_index('Date')
-
-print(results)
-
-# Wyślij prognozę do API
-response = send_forecast_to_api(forecast)
-if response and response.ok:
-    print("✅ Prognoza została wysłana poprawnie do Laravel API.")
-elif response:
-    print(f"❌ Błąd API podczas wysyłania prognozy: {response.status_code} – {response.text}")
-else:
-    print("❌ Nie udało się wysłać prognozy – brak odpowiedzi.")
-
-print(f"\n🎉 Analiza zakończona dla {TICKER}!")
-print(f"📊 MAE: {mae:.5f}, RMSE: {rmse:.5f}")
-print(f"🆔 UUID sesji: {uuid_session}")
+# %% --------------------------------------------------------------------------
+# 10. PIPELINE
+# -----------------------------------------------------------------------------
+def _print_header(ticker: str, trends: str | None, start_date: str, test_size_pct: float, forecast_days: int,
+                  uuid_session: str):
+    print(f"🚀 Rozpoczynam analizę dla {ticker}")
+    print(f"📈 Google Trends: {trends}")
+    print(f"📅 Data rozpoczęcia: {start_date}")
+    print(f"📊 Procent testu: {test_size_pct}")
+    print(f"🔮 Dni prognozy: {forecast_days}")
+    print(f"🆔 UUID sesji: {uuid_session}")
+
+def _download_with_trends(ticker: str, trends: str | None,
+                          start_date: str) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """
+    Notowania i Google Trends pobierane równolegle – trends w osobnym wątku, bo od notowań nie zależą.
+
+    Błąd pobierania notowań jest przekazywany dalej; błąd trends kończy się jak dotąd brakiem cechy.
+    """
+    def fetch_trends():
+        with stage("trends"):
+            return fetch_google_trends(ticker, trends, start_date)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="trends") as executor:
+        gt = executor.submit(fetch_trends)
+        with stage("download"):
+            raw = download_prices(ticker, start_date)
+        return raw, gt.result()
+
+def _upload_prices(uploads: UploadQueue, raw: pd.DataFrame, ticker: str, uuid_session: str, start_date: str,
+                   test_size_pct: float, forecast_days: int):
+    """
+    Zleca wysyłkę notowań w tle – idzie równolegle z cechami i treningiem, raport zbiera _report_uploads
+    """
+    parameters = {
+        "start_date": start_date,
+        "test_size_pct": test_size_pct,
+        "forecast_days": forecast_days
+    }
+    uploads.submit("prices", send_stock_data_to_api, raw, ticker, uuid_session, parameters)
+
+def _report_uploads(reports: dict[str, dict]):
+    for name, report in reports.items():
+        if name == "prices" and report["ok"] and report.get("rows"):
+            print(f"✅ Dane zostały wysłane poprawnie do Laravel API "
+                  f"({report['rows']} barów, {report['chunks']} paczek).")
+        elif name == "prices" and report["ok"]:
+            print("✅ Laravel API ma już wszystkie bary – brak nowych danych do wysłania.")
+        elif name == "chart" and report["ok"]:
+            print(f"✅ Wykres wysłany do API ({report['format']}, {report['bytes'] // 1024} KB)")
+        elif name == "forecast" and report["ok"]:
+            print("✅ Prognoza została wysłana poprawnie do Laravel API.")
+        elif report["status"]:
+            print(f"❌ Błąd API ({name}): {report['status']} – {report['error']}")
+        else:
+            print(f"❌ Nie udało się wysłać danych ({name}) – {report['error'] or 'brak odpowiedzi'}.")
+
+def _build_features(raw: pd.DataFrame, ticker: str,
+                    gt: pd.DataFrame | None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    btc = merge_trends(prepare_prices(raw), gt, ticker)
+
+    print("🔧 Tworzenie cech technicznych...")
+    with stage("features") as info:
+        data, info["source"] = load_features(btc, ticker)
+    print(f"✅ Utworzono {len(data)} rekordów z cechami ({info['source']})")
+    return btc, data
+
+def check_options(forecast_mode: str, chart_preset: str | None) -> str:
+    """
+    Walidacja opcji analizy, zanim cokolwiek zostanie pobrane, policzone lub wysłane do Laravel API;
+    zwraca rozwiązany preset wykresu (None → CHART_PRESET)
+    """
+    if forecast_mode not in FORECAST_MODES:
+        raise ValueError(f"Nieznany tryb prognozy: {forecast_mode} (dostępne: {', '.join(FORECAST_MODES)})")
+    return resolve_preset(chart_preset)
+
+@with_timings
+def run_pipeline(ticker: str = 'BTC-USD', trends: str | None = None, start_date: str = '2017-01-01',
+                 test_size_pct: float = 0.15, forecast_days: int = 20, forecast_only: bool = False,
+                 chart_preset: str | None = None, forecast_mode: str = 'recursive',
+                 simulations: int = FORECAST_SIMULATIONS) -> dict:
+    """
+    Pełna analiza jednego tickera: dane → cechy → model → prognoza → wykres → Laravel API.
+
+    Notowania i Google Trends pobierane są równolegle, a wysyłki do Laravel idą w tle, gdy liczą się
+    kolejne etapy (notowania – w czasie cech i treningu). Na końcu analiza czeka na wszystkie wysyłki.
+    Zwraca słownik z metrykami i prognozą; wywoływana zarówno z CLI, jak i z puli workerów app.py.
+    """
+    chart_preset = check_options(forecast_mode, chart_preset)
+    # Generuj UUID dla tej sesji
+    uuid_session = str(uuid.uuid4())
+    _print_header(ticker, trends, start_date, test_size_pct, forecast_days, uuid_session)
+
+    try:
+        raw, gt = _download_with_trends(ticker, trends, start_date)
+        print(f"✅ Pobrano {len(raw)} dni danych dla {ticker}")
+    except Exception as e:
+        print(f"❌ Błąd pobierania danych: {e}")
+        return {"success": False, "error": f"Błąd pobierania danych: {e}", "ticker": ticker, "uuid": uuid_session}
+
+    with get_laravel_client().background() as uploads:
+        # Wyślij dane do API (w tle)
+        _upload_prices(uploads, raw, ticker, uuid_session, start_date, test_size_pct, forecast_days)
+
+        btc, data = _build_features(raw, ticker, gt)
+        return analyze_features(ticker, uuid_session, btc, data, test_size_pct, forecast_days, forecast_only,
+                                chart_preset, forecast_mode, uploads, simulations)
+
+def analyze_features(ticker: str, uuid_session: str, btc: pd.DataFrame, data: pd.DataFrame,
+                     test_size_pct: float, forecast_days: int, forecast_only: bool = False,
+                     chart_preset: str | None = None, forecast_mode: str = 'recursive',
+                     uploads: UploadQueue | None = None, simulations: int = FORECAST_SIMULATIONS) -> dict:
+    """
+    Część pipeline'u od gotowych cech: trening, metryki, prognoza, wykres i wysyłka do Laravel API.
+
+    chart_preset wybiera format wykresu (charts.CHART_PRESETS); "none" pomija rysowanie i wysyłkę wykresu.
+    forecast_mode (FORECAST_MODES) wybiera sposób prognozy; jej trafność i czas trafiają do metrics["forecast"].
+    simulations > 0 dodaje do prognozy pasma percentyli (FORECAST_PERCENTILES) z tylu ścieżek Monte Carlo
+    modelu jednodniowego z błędami ze zbioru testowego – także w trybie direct.
+    Prognoza i wykres wysyłane są w tle przez `uploads` (razem z wcześniej zleconymi wysyłkami);
+    przed zwróceniem wyniku analiza czeka na wszystkie i raportuje je w wyniku jako "uploads".
+    """
+    chart_preset = check_options(forecast_mode, chart_preset)
+    uploads = uploads or get_laravel_client().background()
+
+    X_train, y_train, X_test, y_test = split_train_test(data, test_size_pct)
+    print(f"📊 Dane treningowe: {len(X_train)} rekordów")
+    print(f"📊 Dane testowe: {len(X_test)} rekordów")
+
+    params = model_params(ticker)
+    print(f"🤖 Trenowanie modelu XGBoost{' (parametry ze strojenia)' if params is not XGB_PARAMS else ''}...")
+    with stage("fit"):
+        model, training = fit_model(ticker, X_train, y_train, forecast_only, params, test_size_pct)
+    training["tuned"] = params is not XGB_PARAMS
+    forecast_model, forecast_training = model, None
+    if forecast_mode == 'direct':
+        # koszt trybu direct widoczny w pomiarach etapów: horyzonty × drzewa na horyzont
+        with stage("fit", target="direct", horizons=forecast_days) as info:
+            forecast_model, forecast_training = fit_direct_model(ticker, btc, X_train, forecast_days, forecast_only,
+                                                                 params, test_size_pct)
+            info["trees_per_horizon"] = forecast_training["trees_per_horizon"]
+    with stage("predict"):
+        y_pred = model.predict(X_test)
+
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    mae = mean_absolute_error(y_test, y_pred)
+
+    print(f"✅ Model wytrenowany!")
+    print(f"📈 Test MAE: {mae:.5f}")
+    print(f"📈 Test RMSE: {rmse:.5f}")
+
+    metrics = {
+        "mae": float(mae),
+        "rmse": float(rmse),
+        "train_size": len(X_train),
+        "test_size": len(X_test),
+        "training": training
+    }
+
+    print(f"🔮 Generowanie prognozy na {forecast_days} dni ({forecast_mode})...")
+    with stage("forecast", target=forecast_mode):
+        start = time.perf_counter()
+        if forecast_mode == 'direct':
+            forecast = forecast_direct(forecast_model, btc, forecast_days)
+        else:
+            forecast = forecast_prices(model, btc, forecast_days)
+        forecast_seconds = time.perf_counter() - start
+        accuracy = evaluate_forecast(forecast_mode, forecast_model, btc, X_test, forecast_days)
+
+    metrics["forecast"] = {
+        "mode": forecast_mode,
+        "seconds": round(forecast_seconds, 4),
+        "predict_calls": 1 if forecast_mode == 'direct' else forecast_days,
+        "training": forecast_training,
+        "accuracy": accuracy
+    }
+    if accuracy is not None:
+        print(f"📈 Prognoza {forecast_mode}: MAE log-zwrotu {accuracy['mae']:.5f} "
+              f"(dzień {forecast_days}: {accuracy['mae_last']:.5f}) na {accuracy['origins']} punktach testowych, "
+              f"{forecast_seconds * 1000:.1f} ms")
+    if simulations > 0:
+        with stage("forecast", target="simulation", paths=simulations):
+            start = time.perf_counter()
+            bands = forecast_bands(model, btc, forecast_days, y_test.to_numpy(dtype=float) - y_pred, simulations)
+            simulation_seconds = time.perf_counter() - start
+        forecast = forecast.join(bands)
+        metrics["forecast"]["simulation"] = {
+            "paths": simulations,
+            "percentiles": list(FORECAST_PERCENTILES),
+            "residuals": len(y_test),
+            "seconds": round(simulation_seconds, 4)
+        }
+        print(f"🎲 Pasma prognozy z {simulations} ścieżek Monte Carlo w {simulation_seconds:.2f} s")
+    emit("metrics", metrics=metrics)
+
+    # Wyślij prognozę do API (w tle, w czasie rysowania wykresu)
+    uploads.submit("forecast", lambda: response_report(
+        send_forecast_to_api(forecast, ticker, uuid_session, forecast_days, metrics)))
+
+    chart = None
+    if CHART_PRESETS[chart_preset]["format"] is not None:
+        print("📊 Generowanie wykresu...")
+        with stage("plot"):
+            chart = render_chart(btc, X_test, y_pred, forecast, ticker, forecast_days, chart_preset)
+
+    # Wyślij wykres do API (w tle)
+    if chart is not None:
+        uploads.submit("chart", lambda: {
+            **response_report(send_chart_to_api(chart, ticker, uuid_session, metrics)),
+            "format": chart["format"], "bytes": len(chart["data"])
+        })
+
+    print(f"\n🔮 Prognoza na kolejne {forecast_days} dni:")
+    results = pd.DataFrame({
+        'Date': forecast.index,
+        'Forecast_Close': forecast['forecast_close'].round(2),
+        **{band: forecast[band].round(2) for band in forecast.columns if band != 'forecast_close'}
+    }).set_index('Date')
+
+    print(results)
+
+    reports = uploads.flush()
+    _report_uploads(reports)
+    chart_info = None
+    if chart is not None:
+        chart_info = {"format": chart["format"], "bytes": len(chart["data"]), "uploaded": reports["chart"]["ok"]}
+
+    print(f"\n🎉 Analiza zakończona dla {ticker}!")
+    print(f"📊 MAE: {mae:.5f}, RMSE: {rmse:.5f}")
+    print(f"🆔 UUID sesji: {uuid_session}")
+
+    return {
+        "success": True,
+        "ticker": ticker,
+        "uuid": uuid_session,
+        "metrics": metrics,
+        "chart": chart_info,
+        "uploads": reports,
+        "forecast": [
+            {"date": f"{date:%Y-%m-%d}", **{name: float(value) for name, value in row.items()}}
+            for date, row in forecast.iterrows()
+        ]
+    }
+
+# %% --------------------------------------------------------------------------
+# 11. ANALIZA WSADOWA
+# -----------------------------------------------------------------------------
+@with_timings
+def prepare_batch(tickers: list[str], trends: dict[str, str] | None, start_date: str) -> dict:
+    """
+    Wspólne przygotowanie danych dla listy tickerów.
+
+    Notowania pobierane są jednym zapytaniem, Google Trends raz na frazę (w tle, w czasie pobierania
+    notowań), a cechy liczone wsadowo (feature_blocks) tylko wtedy, gdy FeatureStore któregoś tickera
+    nie ma aktualnego. Wszystko trafia do magazynów workera (notowania, cache Trends, FeatureStore), więc
+    wynik to same tickery: {"tickers": [...], "features": {ticker: źródło cech}, "errors": {ticker: błąd}},
+    a run_prepared czyta dane tickera z tych magazynów zamiast przesyłać ramki przez serwer.
+    """
+    trends = trends or {}
+    print(f"📦 Przygotowanie danych dla {len(tickers)} tickerów")
+
+    def fetch_trends() -> dict[str, pd.DataFrame | None]:
+        # frazy po kolei – równoległe zapytania do Google Trends kończą się limitem 429
+        gt_by_term = {}
+        with stage("trends", tickers=len(tickers)):
+            for ticker in tickers:
+                term = trends_search_term(ticker, trends.get(ticker))
+                if term not in gt_by_term:
+                    gt_by_term[term] = fetch_google_trends(ticker, trends.get(ticker), start_date)
+        return gt_by_term
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="trends") as executor:
+        trends_future = executor.submit(fetch_trends)
+        try:
+            with stage("download", tickers=len(tickers)):
+                raws = get_market_store().get_many(tickers, start_date)
+        except Exception as e:
+            print(f"❌ Błąd pobierania danych: {e}")
+            return {"inputs": {}, "errors": {ticker: f"Błąd pobierania danych: {e}" for ticker in tickers}}
+        gt_by_term = trends_future.result()
+
+    frames, errors = {}, {}
+    for ticker in tickers:
+        if raws[ticker].empty:
+            errors[ticker] = "Brak notowań dla tickera"
+            continue
+
+        gt = gt_by_term[trends_search_term(ticker, trends.get(ticker))]
+        frames[ticker] = merge_trends(prepare_prices(raws[ticker]), gt, ticker)
+
+    print(f"🔧 Tworzenie cech technicznych dla {len(frames)} tickerów...")
+    blocks = {}
+
+    def build(ticker: str):
+        # pierwszy ticker bez aktualnych cech w magazynie liczy wsadowo całą partię
+        if not blocks:
+            blocks.update(feature_blocks(frames))
+        return blocks[ticker]
+
+    with stage("features", tickers=len(frames)):
+        sources = {ticker: get_feature_store().load(ticker, btc, lambda df, ticker=ticker: build(ticker))[2]
+                   for ticker, btc in frames.items()}
+    print(f"✅ Cechy: {', '.join(f'{ticker} ({source})' for ticker, source in sources.items())}")
+    return {"tickers": list(frames), "features": sources, "errors": errors}
+
+@with_timings
+def run_prepared(ticker: str, trends: str | None, start_date: str, test_size_pct: float = 0.15,
+                 forecast_days: int = 20, forecast_only: bool = False, chart_preset: str | None = None,
+                 forecast_mode: str = 'recursive', simulations: int = FORECAST_SIMULATIONS) -> dict:
+    """
+    Analiza jednego tickera z danymi przygotowanymi przez prepare_batch: notowania z pliku magazynu
+    (bez zapytania do dostawcy), Google Trends z cache, cechy z FeatureStore. Parametry jak w run_pipeline.
+    """
+    chart_preset = check_options(forecast_mode, chart_preset)
+    uuid_session = str(uuid.uuid4())
+    _print_header(ticker, trends, start_date, test_size_pct, forecast_days, uuid_session)
+
+    raw = get_market_store().read(ticker, start_date)
+    if raw is None or raw.empty:
+        return {"success": False, "error": "Brak przygotowanych notowań dla tickera", "ticker": ticker,
+                "uuid": uuid_session}
+    btc, data = _build_features(raw, ticker, fetch_google_trends(ticker, trends, start_date))
+
+    with get_laravel_client().background() as uploads:
+        _upload_prices(uploads, raw, ticker, uuid_session, start_date, test_size_pct, forecast_days)
+        return analyze_features(ticker, uuid_session, btc, data, test_size_pct, forecast_days, forecast_only,
+                                chart_preset, forecast_mode, uploads, simulations)
+
+# %% --------------------------------------------------------------------------
+# 12. BACKTEST WALK-FORWARD
+# -----------------------------------------------------------------------------
+@with_timings
+def run_backtest(ticker: str = 'BTC-USD', trends: str | None = None, start_date: str = '2017-01-01',
+                 test_size_pct: float = 0.15, folds: int = BACKTEST_FOLDS, mode: str = 'expanding') -> dict:
+    """
+    Backtest walk-forward jednego tickera: ostatnie test_size_pct danych dzielone na `folds` okresów,
+    każdy oceniany modelem trenowanym tylko na wcześniejszych barach (bez rejestru modeli i bez wysyłki do API)
+    """
+    print(f"🧪 Backtest walk-forward dla {ticker}: {folds} foldów, tryb {mode}")
+    try:
+        raw, gt = _download_with_trends(ticker, trends, start_date)
+        print(f"✅ Pobrano {len(raw)} dni danych dla {ticker}")
+    except Exception as e:
+        print(f"❌ Błąd pobierania danych: {e}")
+        return {"success": False, "error": f"Błąd pobierania danych: {e}", "ticker": ticker}
+
+    _, data = _build_features(raw, ticker, gt)
+
+    try:
+        with stage("backtest", folds=folds, mode=mode):
+            backtest = walk_forward(data, model_params(ticker), folds, test_size_pct, mode, cores=_n_jobs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return {"success": False, "error": str(e), "ticker": ticker}
+
+    for number, fold in enumerate(backtest["folds"], start=1):
+        print(f"📊 Fold {number}: {fold['test_from']} – {fold['test_to']} "
+              f"(trening {fold['train_size']}, test {fold['test_size']}) "
+              f"MAE {fold['mae']:.5f}, RMSE {fold['rmse']:.5f}, fit {fold['fit_seconds']:.2f} s")
+
+    summary = backtest["summary"]
+    print(f"📈 Łącznie: MAE {summary['mae']:.5f} (±{summary['mae_std']:.5f} między foldami), "
+          f"RMSE {summary['rmse']:.5f}, MAE zerowej prognozy {summary['baseline_mae']:.5f}")
+    print(f"⏱️ {summary['folds']} foldów w {summary['seconds']:.2f} s "
+          f"({summary['jobs']} równolegle × {summary['threads_per_fold']} wątków)")
+    emit("metrics", metrics={"backtest": summary})
+
+    return {"success": True, "ticker": ticker, "backtest": backtest}
+
+# %% --------------------------------------------------------------------------
+# 13. STROJENIE HIPERPARAMETRÓW
+# -----------------------------------------------------------------------------
+@with_timings
+def run_tuning(ticker: str = 'BTC-USD', trends: str | None = None, start_date: str = '2017-01-01',
+               test_size_pct: float = 0.15, search: str = 'random', trials: int = TUNING_TRIALS,
+               save: bool = True) -> dict:
+    """
+    Strojenie hiperparametrów jednego tickera na zbiorze treningowym (walidacja to jego końcówka).
+
+    Najlepsza konfiguracja (z liczbą drzew z wczesnego zatrzymania) i obecne XGB_PARAMS są potem
+    trenowane na całym zbiorze treningowym i porównywane na zbiorze testowym. Przy save=True
+    konfiguracja trafia do TuningStore i kolejne analizy tickera używają jej automatycznie.
+    """
+    print(f"🎛️ Strojenie hiperparametrów dla {ticker}: {trials} prób, tryb {search}")
+    try:
+        raw, gt = _download_with_trends(ticker, trends, start_date)
+        print(f"✅ Pobrano {len(raw)} dni danych dla {ticker}")
+    except Exception as e:
+        print(f"❌ Błąd pobierania danych: {e}")
+        return {"success": False, "error": f"Błąd pobierania danych: {e}", "ticker": ticker}
+
+    _, data = _build_features(raw, ticker, gt)
+    X_train, y_train, X_test, y_test = split_train_test(data, test_size_pct)
+
+    try:
+        with stage("tune", search=search, trials=trials):
+            tuning = tune(X_train, y_train, XGB_PARAMS, search, trials, cores=_n_jobs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return {"success": False, "error": str(e), "ticker": ticker}
+    best = tuning["best"]
+    print(f"🏆 Najlepsza konfiguracja: {best['params']} – MAE walidacji {best['val_mae']:.5f} "
+          f"({len(tuning['trials'])} treningów w {tuning['seconds']:.2f} s, "
+          f"{tuning['jobs']} równolegle × {tuning['threads_per_trial']} wątków)")
+
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    comparison = {}
+    for name, params in (("default", XGB_PARAMS), ("tuned", {**XGB_PARAMS, **best["params"]})):
+        with stage("fit", target=name):
+            start = time.perf_counter()
+            model = train_model(X_train, y_train, params)
+            fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(X_test)
+        comparison[name] = {
+            "mae": float(mean_absolute_error(y_test, y_pred)),
+            "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+            "rounds": params["n_estimators"],
+            "fit_seconds": round(fit_seconds, 4)
+        }
+        print(f"📈 {name}: test MAE {comparison[name]['mae']:.5f}, RMSE {comparison[name]['rmse']:.5f}, "
+              f"{params['n_estimators']} drzew w {fit_seconds:.2f} s")
+    emit("metrics", metrics={"tuning": comparison})
+
+    if save:
+        get_tuning_store().save(ticker, {
+            "params": best["params"],
+            "val_mae": best["val_mae"],
+            "test": comparison,
+            "search": search,
+            "trials": trials,
+            "trained_until": f"{X_train.index[-1]:%Y-%m-%d}"
+        })
+        print(f"💾 Konfiguracja zapisana – kolejne analizy {ticker} użyją jej automatycznie")
+
+    return {"success": True, "ticker": ticker, "tuning": tuning, "test": comparison, "saved": save}
+
+# %% --------------------------------------------------------------------------
+# 14. SIATKA SCENARIUSZY
+# -----------------------------------------------------------------------------
+@with_timings
+def run_sweep(ticker: str = 'BTC-USD', trends: str | None = None, start_date: str = '2017-01-01',
+              test_size_pcts: list[float] = (0.15,), forecast_days: list[int] = (20,), forecast_only: bool = False,
+              forecast_mode: str = 'recursive', simulations: int = FORECAST_SIMULATIONS) -> dict:
+    """
+    Siatka scenariuszy test_size_pct × forecast_days jednego tickera w jednym zadaniu (bez wysyłki do Laravel API).
+
+    Notowania, Google Trends i cechy liczone są raz. Model jednodniowy trenowany jest raz na podział
+    train/test (różne test_size_pct dające ten sam podział dzielą model) i ma w rejestrze własne miejsce,
+    więc kolejne uruchomienia siatki używają go ponownie albo douczają, a prognoza rekurencyjna i ścieżki
+    Monte Carlo liczone są raz na najdłuższy horyzont – krótsze to ich początek. Osobno dla horyzontu
+    liczone są tylko modele direct i trafność prognozy.
+    Zwraca {"scenarios": [...]} – wiersz na kombinację parametrów z metrykami do porównania.
+    """
+    check_options(forecast_mode, 'none')
+    test_size_pcts, horizons = sorted(set(test_size_pcts)), sorted(set(forecast_days))
+    print(f"🧮 Siatka scenariuszy dla {ticker}: test_size_pct {test_size_pcts} × forecast_days {horizons} "
+          f"({forecast_mode})")
+    try:
+        raw, gt = _download_with_trends(ticker, trends, start_date)
+        print(f"✅ Pobrano {len(raw)} dni danych dla {ticker}")
+    except Exception as e:
+        print(f"❌ Błąd pobierania danych: {e}")
+        return {"success": False, "error": f"Błąd pobierania danych: {e}", "ticker": ticker}
+
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    btc, data = _build_features(raw, ticker, gt)
+    params = model_params(ticker)
+    longest = horizons[-1]
+
+    splits, scenarios = {}, []
+    for test_size_pct in test_size_pcts:
+        X_train, y_train, X_test, y_test = split_train_test(data, test_size_pct)
+        split = len(X_train)
+        if split not in splits:
+            with stage("fit", target=f"split {split}"):
+                model, training = fit_model(ticker, X_train, y_train, forecast_only, params, test_size_pct)
+            with stage("predict"):
+                y_pred = model.predict(X_test)
+            with stage("forecast", target="recursive"):
+                path = forecast_prices(model, btc, longest)
+            bands = None
+            if simulations > 0:
+                with stage("forecast", target="simulation", paths=simulations):
+                    bands = forecast_bands(model, btc, longest, y_test.to_numpy(dtype=float) - y_pred, simulations)
+            splits[split] = {"model": model, "training": training, "path": path, "bands": bands, "direct": {},
+                             "mae": float(mean_absolute_error(y_test, y_pred)),
+                             "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred)))}
+        shared = splits[split]
+
+        for days in horizons:
+            forecast_model, forecast_training = shared["model"], None
+            if forecast_mode == 'direct':
+                if days not in shared["direct"]:
+                    with stage("fit", target="direct", horizons=days) as info:
+                        shared["direct"][days] = fit_direct_model(ticker, btc, X_train, days, forecast_only, params,
+                                                                  test_size_pct)
+                        info["trees_per_horizon"] = shared["direct"][days][1]["trees_per_horizon"]
+                forecast_model, forecast_training = shared["direct"][days]
+                forecast = forecast_direct(forecast_model, btc, days)
+            else:
+                forecast = shared["path"].iloc[:days]
+            if shared["bands"] is not None:
+                forecast = forecast.join(shared["bands"].iloc[:days])
+            with stage("forecast", target="evaluation"):
+                accuracy = evaluate_forecast(forecast_mode, forecast_model, btc, X_test, days)
+
+            scenarios.append({
+                "test_size_pct": test_size_pct,
+                "forecast_days": days,
+                "mae": shared["mae"],
+                "rmse": shared["rmse"],
+                "train_size": len(X_train),
+                "test_size": len(X_test),
+                "training": shared["training"],
+                "forecast_training": forecast_training,
+                "accuracy": accuracy,
+                "forecast": [
+                    {"date": f"{date:%Y-%m-%d}", **{name: float(value) for name, value in row.items()}}
+                    for date, row in forecast.iterrows()
+                ]
+            })
+
+    print(f"📊 {len(scenarios)} scenariuszy, {len(splits)} modeli jednodniowych:")
+    for scenario in scenarios:
+        accuracy = scenario["accuracy"]
+        print(f"   test {scenario['test_size_pct']:.2f} ({scenario['test_size']} barów), "
+              f"{scenario['forecast_days']:>3} dni: MAE {scenario['mae']:.5f}, RMSE {scenario['rmse']:.5f}, "
+              f"MAE prognozy {accuracy['mae'] if accuracy else float('nan'):.5f}, "
+              f"ostatni dzień {scenario['forecast'][-1]['forecast_close']:.2f}")
+    emit("metrics", metrics={"sweep": [
+        {key: scenario[key] for key in ("test_size_pct", "forecast_days", "mae", "rmse", "accuracy")}
+        for scenario in scenarios
+    ]})
+
+    return {
+        "success": True,
+        "ticker": ticker,
+        "forecast_mode": forecast_mode,
+        "rows": len(data),
+        "models": len(splits),
+        "scenarios": scenarios
+    }
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    if args.tune is not None:
+        result = run_tuning(
+            ticker=args.ticker,
+            trends=args.trends,
+            start_date=args.start_date,
+            test_size_pct=args.test_size_pct,
+            search=args.tune,
+            trials=args.tune_trials
+        )
+        return 0 if result["success"] else 1
+
+    if args.sweep_test_size_pct is not None or args.sweep_forecast_days is not None:
+        result = run_sweep(
+            ticker=args.ticker,
+            trends=args.trends,
+            start_date=args.start_date,
+            test_size_pcts=args.sweep_test_size_pct or [args.test_size_pct],
+            forecast_days=args.sweep_forecast_days or [args.forecast_days],
+            forecast_only=args.forecast_only,
+            forecast_mode=args.forecast_mode,
+            simulations=args.simulations
+        )
+        return 0 if result["success"] else 1
+
+    if args.backtest is not None:
+        result = run_backtest(
+            ticker=args.ticker,
+            trends=args.trends,
+            start_date=args.start_date,
+            test_size_pct=args.test_size_pct,
+            folds=args.backtest,
+            mode=args.backtest_mode
+        )
+        return 0 if result["success"] else 1
+
+    result = run_pipeline(
+        ticker=args.ticker,
+        trends=args.trends,
+        start_date=args.start_date,
+        test_size_pct=args.test_size_pct,
+        forecast_days=args.forecast_days,
+        forecast_only=args.forecast_only,
+        chart_preset=args.chart_preset,
+        forecast_mode=args.forecast_mode,
+        simulations=args.simulations
+    )
+    return 0 if result["success"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Rozgłaszanie zdarzeń zadań do klientów SSE / WebSocket w procesie serwera
+"""
+import asyncio
+import json
+import os
+from typing import Callable
+
+# limit niedostarczonych zdarzeń na klienta – wolny klient traci najstarsze zamiast zajmować pamięć
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+# co ile sekund ciszy wysyłany jest keep-alive (proxy nie zamyka wtedy połączenia)
+EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+
+# zdarzenie kończące strumień zadania
+DONE_EVENT = "done"
+
+
+class EventHub:
+    """
+    Subskrypcje per zadanie: każdy klient dostaje własną, ograniczoną kolejkę asyncio.
+
+    publish() musi być wołane z pętli zdarzeń serwera (z innych wątków przez call_soon_threadsafe).
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(task_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[task_id]
+
+    def publish(self, task_id: str, event: dict):
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def stream(self, task_id: str, snapshot: Callable[[], dict]):
+        """
+        Zdarzenia zadania dla jednego klienta: najpierw snapshot stanu, potem zdarzenia na żywo
+        aż do DONE_EVENT. W ciszy zwraca None jako sygnał keep-alive.
+
+        Subskrypcja musi powstać przed odczytem snapshotu – inaczej zdarzenia pomiędzy by przepadły,
+        dlatego snapshot przekazywany jest jako funkcja zwracająca stan zadania.
+        """
+        queue = self.subscribe(task_id)
+        try:
+            state = snapshot() or {}
+            yield {"event": "snapshot", "task_id": task_id, "task": state}
+            if state.get("status") != "running":
+                yield {"event": DONE_EVENT, "task_id": task_id, "status": state.get("status")}
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # zadanie mógł prowadzić inny proces serwera (kilka workerów uvicorn) – jego zdarzenia
+                    # tu nie docierają, więc koniec zadania widać tylko w magazynie stanu
+                    state = snapshot() or {}
+                    if state.get("status") != "running":
+                        yield {"event": DONE_EVENT, "task_id": task_id, "status": state.get("status")}
+                        return
+                    yield None
+                    continue
+                yield event
+                if event["event"] == DONE_EVENT:
+                    return
+        finally:
+            self.unsubscribe(task_id, queue)
+
+
+def format_sse(event: dict | None) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
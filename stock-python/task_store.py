@@ -0,0 +1,287 @@
+"""
+Magazyn stanu zadań analizy – SQLite (domyślnie) albo pamięć z LRU, TTL i ograniczonymi logami
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from itertools import islice
+import json
+import os
+import sqlite3
+import threading
+import time
+
+TASK_STORE = os.getenv("TASK_STORE", "sqlite")
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "/app/cache/tasks.sqlite")
+# zadania nieaktualizowane dłużej niż TTL są usuwane razem z logami
+TASK_TTL = int(os.getenv("TASK_TTL", str(24 * 3600)))
+# limit zadań trzymanych w trybie pamięciowym (najdawniej używane wypadają pierwsze)
+TASK_STORE_MAX_TASKS = int(os.getenv("TASK_STORE_MAX_TASKS", "1000"))
+# bufor pierścieniowy logów – przechowywane są tylko ostatnie linie każdego zadania
+TASK_LOG_LIMIT = int(os.getenv("TASK_LOG_LIMIT", "2000"))
+
+
+class TaskExists(ValueError):
+    """
+    Zadanie o tym identyfikatorze już istnieje – create nigdy nie nadpisuje zadania ani jego logów
+    """
+
+
+class TaskStore(ABC):
+    """
+    Wspólny interfejs magazynów zadań.
+
+    Zadanie to słownik serializowalny do JSON (status, parametry, wynik, postęp); logi trzymane są
+    osobno jako numerowane linie, więc offset odczytu pozostaje stały mimo obcinania najstarszych.
+    """
+
+    def __init__(self, ttl: int = TASK_TTL, log_limit: int = TASK_LOG_LIMIT):
+        self.ttl = ttl
+        self.log_limit = log_limit
+
+    @abstractmethod
+    def create(self, task_id: str, task: dict):
+        """
+        Zapisuje nowe zadanie; TaskExists, gdy identyfikator jest zajęty
+        """
+
+    @abstractmethod
+    def get(self, task_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def update(self, task_id: str, **fields):
+        ...
+
+    @abstractmethod
+    def append_logs(self, task_id: str, lines: list[str]):
+        ...
+
+    @abstractmethod
+    def read_logs(self, task_id: str, offset: int = 0, limit: int | None = None) -> dict:
+        """
+        Zwraca {"logs", "offset", "next_offset", "total"}; offset wskazuje pierwszą zwróconą linię
+        (może być większy od żądanego, jeśli starsze linie wypadły z bufora)
+        """
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def fail_unfinished(self, error: str) -> int:
+        """
+        Oznacza jako nieudane zadania, które nie skończyły się przed restartem serwera
+        """
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+
+class MemoryTaskStore(TaskStore):
+    """
+    Zadania w pamięci procesu z limitem liczby (LRU) i TTL – bez trwałości między restartami
+    """
+
+    def __init__(self, max_tasks: int = TASK_STORE_MAX_TASKS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_tasks = max_tasks
+        self._tasks = OrderedDict()
+
+    def create(self, task_id: str, task: dict):
+        self.evict_expired()
+        if task_id in self._tasks:
+            raise TaskExists(task_id)
+        self._tasks[task_id] = {
+            "task": dict(task),
+            "logs": deque(maxlen=self.log_limit),
+            "log_total": 0,
+            "updated_at": time.time()
+        }
+        self._tasks.move_to_end(task_id)
+        while len(self._tasks) > self.max_tasks:
+            self._tasks.popitem(last=False)
+
+    def _entry(self, task_id: str) -> dict | None:
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return None
+        if time.time() - entry["updated_at"] > self.ttl:
+            del self._tasks[task_id]
+            return None
+        self._tasks.move_to_end(task_id)
+        return entry
+
+    def get(self, task_id: str) -> dict | None:
+        entry = self._entry(task_id)
+        return json.loads(json.dumps(entry["task"], default=str)) if entry else None
+
+    def update(self, task_id: str, **fields):
+        entry = self._entry(task_id)
+        if entry is not None:
+            entry["task"].update(fields)
+            entry["updated_at"] = time.time()
+
+    def append_logs(self, task_id: str, lines: list[str]):
+        entry = self._entry(task_id)
+        if entry is not None:
+            entry["logs"].extend(lines)
+            entry["log_total"] += len(lines)
+            entry["updated_at"] = time.time()
+
+    def read_logs(self, task_id: str, offset: int = 0, limit: int | None = None) -> dict:
+        entry = self._entry(task_id)
+        if entry is None:
+            return {"logs": [], "offset": offset, "next_offset": offset, "total": 0}
+
+        total = entry["log_total"]
+        kept_from = total - len(entry["logs"])
+        first = min(max(offset, kept_from), total)
+        end = total if limit is None else min(total, first + limit)
+        logs = list(islice(entry["logs"], first - kept_from, end - kept_from))
+        return {"logs": logs, "offset": first, "next_offset": end, "total": total}
+
+    def evict_expired(self) -> int:
+        deadline = time.time() - self.ttl
+        expired = [task_id for task_id, entry in self._tasks.items() if entry["updated_at"] < deadline]
+        for task_id in expired:
+            del self._tasks[task_id]
+        return len(expired)
+
+    def count(self) -> int:
+        return len(self._tasks)
+
+    def fail_unfinished(self, error: str) -> int:
+        return 0
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Zadania w pliku SQLite (tryb WAL) – stan przeżywa restart serwera, pamięć procesu nie rośnie z liczbą zadań
+    """
+
+    def __init__(self, path: str = TASK_STORE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                log_total INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at);
+            CREATE TABLE IF NOT EXISTS task_logs (
+                task_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                line TEXT NOT NULL,
+                PRIMARY KEY (task_id, seq)
+            ) WITHOUT ROWID;
+        """)
+
+    def create(self, task_id: str, task: dict):
+        self.evict_expired()
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT INTO tasks (task_id, data, log_total, updated_at) VALUES (?, ?, 0, ?)",
+                    (task_id, json.dumps(task, default=str), time.time())
+                )
+        except sqlite3.IntegrityError:
+            raise TaskExists(task_id) from None
+
+    def get(self, task_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM tasks WHERE task_id = ? AND updated_at >= ?",
+                (task_id, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, task_id: str, **fields):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return
+            task = json.loads(row[0])
+            task.update(fields)
+            self._db.execute(
+                "UPDATE tasks SET data = ?, updated_at = ? WHERE task_id = ?",
+                (json.dumps(task, default=str), time.time(), task_id)
+            )
+
+    def append_logs(self, task_id: str, lines: list[str]):
+        if not lines:
+            return
+        with self._lock, self._db:
+            row = self._db.execute("SELECT log_total FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return
+            total = row[0]
+            # do bufora trafia tylko końcówka, która i tak by się w nim zmieściła
+            kept = lines[-self.log_limit:]
+            first_seq = total + len(lines) - len(kept)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO task_logs (task_id, seq, line) VALUES (?, ?, ?)",
+                [(task_id, first_seq + i, line) for i, line in enumerate(kept)]
+            )
+            total += len(lines)
+            self._db.execute("DELETE FROM task_logs WHERE task_id = ? AND seq < ?",
+                             (task_id, total - self.log_limit))
+            self._db.execute("UPDATE tasks SET log_total = ?, updated_at = ? WHERE task_id = ?",
+                             (total, time.time(), task_id))
+
+    def read_logs(self, task_id: str, offset: int = 0, limit: int | None = None) -> dict:
+        with self._lock:
+            row = self._db.execute("SELECT log_total FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            total = row[0] if row else 0
+            first = min(max(offset, total - self.log_limit), total)
+            end = total if limit is None else min(total, first + limit)
+            rows = self._db.execute(
+                "SELECT line FROM task_logs WHERE task_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (task_id, first, end)
+            ).fetchall()
+
+        return {"logs": [line for (line,) in rows], "offset": first, "next_offset": end, "total": total}
+
+    def evict_expired(self) -> int:
+        deadline = time.time() - self.ttl
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM task_logs WHERE task_id IN (SELECT task_id FROM tasks WHERE updated_at < ?)",
+                (deadline,)
+            )
+            return self._db.execute("DELETE FROM tasks WHERE updated_at < ?", (deadline,)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def fail_unfinished(self, error: str) -> int:
+        with self._lock, self._db:
+            rows = self._db.execute("SELECT task_id, data FROM tasks").fetchall()
+            unfinished = []
+            for task_id, data in rows:
+                task = json.loads(data)
+                if task.get("status") == "running":
+                    task.update(status="failed", error=error)
+                    unfinished.append((json.dumps(task, default=str), task_id))
+            self._db.executemany("UPDATE tasks SET data = ? WHERE task_id = ?", unfinished)
+        return len(unfinished)
+
+
+def create_task_store(kind: str = TASK_STORE) -> TaskStore:
+    if kind == "memory":
+        return MemoryTaskStore()
+    if kind == "sqlite":
+        return SQLiteTaskStore()
+    raise ValueError(f"Nieznany typ magazynu zadań: {kind} (dostępne: sqlite, memory)")
@@ -0,0 +1,59 @@
+"""
+Wspólne dane testowe – notowania o kształcie z yfinance (dni robocze, kurs jako błądzenie losowe,
+wolumen wokół stałej średniej) i Google Trends, opcjonalnie z lukami NaN
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# moduły stock-python leżą płasko w katalogu nadrzędnym
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_prices(n: int = 600, seed: int = 0, trends: bool = True, gaps: bool = False,
+                     start: str = '2020-01-01') -> pd.DataFrame:
+    """
+    Ramka wejściowa make_features: close, volume i (trends=True) gt_test; gaps=True wstawia pojedyncze NaN
+    i dłuższą dziurę w kursie, pojedyncze NaN w wolumenie i tygodniową przerwę w Google Trends
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=n, name='Date')
+    df = pd.DataFrame({
+        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        'volume': rng.normal(3e6, 5e5, n).round()
+    }, index=index)
+    if trends:
+        df['gt_test'] = rng.integers(10, 100, n).astype(float)
+    if gaps:
+        df.iloc[[n // 5, n // 3], 0] = np.nan
+        df.iloc[n // 2:n // 2 + 4, 0] = np.nan
+        df.iloc[[n // 4, 2 * n // 3], 1] = np.nan
+        if trends:
+            df.iloc[3 * n // 5:3 * n // 5 + 7, 2] = np.nan
+    return df
+
+
+def synthetic_ohlcv(n: int = 300, seed: int = 0, start: str = '2020-01-01') -> pd.DataFrame:
+    """
+    Notowania jednego tickera jak z yf.download bez MultiIndex (kolumny market_data.PRICE_COLUMNS), dni kalendarzowe
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'Adj Close': close, 'Close': close, 'High': close * 1.01, 'Low': close * 0.99, 'Open': close,
+        'Volume': rng.normal(3e6, 5e5, n).round()
+    }, index=index)
+
+
+@pytest.fixture
+def prices():
+    return synthetic_prices
+
+
+@pytest.fixture
+def ohlcv():
+    return synthetic_ohlcv
@@ -0,0 +1,58 @@
+"""
+Walidacja żądań API – bez uruchamiania puli analizy (TestClient bez zdarzeń startowych)
+"""
+import os
+import subprocess
+import sys
+import typing
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from charts import CHART_PRESETS
+from scheduler import JobScheduler
+
+
+@pytest.fixture
+def client():
+    return TestClient(app.app)
+
+
+def test_chart_presets_match_charts_module():
+    assert typing.get_args(app.ChartPreset) == tuple(CHART_PRESETS)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/analyze", {"ticker": "AAA", "trends": "aaa", "start_date": "2020-01-01", "chart_preset": "gif"}),
+    ("/analyze/sync", {"ticker": "AAA", "trends": "aaa", "start_date": "2020-01-01", "chart_preset": "gif"}),
+    ("/analyze/batch", {"tickers": ["AAA"], "start_date": "2020-01-01", "chart_preset": "gif"}),
+])
+def test_unknown_chart_preset_is_rejected_before_admission(client, path, body):
+    response = client.post(path, json=body)
+
+    assert response.status_code == 422
+    assert "chart_preset" in response.text
+    assert app.scheduler.stats()["admitted"] == 0
+
+
+def test_full_queue_returns_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(app, "scheduler", JobScheduler(1, max_queue=0))
+
+    response = client.post("/analyze", json={"ticker": "AAA", "trends": "aaa", "start_date": "2020-01-01"},
+                           headers={"X-Caller-Id": "user-1"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert app.scheduler.stats()["rejected"] == 1
+
+
+def test_cores_are_shared_across_web_workers():
+    # każdy worker uvicorn importuje app od nowa – sprawdzane w świeżym interpreterze
+    env = dict(os.environ, WEB_WORKERS="2", ANALYSIS_WORKERS="2", ANALYSIS_CORES="8")
+    code = "import app; print(app.scheduler.n_jobs)"
+
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert output.stdout.split()[-1] == "2"
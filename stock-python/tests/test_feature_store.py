@@ -0,0 +1,103 @@
+"""
+Magazyn macierzy cech – trafienie, dokładanie nowych barów, przeliczenie całości i poprawiony ostatni bar
+"""
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore
+from stock_model import feature_block
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path), max_append=50)
+
+
+def counting_build():
+    calls = []
+
+    def build(df):
+        calls.append(len(df))
+        return feature_block(df)
+
+    return build, calls
+
+
+def assert_matches_full_build(block, columns, df):
+    expected, expected_columns = feature_block(df)
+    assert columns == expected_columns
+    np.testing.assert_allclose(block, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("trends", [True, False])
+def test_build_then_hit(store, prices, trends):
+    df = prices(trends=trends)
+    build, calls = counting_build()
+
+    first = store.load('AAA', df, build)
+    second = store.load('AAA', df, build)
+
+    assert (first[2], second[2]) == ("build", "hit")
+    assert calls == [len(df)]
+    assert not second[0].flags.writeable
+    assert_matches_full_build(second[0], second[1], df)
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+def test_new_bars_are_appended_streaming(store, prices, gaps):
+    df = prices(n=640, gaps=gaps)
+    build, calls = counting_build()
+    store.load('AAA', df.iloc[:600], build)
+
+    block, columns, source = store.load('AAA', df, build)
+
+    assert source == "append" and calls == [600]
+    assert_matches_full_build(block, columns, df)
+    assert store.load('AAA', df, build)[2] == "hit"
+
+
+def test_corrected_last_bar_is_recomputed_from_the_previous_state(store, prices):
+    df = prices(n=620)
+    build, calls = counting_build()
+    partial = df.iloc[:600].copy()
+    # niepełna świeca z dnia pobrania – następnym razem ten sam bar ma inny kurs i wolumen
+    partial.iloc[-1, 0] *= 0.97
+    partial.iloc[-1, 1] *= 0.5
+    store.load('AAA', partial, build)
+
+    block, columns, source = store.load('AAA', df, build)
+
+    assert source == "append" and calls == [600]
+    assert_matches_full_build(block, columns, df)
+
+
+def test_rebuild_cases(tmp_path, prices):
+    df = prices(n=700)
+    build, calls = counting_build()
+    store = FeatureStore(str(tmp_path), max_append=50)
+    store.load('AAA', df.iloc[:600], build)
+
+    # za dużo nowych barów – szybciej przeliczyć całość wektorowo
+    assert store.load('AAA', df, build)[2] == "build"
+
+    # zmiana w głębi historii
+    changed = df.copy()
+    changed.iloc[100, 0] *= 1.1
+    assert store.load('AAA', changed, build)[2] == "build"
+
+    # inna definicja cech
+    other_schema = FeatureStore(str(tmp_path), max_append=50, schema="other")
+    assert other_schema.load('AAA', changed, build)[2] == "build"
+    assert calls == [600, 700, 700, 700]
+
+
+def test_entries_are_separate_per_start_and_trends_term(store, prices):
+    df = prices()
+    build, calls = counting_build()
+
+    store.load('AAA', df, build)
+    store.load('AAA', df.iloc[10:], build)
+    store.load('AAA', df.rename(columns={'gt_test': 'gt_other'}), build)
+
+    assert len(calls) == 3
+    assert store.load('AAA', df, build)[2] == "hit"
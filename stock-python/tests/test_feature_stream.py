@@ -0,0 +1,109 @@
+"""
+FeatureStream i FeatureStreamBatch – zgodność z make_features bar po barze, odtwarzanie stanu i ścieżki wsadowe
+"""
+import json
+
+import numpy as np
+import pytest
+
+from feature_stream import FeatureStream, FeatureStreamBatch
+from stock_model import feature_block, make_features
+
+# rozgrzewka krótsza niż najdłuższe okno (ret_30), żeby update() przechodził też przez niepełne okna
+WARMUP = 20
+
+
+def _update_rows(df, warmup: int = WARMUP) -> np.ndarray:
+    stream = FeatureStream.from_frame(df.iloc[:warmup])
+    trends_col = stream.trends_col
+    return np.array([
+        stream.update(row.close, row.volume, getattr(row, trends_col) if trends_col else np.nan)
+        for row in df.iloc[warmup:].itertuples()
+    ])
+
+
+@pytest.mark.parametrize("trends", [True, False])
+@pytest.mark.parametrize("gaps", [False, True])
+def test_update_matches_make_features(prices, trends, gaps):
+    df = prices(trends=trends, gaps=gaps)
+    block, columns = feature_block(df, np.float64)
+
+    rows = _update_rows(df)
+
+    # blok bez 'target' – FeatureStream nie zna jutrzejszego kursu
+    assert FeatureStream.from_frame(df).columns == columns[:-1]
+    np.testing.assert_allclose(rows, block[WARMUP:, :-1], rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_update_rows_agree_with_complete_make_features_rows(prices):
+    df = prices(gaps=True)
+    expected = make_features(df, np.float64)
+
+    rows = _update_rows(df)
+    positions = df.index.get_indexer(expected.index)
+    streamed = rows[positions[positions >= WARMUP] - WARMUP]
+
+    assert len(streamed) > 400
+    np.testing.assert_allclose(streamed, expected.to_numpy()[positions >= WARMUP, :-1], rtol=1e-9, atol=1e-12)
+
+
+def test_from_frame_matches_last_feature_row(prices):
+    df = prices(gaps=True)
+    block, _ = feature_block(df, np.float64)
+
+    np.testing.assert_allclose(FeatureStream.from_frame(df).last, block[-1, :-1], rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("trends", [True, False])
+def test_from_state_round_trip(prices, trends):
+    df = prices(trends=trends, gaps=True)
+    stream = FeatureStream.from_frame(df.iloc[:400])
+    # stan zapisywany jest w JSON (meta.json w FeatureStore) – NaN musi przejść przez serializację
+    restored = FeatureStream.from_state(json.loads(json.dumps(stream.state())))
+
+    assert restored.columns == stream.columns
+    np.testing.assert_array_equal(restored.last, stream.last)
+    for row in df.iloc[400:].itertuples():
+        trend = row.gt_test if trends else np.nan
+        np.testing.assert_array_equal(restored.update(row.close, row.volume, trend),
+                                      stream.update(row.close, row.volume, trend))
+
+
+def test_from_state_of_empty_stream(prices):
+    df = prices()
+    restored = FeatureStream.from_state(FeatureStream.from_frame(df.iloc[:0]).state())
+    direct = FeatureStream.from_frame(df.iloc[:0])
+
+    for row in df.iloc[:60].itertuples():
+        np.testing.assert_array_equal(restored.update(row.close, row.volume, row.gt_test),
+                                      direct.update(row.close, row.volume, row.gt_test))
+
+
+@pytest.mark.parametrize("trends", [True, False])
+def test_batch_matches_single_paths(prices, trends):
+    df = prices(trends=trends)
+    stream = FeatureStream.from_frame(df.iloc[:-40])
+    batch = FeatureStreamBatch(stream, paths=3)
+    singles = [FeatureStream.from_state(stream.state()) for _ in range(3)]
+    rng = np.random.default_rng(7)
+
+    for row in df.iloc[-40:].itertuples():
+        # ścieżki różnią się kursem; jedna z nich idzie po rzeczywistych notowaniach
+        close = row.close * np.array([1.0, *np.exp(rng.normal(0, 0.02, 2))])
+        trend = row.gt_test if trends else np.nan
+        features = batch.update(close, row.volume, trend)
+        expected = np.array([single.update(c, row.volume, trend) for single, c in zip(singles, close)])
+        np.testing.assert_allclose(features, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_batch_on_constant_prices(prices):
+    df = prices(trends=False)
+    df['close'] = 50.0
+    stream = FeatureStream.from_frame(df.iloc[:-10])
+    batch = FeatureStreamBatch(stream, paths=2)
+    single = FeatureStream.from_state(stream.state())
+
+    for row in df.iloc[-10:].itertuples():
+        features = batch.update(np.full(2, row.close), row.volume)
+        expected = single.update(row.close, row.volume)
+        np.testing.assert_allclose(features, np.tile(expected, (2, 1)), rtol=1e-12, equal_nan=True)
@@ -0,0 +1,134 @@
+"""
+Silnik wskaźników (indicators.feature_matrix) i make_features – zgodność z poprzednią implementacją na bibliotece ta
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+ta = pytest.importorskip("ta")
+
+from indicators import feature_matrix
+from stock_model import make_features, make_features_batch
+
+
+def ta_make_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    make_features sprzed wektorowego silnika – wskaźniki z biblioteki ta, punkt odniesienia testów
+    """
+    out = df.copy()
+
+    out['ret_1'] = np.log(out['close']).diff()
+    out['ret_7'] = np.log(out['close']).diff(7)
+    out['ret_30'] = np.log(out['close']).diff(30)
+
+    out['rsi_14'] = ta.momentum.RSIIndicator(out['close'], window=14).rsi()
+
+    macd = ta.trend.MACD(out['close'])
+    out['macd'] = macd.macd()
+    out['macd_signal'] = macd.macd_signal()
+
+    boll = ta.volatility.BollingerBands(out['close'])
+    out['bb_high'] = boll.bollinger_hband()
+    out['bb_low'] = boll.bollinger_lband()
+    out['bb_width'] = (out['bb_high'] - out['bb_low']) / out['close']
+
+    out['vol_z'] = (out['volume'] - out['volume'].rolling(30).mean()) / out['volume'].rolling(30).std()
+
+    trends_col = [col for col in out.columns if col.startswith('gt_')]
+    if trends_col:
+        out['gt_7d'] = out[trends_col[0]].rolling(7).mean()
+
+    out['target'] = out['ret_1'].shift(-1)
+    return out.dropna()
+
+
+def _variants(prices) -> dict[str, pd.DataFrame]:
+    constant_close = prices(seed=3)
+    constant_close['close'] = 42.0
+    constant_volume = prices(seed=4)
+    constant_volume['volume'] = 1e6
+    flat_start = prices(seed=5, trends=False)
+    flat_start.iloc[:60, 0] = 10.0
+    return {
+        "trends": prices(seed=0),
+        "no_trends": prices(seed=1, trends=False),
+        "gaps": prices(seed=2, gaps=True),
+        "gaps_no_trends": prices(seed=6, trends=False, gaps=True),
+        "constant_close": constant_close,
+        "constant_volume": constant_volume,
+        "flat_start": flat_start,
+        "short": prices(seed=7, n=45)
+    }
+
+
+@pytest.mark.parametrize("name", ["trends", "no_trends", "gaps", "gaps_no_trends", "constant_close",
+                                  "constant_volume", "flat_start", "short"])
+def test_make_features_matches_ta(prices, name):
+    df = _variants(prices)[name]
+
+    expected = ta_make_features(df)
+    actual = make_features(df, np.float64)
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9, atol=1e-12,
+                                  check_freq=False)
+
+
+def test_constant_series_edge_values(prices):
+    df = prices(trends=False)
+    df['close'] = 42.0
+    df['volume'] = 1e6
+
+    features = feature_matrix(df['close'].to_numpy(), df['volume'].to_numpy())
+
+    # stały kurs: RSI 100 (brak spadków), zerowa szerokość wstęg; stały wolumen: z-score 0/0 → NaN
+    assert np.all(features['rsi_14'][14:] == 100.0)
+    assert np.all(features['bb_width'][19:] == 0.0)
+    assert np.all(np.isnan(features['vol_z']))
+    assert make_features(df).empty
+    assert ta_make_features(df).empty
+
+
+def test_feature_matrix_1d_matches_ta(prices):
+    df = prices(gaps=True)
+    expected = ta_make_features(df)
+
+    features = feature_matrix(df['close'].to_numpy(), df['volume'].to_numpy(), df['gt_test'].to_numpy())
+    positions = df.index.get_indexer(expected.index)
+
+    assert all(values.shape == (len(df),) for values in features.values())
+    for name, values in features.items():
+        np.testing.assert_allclose(values[positions], expected[name].to_numpy(), rtol=1e-9, atol=1e-12,
+                                   err_msg=name)
+
+
+def test_feature_matrix_2d_matches_ta(prices):
+    # wiersze macierzy ticker × czas z różnymi przypadkami: luki, stały kurs, stały wolumen
+    frames = list(_variants(prices).values())[:-1]
+    close = np.vstack([df['close'].to_numpy() for df in frames])
+    volume = np.vstack([df['volume'].to_numpy() for df in frames])
+    trend = np.vstack([df['gt_test'].to_numpy() if 'gt_test' in df else np.full(len(df), np.nan)
+                       for df in frames])
+
+    features = feature_matrix(close, volume, trend)
+
+    for row, df in enumerate(frames):
+        expected = ta_make_features(df)
+        positions = df.index.get_indexer(expected.index)
+        for name, values in features.items():
+            if name == 'gt_7d' and 'gt_test' not in df:
+                continue
+            assert values.shape == close.shape
+            np.testing.assert_allclose(values[row, positions], expected[name].to_numpy(), rtol=1e-9,
+                                       atol=1e-12, err_msg=f"{row}: {name}")
+
+
+def test_make_features_batch_matches_ta(prices):
+    variants = _variants(prices)
+    # tak samo indeksowane tickery liczone są razem, krótki szereg trafia do osobnej grupy
+    frames = {name: variants[name] for name in ("trends", "no_trends", "gaps", "constant_volume", "short")}
+
+    result = make_features_batch(frames)
+
+    for name, df in frames.items():
+        pd.testing.assert_frame_equal(result[name].astype(np.float64), ta_make_features(df), check_exact=False,
+                                      rtol=1e-6, atol=1e-6, check_freq=False)
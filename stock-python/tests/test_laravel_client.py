@@ -0,0 +1,171 @@
+"""
+LaravelClient i UploadQueue na lokalnej atrapie Laravel API (laravel_stub)
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from laravel_client import LaravelClient, create_session, forecast_columns
+from laravel_stub import LaravelStub
+
+TICKER = 'BTC-USD'
+
+
+def yf_raw(n: int, start: str = '2020-01-01') -> pd.DataFrame:
+    # notowania w kształcie yf.download: kolumny MultiIndex (cena, ticker)
+    index = pd.bdate_range(start, periods=n, name='Date')
+    close = np.linspace(100.0, 200.0, n)
+    columns = pd.MultiIndex.from_product([['Close', 'Volume'], [TICKER]], names=['Price', 'Ticker'])
+    return pd.DataFrame(np.column_stack([close, np.arange(n) * 10.0]), index=index, columns=columns)
+
+
+@pytest.fixture
+def stub():
+    with LaravelStub() as stub:
+        yield stub
+
+
+def make_client(tmp_path, **kwargs) -> LaravelClient:
+    # bez odstępów między ponowieniami – testy nie czekają na backoff
+    return LaravelClient(session=create_session(retries=kwargs.pop("retries", 3), backoff=0),
+                         state_dir=str(tmp_path / "uploads"), **kwargs)
+
+
+def sent_dates(stub) -> list[str]:
+    return [date for request in stub.received for date in request["payload"]["stock_columns"]["Date"]]
+
+
+def test_prices_are_sent_in_gzip_chunks(stub, tmp_path):
+    client = make_client(tmp_path, chunk_rows=100)
+    raw = yf_raw(250)
+
+    report = client.send_prices(raw, TICKER, 'uuid-1', {"period": "max"}, f"{stub.url}/api/stock-api")
+
+    assert report == {"ok": True, "rows": 250, "chunks": 3, "status": 200, "error": None}
+    assert [request["encoding"] for request in stub.received] == ["gzip"] * 3
+    assert [request["content_type"] for request in stub.received] == ["application/json"] * 3
+    payloads = [request["payload"] for request in stub.received]
+    assert [(p["chunk"], p["chunks"], len(p["stock_columns"]["Date"])) for p in payloads] == \
+        [(0, 3, 100), (1, 3, 100), (2, 3, 50)]
+    assert payloads[0]["parameters"] == {"period": "max"}
+    assert list(payloads[0]["stock_columns"]) == ["Date", f"Close_{TICKER}", f"Volume_{TICKER}"]
+    closes = [value for p in payloads for value in p["stock_columns"][f"Close_{TICKER}"]]
+    np.testing.assert_allclose(closes, raw[('Close', TICKER)].to_numpy())
+
+
+def test_only_missing_bars_are_sent(stub, tmp_path):
+    client = make_client(tmp_path)
+    url = f"{stub.url}/api/stock-api"
+    raw = yf_raw(300)
+    client.send_prices(raw.iloc[100:200], TICKER, 'uuid-1', {}, url)
+    with open(client._state_path(TICKER)) as f:
+        assert json.load(f) == {url: {"from": f"{raw.index[100]:%Y-%m-%d}", "to": f"{raw.index[199]:%Y-%m-%d}"}}
+
+    # te same dane: tylko ostatni wysłany bar (mógł być niepełną świecą)
+    stub.received.clear()
+    assert client.send_prices(raw.iloc[100:200], TICKER, 'uuid-2', {}, url)["rows"] == 1
+    assert sent_dates(stub) == [f"{raw.index[199]:%Y-%m-%d} 00:00:00"]
+
+    # dłuższa historia w obie strony: bary sprzed `from` i od `to` włącznie, bez już pokrytego środka
+    stub.received.clear()
+    report = client.send_prices(raw, TICKER, 'uuid-3', {}, url)
+    expected = raw.index[(raw.index < raw.index[100]) | (raw.index >= raw.index[199])]
+    assert report["rows"] == len(expected) == 201
+    assert sent_dates(stub) == expected.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    assert client._load_state(TICKER)[url] == {"from": f"{raw.index[0]:%Y-%m-%d}", "to": f"{raw.index[-1]:%Y-%m-%d}"}
+
+
+def test_upload_state_is_kept_per_endpoint(stub, tmp_path):
+    client = make_client(tmp_path)
+    raw = yf_raw(50)
+    client.send_prices(raw, TICKER, 'uuid-1', {}, f"{stub.url}/api/stock-api")
+
+    report = client.send_prices(raw, TICKER, 'uuid-1', {}, f"{stub.url}/api/other")
+
+    assert report["rows"] == 50
+
+
+def test_retries_on_503(tmp_path):
+    with LaravelStub(fail_first=2) as stub:
+        client = make_client(tmp_path)
+        report = client.send_prices(yf_raw(20), TICKER, 'uuid-1', {}, f"{stub.url}/api/stock-api")
+
+    assert report["ok"] and report["status"] == 200
+    assert stub.attempts == 3
+    assert len(stub.received) == 1
+
+
+def test_failed_upload_is_reported_and_not_recorded(tmp_path):
+    with LaravelStub(fail_first=10) as stub:
+        client = make_client(tmp_path, retries=1)
+        url = f"{stub.url}/api/stock-api"
+        report = client.send_prices(yf_raw(20), TICKER, 'uuid-1', {}, url)
+
+    assert not report["ok"]
+    assert report["status"] == 503
+    assert report["chunks"] == 1
+    assert "stub failure" in report["error"]
+    assert stub.attempts == 2
+    # stan zapisywany jest tylko po udanej wysyłce – kolejna próba wyśle wszystkie bary
+    assert url not in client._load_state(TICKER)
+
+
+def test_msgpack_upload(stub, tmp_path):
+    pytest.importorskip("msgpack")
+    client = make_client(tmp_path, encoding='msgpack', chunk_rows=30)
+    raw = yf_raw(50)
+    raw.iloc[3, 0] = np.nan
+
+    report = client.send_prices(raw, TICKER, 'uuid-1', {}, f"{stub.url}/api/stock-api")
+
+    assert report["ok"] and report["chunks"] == 2
+    assert [request["content_type"] for request in stub.received] == ["application/msgpack"] * 2
+    assert [request["encoding"] for request in stub.received] == ["gzip"] * 2
+    columns = stub.received[0]["payload"]["stock_columns"]
+    assert columns[f"Close_{TICKER}"][3] is None
+    assert columns["Date"][0] == "2020-01-01 00:00:00"
+
+
+def test_msgpack_falls_back_to_json_on_415(tmp_path):
+    pytest.importorskip("msgpack")
+    with LaravelStub(msgpack=False) as stub:
+        client = make_client(tmp_path, encoding='msgpack')
+        url = f"{stub.url}/api/stock/forecast"
+        first = client.post_payload(url, {"ticker": TICKER, "n": 1})
+        second = client.post_payload(url, {"ticker": TICKER, "n": 2})
+
+    assert first.status_code == second.status_code == 200
+    assert client.encoding == 'json'
+    assert [(request["content_type"], request["payload"]["n"]) for request in stub.received] == \
+        [("application/json", 1), ("application/json", 2)]
+
+
+def test_forecast_columns():
+    forecast = pd.DataFrame({"forecast_close": [1.5, np.nan], "p5": [1.0, 2.0]},
+                            index=pd.date_range('2024-01-01', periods=2))
+
+    assert forecast_columns(forecast) == {
+        "index": ["2024-01-01 00:00:00", "2024-01-02 00:00:00"],
+        "forecast_close": [1.5, None],
+        "p5": [1.0, 2.0]
+    }
+
+
+def test_upload_queue_reports_in_submission_order(stub, tmp_path):
+    client = make_client(tmp_path, concurrency=2)
+    url = f"{stub.url}/api/stock-api"
+
+    def failing():
+        raise RuntimeError("brak połączenia")
+
+    with client.background() as uploads:
+        uploads.submit("prices", client.send_prices, yf_raw(20), TICKER, 'uuid-1', {}, url)
+        uploads.submit("broken", failing)
+        reports = uploads.flush()
+
+    assert list(reports) == ["prices", "broken"]
+    assert reports["prices"]["ok"] and reports["prices"]["rows"] == 20
+    assert reports["broken"]["ok"] is False and reports["broken"]["error"] == "brak połączenia"
+    assert all(report["seconds"] >= 0 for report in reports.values())
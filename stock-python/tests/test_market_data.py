@@ -0,0 +1,127 @@
+"""
+Magazyn notowań MarketDataStore offline na FixtureProvider – pełne pobranie, dociąganie początku i końca, get_many
+"""
+import pandas as pd
+import pytest
+
+from market_data import FixtureProvider, MarketDataStore, PRICE_COLUMNS
+
+
+def close(raw: pd.DataFrame, ticker: str) -> pd.Series:
+    return raw[('Close', ticker)]
+
+
+@pytest.fixture
+def history(ohlcv):
+    return ohlcv(200, start='2024-01-01')
+
+
+def make_store(tmp_path, frames: dict) -> tuple[MarketDataStore, FixtureProvider]:
+    provider = FixtureProvider(frames)
+    return MarketDataStore(str(tmp_path), provider), provider
+
+
+def test_first_get_fetches_full_history_in_download_format(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history})
+
+    raw = store.get("AAA", '2024-02-01')
+
+    assert provider.calls == [("AAA", '2024-02-01', None)]
+    assert raw.columns.names == ['Price', 'Ticker']
+    assert list(raw.columns.get_level_values(0)) == PRICE_COLUMNS
+    assert raw.index[0] == pd.Timestamp('2024-02-01') and raw.index[-1] == history.index[-1]
+    pd.testing.assert_series_equal(close(raw, "AAA"), history.loc['2024-02-01':, 'Close'], check_names=False,
+                                   check_freq=False)
+    assert store.load("AAA").attrs['covered_from'] == '2024-02-01'
+
+
+def test_later_get_fetches_only_from_the_last_stored_bar(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history.iloc[:150]})
+    store.get("AAA", '2024-01-01')
+
+    # nowe bary u dostawcy, a ostatni zapisany bar poprawiony (niepełna świeca z dnia pobrania)
+    updated = history.copy()
+    updated.iloc[149, updated.columns.get_loc('Close')] += 1.0
+    provider.frames["AAA"] = updated
+    provider.calls.clear()
+    raw = store.get("AAA", '2024-01-01')
+
+    assert provider.calls == [("AAA", f"{history.index[149]:%Y-%m-%d}", None)]
+    assert len(raw) == 200
+    pd.testing.assert_series_equal(close(raw, "AAA"), updated['Close'], check_names=False, check_freq=False)
+
+
+def test_earlier_start_fetches_only_the_missing_head(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history})
+    store.get("AAA", '2024-03-01')
+    provider.calls.clear()
+
+    raw = store.get("AAA", '2024-01-15')
+
+    assert provider.calls == [("AAA", '2024-01-15', '2024-03-01'), ("AAA", f"{history.index[-1]:%Y-%m-%d}", None)]
+    assert raw.index[0] == pd.Timestamp('2024-01-15') and len(raw) == len(history.loc['2024-01-15':])
+    assert store.load("AAA").attrs['covered_from'] == '2024-01-15'
+
+
+def test_start_date_slices_stored_history_without_head_fetch(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history})
+    store.get("AAA", '2024-01-01')
+    provider.calls.clear()
+
+    raw = store.get("AAA", '2024-05-01')
+
+    assert provider.calls == [("AAA", f"{history.index[-1]:%Y-%m-%d}", None)]
+    assert raw.index[0] == pd.Timestamp('2024-05-01')
+    # magazyn zachowuje całą historię
+    assert len(store.load("AAA")) == 200
+
+
+def test_failed_delta_fetch_falls_back_to_the_store(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history})
+    store.get("AAA", '2024-01-01')
+    del provider.frames["AAA"]
+
+    raw = store.get("AAA", '2024-01-01')
+
+    assert len(raw) == 200
+
+
+def test_get_many_uses_one_query_from_the_earliest_needed_date(tmp_path, ohlcv):
+    frames = {"AAA": ohlcv(200, seed=1, start='2024-01-01'), "BBB": ohlcv(200, seed=2, start='2024-01-01')}
+    store, provider = make_store(tmp_path, frames)
+    store.get("AAA", '2024-01-01')
+    provider.calls.clear()
+
+    raws = store.get_many(["AAA", "BBB", "CCC"], '2024-01-01')
+
+    # AAA dociąga od ostatniego baru, ale BBB nie ma jeszcze w magazynie – zapytanie od start_date
+    assert provider.calls[0] == (["AAA", "BBB", "CCC"], '2024-01-01', None)
+    assert [len(raws[ticker]) for ticker in ("AAA", "BBB", "CCC")] == [200, 200, 0]
+    for ticker in ("AAA", "BBB"):
+        pd.testing.assert_series_equal(close(raws[ticker], ticker), frames[ticker]['Close'], check_names=False,
+                                       check_freq=False)
+    assert store.load("CCC") is None
+
+
+def test_get_many_after_warm_store_fetches_only_the_tail(tmp_path, ohlcv):
+    frames = {"AAA": ohlcv(200, seed=1, start='2024-01-01'), "BBB": ohlcv(200, seed=2, start='2024-01-01')}
+    store, provider = make_store(tmp_path, frames)
+    store.get_many(["AAA", "BBB"], '2024-01-01')
+    provider.calls.clear()
+
+    store.get_many(["AAA", "BBB"], '2024-01-01')
+
+    assert provider.calls[0] == (["AAA", "BBB"], f"{frames['AAA'].index[-1]:%Y-%m-%d}", None)
+
+
+def test_read_never_calls_the_provider(tmp_path, history):
+    store, provider = make_store(tmp_path, {"AAA": history})
+    assert store.read("AAA", '2024-01-01') is None
+    store.get("AAA", '2024-02-01')
+    provider.calls.clear()
+
+    raw = store.read("AAA", '2024-03-01')
+
+    assert provider.calls == []
+    assert raw.index[0] == pd.Timestamp('2024-03-01') and raw.columns.names == ['Price', 'Ticker']
+    assert store.read("AAA", '2024-01-01') is None
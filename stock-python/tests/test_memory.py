@@ -0,0 +1,32 @@
+"""
+Profil pamięci ścieżki danych – dawna kopiująca ścieżka (float64) kontra obecna (bufor float32 i widoki)
+"""
+import os
+
+import numpy as np
+import pytest
+
+import benchmark
+
+
+def test_legacy_and_compact_paths_agree():
+    raw = benchmark.synthetic_prices(800, 0)
+    gt = benchmark.synthetic_trends('bench', *benchmark._range(raw))
+
+    legacy = benchmark.legacy_data_path(raw, gt, 0.15)
+    compact = benchmark.compact_data_path(raw, gt, 0.15)
+
+    assert legacy[0].equals(compact[0])
+    for expected, actual in zip(legacy[1:], compact[1:]):
+        assert actual.shape == expected.shape
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/clear_refs'), reason="pomiar szczytu RSS wymaga /proc (Linux)")
+def test_compact_path_lowers_peak_rss():
+    profile = benchmark.memory_profile(benchmark.MEMORY_PROFILE_BARS)
+
+    legacy, compact = profile['legacy'], profile['compact']
+    assert legacy['train_rows'] == compact['train_rows']
+    assert compact['peak_rss_delta_mb'] < legacy['peak_rss_delta_mb']
+    assert compact['traced_peak_mb'] < 0.9 * legacy['traced_peak_mb']
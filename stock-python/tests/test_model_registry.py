@@ -0,0 +1,63 @@
+"""
+Rejestr modeli – osobne miejsce na podział danych, douczanie po nowych barach
+"""
+import pytest
+
+import stock_model
+from model_registry import ModelRegistry, model_key
+
+PARAMS = {**stock_model.XGB_PARAMS, "n_estimators": 20}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    monkeypatch.setattr(stock_model, "_model_registry", registry)
+    monkeypatch.setattr(stock_model, "WARM_START_ROUNDS", 5)
+    return registry
+
+
+def fit(data, test_size_pct):
+    X_train, y_train, _, _ = stock_model.split_train_test(data, test_size_pct)
+    return stock_model.fit_model('AAA', X_train, y_train, params=PARAMS, test_size_pct=test_size_pct)[1]["mode"]
+
+
+def test_key_depends_on_training_start_and_split(prices):
+    columns = list(stock_model.make_features(prices()).columns)
+    start = prices().index[0]
+
+    key = model_key(columns, PARAMS, start, 0.15)
+
+    assert key == model_key(columns, PARAMS, start, 0.15)
+    assert key != model_key(columns, PARAMS, start, 0.3)
+    assert key != model_key(columns, PARAMS, prices().index[1], 0.15)
+
+
+def test_splits_do_not_overwrite_each_other(registry, prices):
+    data = stock_model.make_features(prices())
+
+    assert [fit(data, 0.15), fit(data, 0.3)] == ["full", "full"]
+    # naprzemienne podziały dostają własne modele – bez pełnego treningu i bez douczania cudzego
+    assert [fit(data, 0.15), fit(data, 0.3), fit(data, 0.15)] == ["reused"] * 3
+
+
+def test_new_bars_warm_start_the_same_split(registry, prices):
+    df = prices(n=700)
+    fit(stock_model.make_features(df.iloc[:600]), 0.15)
+
+    assert fit(stock_model.make_features(df), 0.15) == "warm_start"
+    assert fit(stock_model.make_features(df.iloc[50:]), 0.15) == "full"
+
+
+def test_sweep_reuses_every_split_model_on_the_next_run(registry, prices, monkeypatch):
+    df = prices()
+    monkeypatch.setattr(stock_model, "_download_with_trends", lambda *args: (df, None))
+    monkeypatch.setattr(stock_model, "_build_features", lambda raw, ticker, gt: (df, stock_model.make_features(df)))
+    monkeypatch.setattr(stock_model, "model_params", lambda ticker: PARAMS)
+
+    def trainings():
+        result = stock_model.run_sweep('AAA', test_size_pcts=[0.15, 0.3], forecast_days=[5, 10])
+        return [(s["test_size_pct"], s["training"]["mode"]) for s in result["scenarios"]]
+
+    assert trainings() == [(0.15, "full")] * 2 + [(0.3, "full")] * 2
+    assert trainings() == [(0.15, "reused")] * 2 + [(0.3, "reused")] * 2
@@ -0,0 +1,143 @@
+"""
+Pamięć wyników analiz i ostatni bar z podsumowania magazynu notowań (klucz pamięci wyników)
+"""
+import asyncio
+
+import pytest
+
+import market_summary
+from market_data import FixtureProvider, MarketDataStore
+from result_cache import ResultCache, request_key
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def counting(result: dict, gate: asyncio.Event | None = None):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        if gate is not None:
+            await gate.wait()
+        return dict(result)
+
+    return compute, calls
+
+
+def test_miss_then_hit():
+    cache = ResultCache()
+    compute, calls = counting({"success": True, "mae": 0.1})
+
+    async def scenario():
+        return [await cache.get_or_compute("k", compute) for _ in range(2)]
+
+    (first, first_source), (second, second_source) = run(scenario())
+
+    assert (first_source, second_source) == ("miss", "hit")
+    assert first == second == {"success": True, "mae": 0.1}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    cache = ResultCache()
+
+    async def scenario():
+        gate = asyncio.Event()
+        compute, calls = counting({"success": True}, gate)
+        tasks = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*tasks), calls
+
+    results, calls = run(scenario())
+
+    assert sorted(source for _, source in results) == ["coalesced", "coalesced", "miss"]
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_failed_results_are_not_stored():
+    cache = ResultCache()
+    compute, calls = counting({"success": False, "error": "brak danych"})
+
+    async def scenario():
+        return [(await cache.get_or_compute("k", compute))[1] for _ in range(2)]
+
+    assert run(scenario()) == ["miss", "miss"]
+    assert len(calls) == 2
+
+
+def test_cached_results_are_copies():
+    cache = ResultCache()
+    cache.put("k", {"success": True, "metrics": {"mae": 0.1}})
+
+    cache.get("k")["metrics"]["mae"] = 99
+
+    assert cache.get("k")["metrics"]["mae"] == 0.1
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_size_limit_evicts_and_skips_oversized_results():
+    cache = ResultCache(max_bytes=60)
+    cache.put("a", {"payload": "x" * 20})
+    cache.put("b", {"payload": "y" * 20})
+    cache.put("huge", {"payload": "z" * 100})
+
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] <= 60
+
+
+def test_request_key_depends_on_params_and_last_bar():
+    params = {"ticker": "AAA", "test_size_pct": 0.15}
+
+    assert request_key(params, "2024-01-02 00:00:00") == request_key(dict(reversed(params.items())),
+                                                                      "2024-01-02 00:00:00")
+    assert request_key(params, "2024-01-02 00:00:00") != request_key(params, "2024-01-03 00:00:00")
+    assert request_key(params, None) != request_key({**params, "test_size_pct": 0.3}, None)
+
+
+class FailingProvider(FixtureProvider):
+    def fetch(self, ticker, start, end=None):
+        raise ConnectionError("brak sieci")
+
+
+def test_last_bar_is_read_from_the_store_summary(tmp_path, ohlcv, monkeypatch):
+    frame = ohlcv(100, start='2024-01-01')
+    store = MarketDataStore(str(tmp_path), FixtureProvider({"AAA": frame}))
+    store.get("AAA", '2024-01-10')
+
+    assert market_summary.fresh_last_bar("AAA", '2024-02-01', 60, str(tmp_path)) == \
+        f"{frame.index[-1]:%Y-%m-%d %H:%M:%S}"
+    # historia sprzed zapisanego początku – analiza i tak dociągnie początek, wynik nie może być z pamięci
+    assert market_summary.fresh_last_bar("AAA", '2024-01-01', 60, str(tmp_path)) is None
+    assert market_summary.fresh_last_bar("BBB", '2024-02-01', 60, str(tmp_path)) is None
+
+    now = market_summary.time.time()
+    monkeypatch.setattr(market_summary.time, "time", lambda: now + 120)
+    assert market_summary.fresh_last_bar("AAA", '2024-02-01', 60, str(tmp_path)) is None
+
+
+def test_failed_refresh_keeps_the_last_check_time(tmp_path, ohlcv):
+    frame = ohlcv(100, start='2024-01-01')
+    MarketDataStore(str(tmp_path), FixtureProvider({"AAA": frame})).get("AAA", '2024-01-01')
+    checked_at = market_summary.read_summary("AAA", str(tmp_path))["checked_at"]
+
+    MarketDataStore(str(tmp_path), FailingProvider({})).get("AAA", '2024-01-01')
+
+    assert market_summary.read_summary("AAA", str(tmp_path))["checked_at"] == checked_at
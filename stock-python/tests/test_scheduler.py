@@ -0,0 +1,112 @@
+"""
+Harmonogram zadań – limit równoległości, priorytety, round-robin wywołujących i odrzucanie nadmiaru (429)
+"""
+import asyncio
+import math
+
+import pytest
+
+from scheduler import DEFAULT_JOB_SECONDS, JobScheduler, SchedulerFull
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def run_in_order(scheduler: JobScheduler, jobs: list[tuple[str, str, str]]) -> list[str]:
+    """
+    Pierwsze zadanie zajmuje jedyne miejsce, kolejne (nazwa, wywołujący, priorytet) czekają w kolejce;
+    zwraca kolejność wykonania
+    """
+    order = []
+    release = asyncio.Event()
+
+    async def job(name):
+        order.append(name)
+        if name == "blocker":
+            await release.wait()
+
+    async def submit(name, caller, priority):
+        ticket = scheduler.admit(caller, priority)
+        await scheduler.run(ticket, lambda n_jobs: job(name))
+
+    tasks = [asyncio.create_task(submit("blocker", "x", "interactive"))]
+    await asyncio.sleep(0)
+    for name, caller, priority in jobs:
+        tasks.append(asyncio.create_task(submit(name, caller, priority)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+    return order[1:]
+
+
+def test_callers_take_turns_within_a_priority():
+    scheduler = JobScheduler(1)
+
+    order = run(run_in_order(scheduler, [("a1", "A", "batch"), ("a2", "A", "batch"), ("a3", "A", "batch"),
+                                         ("b1", "B", "batch"), ("c1", "C", "batch")]))
+
+    # duża partia A nie blokuje B i C
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_interactive_jobs_go_before_batch():
+    scheduler = JobScheduler(1)
+
+    order = run(run_in_order(scheduler, [("batch1", "A", "batch"), ("batch2", "A", "batch"),
+                                         ("click", "B", "interactive")]))
+
+    assert order == ["click", "batch1", "batch2"]
+
+
+def test_concurrency_limit_and_n_jobs():
+    scheduler = JobScheduler(2, cores=8)
+    peak = 0
+
+    async def scenario():
+        nonlocal peak
+        received = []
+
+        async def job(n_jobs):
+            nonlocal peak
+            received.append(n_jobs)
+            peak = max(peak, scheduler.running)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[scheduler.run(scheduler.admit(f"c{i}"), job) for i in range(6)])
+        return received
+
+    assert run(scenario()) == [4] * 6
+    assert peak == 2
+    assert scheduler.stats()["completed"] == 6 and scheduler.running == scheduler.waiting == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = JobScheduler(2, max_queue=2)
+    scheduler.admit("A")
+    scheduler.admit("B")
+
+    with pytest.raises(SchedulerFull) as error:
+        scheduler.admit("C")
+
+    assert error.value.retry_after == math.ceil(DEFAULT_JOB_SECONDS / 2)
+    assert scheduler.stats()["rejected"] == 1
+    # kolejne kroki przyjętego zadania (np. tickery partii) nie podlegają limitowi
+    scheduler.admit("A", "batch", bounded=False)
+    assert scheduler.waiting == 3
+
+
+def test_discard_frees_the_slot():
+    scheduler = JobScheduler(1, max_queue=1)
+    ticket = scheduler.admit("A")
+
+    scheduler.discard(ticket)
+    scheduler.discard(ticket)
+
+    assert scheduler.waiting == 0
+    scheduler.admit("B")
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        JobScheduler(1).admit("A", "urgent")
@@ -0,0 +1,111 @@
+"""
+Pipeline stock_model – walidacja opcji przed pobieraniem danych, treningiem i wysyłkami
+"""
+import pytest
+
+import stock_model
+from benchmark import synthetic_trends
+from feature_store import FeatureStore
+from laravel_client import UploadQueue
+from market_data import FixtureProvider, MarketDataStore
+from trends_cache import TrendsCache
+
+
+class RecordingQueue(UploadQueue):
+    def __init__(self):
+        super().__init__(executor=None)
+        self.submitted = []
+
+    def submit(self, name, func, *args, **kwargs):
+        self.submitted.append(name)
+
+
+@pytest.fixture
+def no_downloads(monkeypatch):
+    def download(*args, **kwargs):
+        raise AssertionError("pobieranie danych przed walidacją opcji")
+
+    monkeypatch.setattr(stock_model, "_download_with_trends", download)
+
+
+@pytest.mark.parametrize("options", [{"chart_preset": "gif"}, {"forecast_mode": "sideways"}])
+def test_run_pipeline_rejects_bad_options_before_downloading(no_downloads, options):
+    with pytest.raises(ValueError):
+        stock_model.run_pipeline('AAA', **options)
+
+
+def test_analyze_features_rejects_bad_preset_before_fit_and_uploads(prices, monkeypatch):
+    def fit(*args, **kwargs):
+        raise AssertionError("trening przed walidacją opcji")
+
+    monkeypatch.setattr(stock_model, "fit_model", fit)
+    df = prices()
+    uploads = RecordingQueue()
+
+    with pytest.raises(ValueError, match="preset"):
+        stock_model.analyze_features('AAA', 'uuid-1', df, stock_model.make_features(df), 0.15, 5,
+                                     chart_preset='gif', uploads=uploads)
+    assert uploads.submitted == []
+
+
+def test_check_options_resolves_default_preset(monkeypatch):
+    monkeypatch.setattr("charts.CHART_PRESET", "svg")
+
+    assert stock_model.check_options('recursive', None) == 'svg'
+    assert stock_model.check_options('direct', 'none') == 'none'
+
+
+@pytest.mark.parametrize("horizons, trees, learning_rate", [(1, 600, 0.03), (5, 120, 0.15), (20, 30, 0.3),
+                                                            (60, 20, 0.3)])
+def test_direct_params_share_the_tree_budget(horizons, trees, learning_rate):
+    params = {**stock_model.XGB_PARAMS, "n_estimators": 600, "learning_rate": 0.03}
+
+    direct = stock_model.direct_params(params, horizons, tree_budget=600)
+
+    assert direct["n_estimators"] == trees
+    assert direct["learning_rate"] == pytest.approx(learning_rate)
+    assert {key: value for key, value in direct.items() if key not in ("n_estimators", "learning_rate")} == \
+        {key: value for key, value in params.items() if key not in ("n_estimators", "learning_rate")}
+
+
+def test_batch_keeps_prepared_data_in_worker_stores(tmp_path, ohlcv, monkeypatch):
+    frames = {"AAA": ohlcv(300, seed=1), "BBB": ohlcv(300, seed=2)}
+    provider = FixtureProvider(frames)
+    trends_calls = []
+
+    def trends(term, start, end):
+        trends_calls.append(term)
+        return synthetic_trends(term, start, end)
+
+    monkeypatch.setattr(stock_model, "_market_store", MarketDataStore(str(tmp_path / "prices"), provider))
+    monkeypatch.setattr(stock_model, "_trends_cache", TrendsCache(str(tmp_path / "trends"), fetcher=trends))
+    monkeypatch.setattr(stock_model, "_feature_store", FeatureStore(str(tmp_path / "features")))
+    analyzed = {}
+
+    def analyze(ticker, uuid_session, btc, data, *args):
+        analyzed[ticker] = data
+        return {"success": True, "ticker": ticker}
+
+    monkeypatch.setattr(stock_model, "analyze_features", analyze)
+    monkeypatch.setattr(stock_model, "_upload_prices", lambda *args: None)
+
+    prepared = stock_model.prepare_batch(list(frames) + ["CCC"], {"AAA": "aaa", "BBB": "aaa"}, '2020-01-01')
+
+    # do serwera wracają same tickery – ramki zostają w magazynach workera
+    assert set(prepared) == {"tickers", "features", "errors", "timings"}
+    assert prepared["tickers"] == ["AAA", "BBB"] and list(prepared["errors"]) == ["CCC"]
+    assert prepared["features"] == {"AAA": "build", "BBB": "build"}
+
+    fetches, trends_fetches = len(provider.calls), list(trends_calls)
+    for ticker in prepared["tickers"]:
+        assert stock_model.run_prepared(ticker, "aaa", '2020-01-01', chart_preset='none')["success"]
+
+    # analizy tickerów nie pytają dostawców ponownie
+    assert len(provider.calls) == fetches and trends_calls == trends_fetches
+    btc = {ticker: stock_model.merge_trends(stock_model.prepare_prices(stock_model.get_market_store()
+                                                                      .read(ticker, '2020-01-01')),
+                                            stock_model.fetch_google_trends(ticker, "aaa", '2020-01-01'), ticker)
+           for ticker in frames}
+    expected = stock_model.make_features_batch(btc)
+    for ticker in frames:
+        assert analyzed[ticker].equals(expected[ticker])
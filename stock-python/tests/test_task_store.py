@@ -0,0 +1,53 @@
+"""
+Magazyny zadań – wspólny kontrakt MemoryTaskStore i SQLiteTaskStore
+"""
+import pytest
+
+from task_store import MemoryTaskStore, SQLiteTaskStore, TaskExists, TaskStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryTaskStore(log_limit=5)
+    return SQLiteTaskStore(str(tmp_path / "tasks.sqlite"), log_limit=5)
+
+
+def test_task_store_is_abstract():
+    with pytest.raises(TypeError):
+        TaskStore()
+
+
+def test_create_never_overwrites_task_or_logs(store):
+    store.create("AAA_1", {"status": "running"})
+    store.append_logs("AAA_1", ["pierwsza", "druga"])
+
+    with pytest.raises(TaskExists):
+        store.create("AAA_1", {"status": "queued"})
+
+    assert store.get("AAA_1") == {"status": "running"}
+    assert store.read_logs("AAA_1")["logs"] == ["pierwsza", "druga"]
+
+
+def test_logs_keep_offsets_after_trimming(store):
+    store.create("AAA_1", {"status": "running"})
+    store.append_logs("AAA_1", [f"linia {i}" for i in range(8)])
+
+    page = store.read_logs("AAA_1", offset=0, limit=2)
+
+    # z bufora pięciu linii wypadły trzy najstarsze – odczyt zaczyna się od najstarszej zachowanej
+    assert page == {"logs": ["linia 3", "linia 4"], "offset": 3, "next_offset": 5, "total": 8}
+    assert store.read_logs("AAA_1", offset=page["next_offset"])["logs"] == ["linia 5", "linia 6", "linia 7"]
+
+
+def test_update_and_fail_unfinished(store):
+    store.create("AAA_1", {"status": "running"})
+    store.create("BBB_1", {"status": "running"})
+    store.update("BBB_1", status="completed", result={"success": True})
+
+    failed = store.fail_unfinished("restart")
+
+    assert store.get("BBB_1") == {"status": "completed", "result": {"success": True}}
+    if isinstance(store, SQLiteTaskStore):
+        assert failed == 1
+        assert store.get("AAA_1")["status"] == "failed"
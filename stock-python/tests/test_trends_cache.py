@@ -0,0 +1,115 @@
+"""
+Cache Google Trends – TTL, dociąganie początku i końca zakresu ze skalowaniem (_stitch), jedno zapytanie na frazę
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trends_cache
+from trends_cache import OVERLAP_DAYS, TrendsCache, _stitch
+
+TRUE_INDEX = pd.date_range('2022-01-01', '2024-12-31', freq='D')
+# "prawdziwe" zainteresowanie frazą; Google zwraca je przeskalowane do 0..100 w każdym zapytaniu osobno
+TRUE_SERIES = pd.Series(np.linspace(10.0, 60.0, len(TRUE_INDEX)), index=TRUE_INDEX)
+
+
+class Fetcher:
+    def __init__(self, scale: float = 1.0, delay: float = 0.0):
+        self.scale = scale
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, term: str, start: str, end: str) -> pd.DataFrame:
+        self.calls.append((start, end))
+        time.sleep(self.delay)
+        values = TRUE_SERIES[start:end] * self.scale
+        return values.to_frame(f'gt_{term}')
+
+
+def test_fresh_cache_is_served_without_fetching(tmp_path):
+    fetcher = Fetcher()
+    cache = TrendsCache(str(tmp_path), ttl=3600, fetcher=fetcher)
+
+    first = cache.get('aaa', '2024-01-01', '2024-06-30')
+    second = cache.get('aaa', '2024-02-01', '2024-06-30')
+
+    assert fetcher.calls == [('2024-01-01', '2024-06-30')]
+    assert second.index[0] == pd.Timestamp('2024-02-01')
+    pd.testing.assert_frame_equal(second, first.loc['2024-02-01':], check_freq=False)
+
+
+def test_expired_cache_refreshes_only_the_tail(tmp_path, monkeypatch):
+    fetcher = Fetcher()
+    cache = TrendsCache(str(tmp_path), ttl=60, fetcher=fetcher)
+    cache.get('aaa', '2024-01-01', '2024-06-30')
+    now = time.time()
+    monkeypatch.setattr(trends_cache.time, "time", lambda: now + 120)
+
+    refreshed = cache.get('aaa', '2024-01-01', '2024-08-31')
+
+    tail_from = pd.Timestamp('2024-06-30') - pd.Timedelta(days=OVERLAP_DAYS)
+    assert fetcher.calls[1] == (f"{tail_from:%Y-%m-%d}", '2024-08-31')
+    assert refreshed.index[-1] == pd.Timestamp('2024-08-31')
+    assert cache.load('aaa').attrs['covered_to'] == '2024-08-31'
+
+
+def test_earlier_start_fetches_the_head_and_rescales_it(tmp_path):
+    fetcher = Fetcher()
+    cache = TrendsCache(str(tmp_path), ttl=3600, fetcher=fetcher)
+    cache.get('aaa', '2024-01-01', '2024-06-30')
+    # inne zapytanie – inna skala 0..100; na zakładce wyrównywana jest do serii z cache
+    fetcher.scale = 2.5
+
+    frame = cache.get('aaa', '2023-06-01', '2024-06-30')
+
+    head_end = pd.Timestamp('2024-01-01') + pd.Timedelta(days=OVERLAP_DAYS)
+    assert fetcher.calls[1] == ('2023-06-01', f"{head_end:%Y-%m-%d}")
+    np.testing.assert_allclose(frame['gt_aaa'].to_numpy(), TRUE_SERIES['2023-06-01':'2024-06-30'].to_numpy())
+    assert cache.load('aaa').attrs['covered_from'] == '2023-06-01'
+
+
+def test_stitch_prefers_the_requested_side():
+    col = 'gt_aaa'
+    base = pd.DataFrame({col: [1.0, 2.0, 3.0]}, index=pd.date_range('2024-01-01', periods=3))
+    new = pd.DataFrame({col: [4.0, 6.0, 8.0]}, index=pd.date_range('2024-01-02', periods=3))
+
+    # średnia zakładki: baza 2.5, nowe 5.0 → nowe przeskalowane o 0.5
+    assert _stitch(base, new, prefer_new=True)[col].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert _stitch(base, new, prefer_new=False)[col].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert _stitch(base, new * 0, prefer_new=True)[col].tolist() == [1.0, 0.0, 0.0, 0.0]
+    assert _stitch(base, new * 0, prefer_new=False)[col].tolist() == [1.0, 2.0, 3.0, 0.0]
+
+
+def test_fetch_errors(tmp_path, monkeypatch):
+    def failing(term, start, end):
+        raise ConnectionError("429")
+
+    assert TrendsCache(str(tmp_path / "empty"), fetcher=failing).get('aaa', '2024-01-01', '2024-06-30') is None
+
+    cache = TrendsCache(str(tmp_path / "warm"), ttl=60, fetcher=Fetcher())
+    cached = cache.get('aaa', '2024-01-01', '2024-06-30')
+    cache.fetcher = failing
+    now = time.time()
+    monkeypatch.setattr(trends_cache.time, "time", lambda: now + 120)
+
+    # nieudane odświeżenie – dane z cache zamiast braku cechy
+    pd.testing.assert_frame_equal(cache.get('aaa', '2024-01-01', '2024-06-30'), cached, check_freq=False)
+
+
+def test_concurrent_requests_share_one_fetch(tmp_path):
+    fetcher = Fetcher(delay=0.2)
+    cache = TrendsCache(str(tmp_path), ttl=3600, fetcher=fetcher)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get('aaa', '2024-01-01', '2024-06-30')))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetcher.calls) == 1
+    assert len(results) == 3 and all(result.equals(results[0]) for result in results)
@@ -0,0 +1,17 @@
+"""
+Strojenie hiperparametrów – próby w osobnych procesach dają to samo co próby po kolei
+"""
+import stock_model
+import tuning
+
+
+def test_parallel_trials_match_sequential(prices):
+    X_train, y_train, _, _ = stock_model.split_train_test(stock_model.make_features(prices(n=500)), 0.15)
+
+    sequential = tuning.tune(X_train, y_train, stock_model.XGB_PARAMS, trials=4, jobs=1, cores=1)
+    parallel = tuning.tune(X_train, y_train, stock_model.XGB_PARAMS, trials=4, jobs=2, cores=2)
+
+    assert (sequential["jobs"], parallel["jobs"]) == (1, 2)
+    assert parallel["best"] == sequential["best"]
+    assert sorted(trial["val_mae"] for trial in parallel["trials"]) == \
+        sorted(trial["val_mae"] for trial in sequential["trials"])
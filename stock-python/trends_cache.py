@@ -0,0 +1,152 @@
+"""
+Cache Google Trends per fraza – TTL, sklejanie zakresów dat i jedno zapytanie dla równoległych analiz
+"""
+from datetime import datetime, timedelta
+import fcntl
+import os
+import re
+import time
+
+import pandas as pd
+
+TRENDS_CACHE_DIR = os.getenv("TRENDS_CACHE_DIR", "/app/cache/trends")
+TRENDS_CACHE_TTL = int(os.getenv("TRENDS_CACHE_TTL", str(12 * 3600)))
+
+# zakładka przy dociąganiu brakującego zakresu – na niej wyrównywana jest skala (Trends = 0..100 w zakresie)
+OVERLAP_DAYS = 90
+
+
+def fetch_pytrends(term: str, start: str, end: str) -> pd.DataFrame:
+    """
+    Pojedyncze zapytanie do Google Trends; zwraca dzienną serię w kolumnie gt_<term>
+    """
+    from pytrends.request import TrendReq
+
+    pytrends = TrendReq(hl='en-US', tz=360, requests_args={'headers': {'User-Agent': 'Mozilla/5.0'}})
+    pytrends.build_payload([term], timeframe=f'{start} {end}')
+
+    gt = (pytrends.interest_over_time()
+            .rename(columns={term: f'gt_{term}'})
+            .drop(columns=['isPartial'])
+            .resample('D').ffill())
+    gt.index = pd.to_datetime(gt.index).tz_localize(None)
+    return gt
+
+
+def _stitch(base: pd.DataFrame, new: pd.DataFrame, prefer_new: bool) -> pd.DataFrame:
+    """
+    Skleja dwa zakresy; nowy jest przeskalowany do bazy po średniej z części wspólnej
+    """
+    col = base.columns[0]
+    overlap = base.index.intersection(new.index)
+    if len(overlap):
+        new_mean = new.loc[overlap, col].mean()
+        if new_mean > 0:
+            new = new * (base.loc[overlap, col].mean() / new_mean)
+
+    first, second = (base, new) if prefer_new else (new, base)
+    merged = pd.concat([first, second])
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+
+class TrendsCache:
+    """
+    Cache serii Google Trends kluczowany frazą i zakresem dat.
+
+    - dane świeższe niż TTL są zwracane bez zapytania do Google,
+    - brakujący początek lub przeterminowany koniec zakresu jest dociągany osobno i sklejany,
+    - blokada pliku na frazę sprawia, że równoległe analizy (także w innych procesach puli)
+      czekają na pierwsze zapytanie i czytają jego wynik zamiast pytać Google ponownie.
+    """
+
+    def __init__(self, cache_dir: str = TRENDS_CACHE_DIR, ttl: int = TRENDS_CACHE_TTL, fetcher=fetch_pytrends):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.fetcher = fetcher
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, term: str) -> str:
+        return os.path.join(self.cache_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', term)}.parquet")
+
+    def load(self, term: str) -> pd.DataFrame | None:
+        path = self.path(term)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def save(self, term: str, frame: pd.DataFrame):
+        path = self.path(term)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def get(self, term: str, start_date: str, end_date: str | None = None) -> pd.DataFrame | None:
+        end_date = end_date or f"{datetime.today():%Y-%m-%d}"
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+        with open(f"{self.path(term)}.lock", 'w') as lock:
+            # single-flight: kolejne procesy czekają tutaj, aż pierwszy zapisze wynik
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                frame = self._refresh(term, start, end)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        if frame is None:
+            return None
+        return frame[(frame.index >= start) & (frame.index <= end)]
+
+    def _refresh(self, term: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame | None:
+        cached = self.load(term)
+        if cached is None:
+            return self._fetch_full(term, start, end)
+
+        covered_from = pd.Timestamp(cached.attrs['covered_from'])
+        covered_to = pd.Timestamp(cached.attrs['covered_to'])
+        fetched_at = float(cached.attrs['fetched_at'])
+        stale = time.time() - fetched_at > self.ttl or end > covered_to + timedelta(days=1)
+        overlap = timedelta(days=OVERLAP_DAYS)
+
+        if start >= covered_from and not stale:
+            print(f"📦 Google Trends '{term}' z cache (wiek {(time.time() - fetched_at) / 3600:.1f} h)")
+            return cached
+
+        frame = cached
+        try:
+            if start < covered_from:
+                head = self.fetcher(term, f"{start:%Y-%m-%d}", f"{covered_from + overlap:%Y-%m-%d}")
+                frame = _stitch(frame, head, prefer_new=False)
+                covered_from = start
+                print(f"🌐 Google Trends '{term}': dociągnięto początek zakresu od {start:%Y-%m-%d}")
+            if stale:
+                tail_from = max(covered_from, covered_to - overlap)
+                tail = self.fetcher(term, f"{tail_from:%Y-%m-%d}", f"{end:%Y-%m-%d}")
+                frame = _stitch(frame, tail, prefer_new=True)
+                covered_to, fetched_at = max(covered_to, end), time.time()
+                print(f"🌐 Google Trends '{term}': odświeżono koniec zakresu od {tail_from:%Y-%m-%d}")
+        except Exception as e:
+            print(f"❌ Błąd podczas pobierania Google Trends: {e}")
+            print(f"📂 Używam danych Google Trends z cache dla '{term}'")
+            return cached
+
+        self._store(term, frame, covered_from, covered_to, fetched_at)
+        return frame
+
+    def _fetch_full(self, term: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame | None:
+        try:
+            frame = self.fetcher(term, f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}")
+        except Exception as e:
+            print(f"❌ Błąd podczas pobierania Google Trends: {e}")
+            return None
+
+        self._store(term, frame, start, end, time.time())
+        print(f"✅ Dane Google Trends zapisane do cache dla '{term}'")
+        return frame
+
+    def _store(self, term: str, frame: pd.DataFrame, covered_from, covered_to, fetched_at: float):
+        frame.attrs = {
+            'covered_from': f"{covered_from:%Y-%m-%d}",
+            'covered_to': f"{covered_to:%Y-%m-%d}",
+            'fetched_at': fetched_at
+        }
+        self.save(term, frame)
@@ -0,0 +1,185 @@
+"""
+Strojenie hiperparametrów XGBoost – wczesne zatrzymanie na chronologicznym wycinku walidacyjnym,
+równoległe przeszukiwanie (losowe albo successive halving) i najlepsza konfiguracja zapisywana per ticker
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import json
+import math
+import multiprocessing
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+TUNING_DIR = os.getenv("TUNING_DIR", "/app/cache/tuning")
+TUNING_TRIALS = int(os.getenv("TUNING_TRIALS", "16"))
+# liczba prób trenowanych jednocześnie (procesy); rdzenie dzielone są po równo między próby
+TUNING_JOBS = int(os.getenv("TUNING_JOBS", "0")) or os.cpu_count() or 1
+# końcówka zbioru treningowego, na której oceniane są próby i zatrzymywane trenowanie
+TUNING_VALIDATION_PCT = float(os.getenv("TUNING_VALIDATION_PCT", "0.2"))
+EARLY_STOPPING_ROUNDS = int(os.getenv("EARLY_STOPPING_ROUNDS", "50"))
+# górny limit drzew próby – wczesne zatrzymanie zwykle kończy trening dużo wcześniej
+TUNING_MAX_ROUNDS = int(os.getenv("TUNING_MAX_ROUNDS", "1500"))
+# successive halving: do kolejnego szczebla przechodzi 1/ETA prób, z ETA razy większym limitem drzew
+HALVING_ETA = 3
+
+SEARCH_MODES = ('random', 'halving')
+
+SEARCH_SPACE = {
+    "learning_rate": (0.01, 0.03, 0.05, 0.1),
+    "max_depth": (3, 4, 5, 6, 8),
+    "subsample": (0.6, 0.8, 1.0),
+    "colsample_bytree": (0.6, 0.8, 1.0),
+    "min_child_weight": (1, 5, 10),
+    "reg_lambda": (0.5, 1.0, 5.0)
+}
+
+
+def sample_configs(trials: int, base: dict, seed: int = 42) -> list[dict]:
+    """
+    `trials` różnych konfiguracji z SEARCH_SPACE; pierwsza to parametry bazowe, więc wynik
+    strojenia nie może być na walidacji gorszy od obecnych ustawień
+    """
+    rng = np.random.default_rng(seed)
+    first = {name: base[name] for name in SEARCH_SPACE if name in base}
+    configs, seen = [first], {json.dumps(first, sort_keys=True)}
+    space = math.prod(len(values) for values in SEARCH_SPACE.values())
+    while len(configs) < min(trials, space):
+        config = {name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+# dane prób w procesie (ustawiane raz na proces przez _init_trials, nie przy każdej próbie)
+_trial_data = None
+
+
+def _init_trials(X: np.ndarray, y: np.ndarray, split: int, base: dict, threads: int):
+    global _trial_data
+    _trial_data = (X, y, split, base, threads)
+
+
+def _fit_trial(config: dict, rounds: int) -> dict:
+    from xgboost import XGBRegressor
+
+    X, y, split, base, threads = _trial_data
+    start = time.perf_counter()
+    model = XGBRegressor(**{**base, **config, "n_estimators": rounds}, n_jobs=threads,
+                         early_stopping_rounds=EARLY_STOPPING_ROUNDS, eval_metric='mae')
+    model.fit(X[:split], y[:split], eval_set=[(X[split:], y[split:])], verbose=False)
+    return {
+        "params": config,
+        "rounds": int(model.best_iteration) + 1,
+        "max_rounds": rounds,
+        "val_mae": float(model.best_score),
+        "seconds": round(time.perf_counter() - start, 4)
+    }
+
+
+def tune(X_train: pd.DataFrame, y_train: pd.Series, base: dict, search: str = 'random',
+         trials: int = TUNING_TRIALS, jobs: int = TUNING_JOBS, cores: int | None = None,
+         validation_pct: float = TUNING_VALIDATION_PCT, seed: int = 42) -> dict:
+    """
+    Przeszukuje SEARCH_SPACE na danych treningowych; ostatnie validation_pct wierszy to walidacja.
+
+    random – każda próba z limitem TUNING_MAX_ROUNDS drzew, halving – wszystkie próby z małym limitem,
+    a do kolejnych szczebli przechodzi najlepsza 1/HALVING_ETA. Każda próba kończy się wczesnym
+    zatrzymaniem po EARLY_STOPPING_ROUNDS rundach bez poprawy MAE walidacji.
+
+    Próby trenowane są w puli procesów startowanych przez forkserver – tune działa w workerze puli analizy,
+    który ma już wątki (wysyłki, Google Trends) i zainicjalizowany OpenMP XGBoost, a fork takiego procesu
+    może zakleszczyć potomka na blokadzie przejętej w połowie. Dane trafiają do każdego procesu raz,
+    w inicjalizatorze. `cores` (domyślnie wszystkie) dzielone są po równo między równoległe próby.
+    Zwraca {"search", "trials", "best": {"params", "rounds", "val_mae"}, ...}.
+    """
+    if search not in SEARCH_MODES:
+        raise ValueError(f"Nieznany tryb strojenia: {search} (dostępne: {', '.join(SEARCH_MODES)})")
+    split = int(len(X_train) * (1 - validation_pct))
+    if split < 1 or split >= len(X_train):
+        raise ValueError(f"Za mało danych ({len(X_train)} wierszy) na walidację przy validation_pct={validation_pct}")
+
+    X = X_train.to_numpy(dtype=np.float32)
+    y = y_train.to_numpy(dtype=np.float32)
+    configs = sample_configs(trials, base, seed)
+    if search == 'halving':
+        rungs = int(math.log(len(configs), HALVING_ETA)) + 1 if len(configs) > 1 else 1
+        budgets = [max(EARLY_STOPPING_ROUNDS, TUNING_MAX_ROUNDS // HALVING_ETA ** (rungs - 1 - rung))
+                   for rung in range(rungs)]
+    else:
+        budgets = [TUNING_MAX_ROUNDS]
+
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(jobs, len(configs), cores))
+    threads = max(1, cores // workers)
+    base = {name: value for name, value in base.items() if name != "n_estimators"}
+
+    start = time.perf_counter()
+    history = []
+    if workers == 1:
+        _init_trials(X, y, split, base, threads)
+        run = lambda candidates, rounds: [_fit_trial(config, rounds) for config in candidates]
+        results = _search(configs, budgets, run, history)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('forkserver'),
+                                 initializer=_init_trials, initargs=(X, y, split, base, threads)) as executor:
+            run = lambda candidates, rounds: list(executor.map(_fit_trial, candidates, [rounds] * len(candidates)))
+            results = _search(configs, budgets, run, history)
+
+    best = results[0]
+    return {
+        "search": search,
+        "trials": history,
+        "best": {
+            "params": {**best["params"], "n_estimators": best["rounds"]},
+            "rounds": best["rounds"],
+            "val_mae": best["val_mae"]
+        },
+        "train_size": split,
+        "validation_size": len(X) - split,
+        "jobs": workers,
+        "threads_per_trial": threads,
+        "seconds": round(time.perf_counter() - start, 4)
+    }
+
+
+def _search(configs: list[dict], budgets: list[int], run, history: list) -> list[dict]:
+    candidates = configs
+    for rung, rounds in enumerate(budgets):
+        results = sorted(run(candidates, rounds), key=lambda result: result["val_mae"])
+        history.extend({**result, "rung": rung} for result in results)
+        candidates = [result["params"] for result in results[:max(1, math.ceil(len(results) / HALVING_ETA))]]
+    return results
+
+
+class TuningStore:
+    """
+    Najlepsza konfiguracja per ticker w pliku JSON – stock_model nakłada ją na XGB_PARAMS przy kolejnych treningach
+    """
+
+    def __init__(self, tuning_dir: str = TUNING_DIR):
+        self.tuning_dir = tuning_dir
+        os.makedirs(tuning_dir, exist_ok=True)
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.tuning_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker)}.json")
+
+    def load(self, ticker: str) -> dict | None:
+        try:
+            with open(self.path(ticker)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, ticker: str, entry: dict):
+        entry = {**entry, "tuned_at": datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,23 @@
+<?php
+
+use App\Http\Middleware\DecompressJsonRequest;
+
+function postGzip($test, string $body)
+{
+    return $test->call('POST', '/api/stock-api/forecast', [], [], [], [
+        'CONTENT_TYPE' => 'application/json',
+        'HTTP_CONTENT_ENCODING' => 'gzip',
+        'HTTP_ACCEPT' => 'application/json',
+    ], $body);
+}
+
+test('gzip bodies above the decoded limit are rejected with 413', function () {
+    $bomb = gzencode(str_repeat(' ', DecompressJsonRequest::MAX_DECODED_BYTES + 1), 9);
+
+    postGzip($this, $bomb)->assertStatus(413);
+});
+
+test('invalid gzip bodies are rejected with 400', function () {
+    postGzip($this, 'not gzip')->assertStatus(400);
+    postGzip($this, substr(gzencode('{"ticker": "BTC-USD"}'), 0, -8))->assertStatus(400);
+});
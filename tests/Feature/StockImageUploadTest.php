@@ -0,0 +1,55 @@
+<?php
+
+use Illuminate\Http\UploadedFile;
+use Illuminate\Support\Facades\Storage;
+
+beforeEach(function () {
+    Storage::fake('public');
+});
+
+test('chart extension comes from the format, not the client filename', function () {
+    $response = $this->post('/api/stock-api/image', [
+        'ticker' => 'BTC-USD',
+        'uuid' => 'uuid-1',
+        'type' => 'model',
+        'format' => 'png',
+        'image' => UploadedFile::fake()->image('chart.html'),
+    ], ['Accept' => 'application/json']);
+
+    $response->assertOk();
+    $filename = $response->json('stockImage.image');
+    expect($filename)->toEndWith('.png');
+    Storage::disk('public')->assertExists("images/{$filename}");
+});
+
+test('html content is rejected even when declared as png', function () {
+    $response = $this->post('/api/stock-api/image', [
+        'ticker' => 'BTC-USD',
+        'format' => 'png',
+        'image' => UploadedFile::fake()->createWithContent('chart.png', '<html><script>alert(1)</script></html>'),
+    ], ['Accept' => 'application/json']);
+
+    $response->assertStatus(422)->assertJsonValidationErrors('image');
+    expect(Storage::disk('public')->allFiles('images'))->toBeEmpty();
+});
+
+test('formats outside the allow-list are rejected', function () {
+    $response = $this->post('/api/stock-api/image', [
+        'ticker' => 'BTC-USD',
+        'format' => 'html',
+        'image' => UploadedFile::fake()->image('chart.png'),
+    ], ['Accept' => 'application/json']);
+
+    $response->assertStatus(422)->assertJsonValidationErrors('format');
+    expect(Storage::disk('public')->allFiles('images'))->toBeEmpty();
+});
+
+test('oversized charts are rejected', function () {
+    $response = $this->post('/api/stock-api/image', [
+        'ticker' => 'BTC-USD',
+        'format' => 'png',
+        'image' => UploadedFile::fake()->image('chart.png')->size(20000),
+    ], ['Accept' => 'application/json']);
+
+    $response->assertStatus(422)->assertJsonValidationErrors('image');
+});